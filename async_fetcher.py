@@ -0,0 +1,211 @@
+"""
+基于 asyncio 的 Google Trends RSS 拉取模块
+
+此模块与 data_fetcher 中基于 requests.Session 的阻塞拉取逻辑并存，
+使用一个 aiohttp 客户端（共享 keep-alive 连接池）在单个事件循环中拉取所有区域的 RSS，
+适合多个国家的调度任务在同一时刻触发时复用同一个连接池，而不必为每个国家启动线程。
+"""
+
+import asyncio
+import logging
+import random
+import aiohttp
+
+# 导入配置
+from config import current_config
+from data_fetcher import HostRateLimiter, create_validator_cache, parse_xml_to_dict, save_country_trends_and_validators
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class AsyncTrendsFetcher:
+    """
+    异步 RSS 拉取器。
+
+    持有一个 aiohttp.ClientSession（共享连接池，经配置的 HTTP 代理访问），
+    以及按主机划分的令牌桶（与线程版共用 data_fetcher.HostRateLimiter，等待时让出事件循环）。同一个实例可以被多个国家的调度任务并发复用，
+    必须在事件循环中创建和使用，用完后调用 close()。
+    """
+
+    def __init__(self, max_connections: int = None):
+        if max_connections is None:
+            max_connections = current_config.FETCH_MAX_WORKERS
+        self.max_connections = max_connections
+        self.validator_cache = create_validator_cache()
+        self.proxy = None
+        if current_config.USE_PROXY:
+            self.proxy = f"http://{current_config.HTTP_PROXY_HOST}:{current_config.HTTP_PROXY_PORT}"
+        self.session = None
+        self.rate_limiter = HostRateLimiter()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """延迟创建共享的 ClientSession，确保它绑定到当前运行的事件循环"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers={'User-Agent': current_config.REQUEST_USER_AGENT}
+            )
+            if self.proxy:
+                logger.info(f"已启用代理: {self.proxy}")
+        return self.session
+
+    async def _acquire(self, url: str):
+        """获取该主机的一个令牌，令牌不足或处于暂停期时挂起等待"""
+        bucket = self.rate_limiter.bucket_for(url)
+        while True:
+            wait_time = bucket.try_acquire()
+            if wait_time <= 0:
+                return
+            await asyncio.sleep(wait_time)
+
+    async def save_country(self, country_name: str, country_trends: list, regions: list) -> bool:
+        """
+        在线程中保存某个国家的数据（合并和写文件是阻塞操作），成功后提交并保存这些区域的 RSS 验证器
+
+        Args:
+            country_name (str): 国家名称
+            country_trends (list): 该国家新拉取的趋势数据列表
+            regions (list): 该国家的区域配置
+
+        Returns:
+            bool: 保存是否成功
+        """
+        saved = await asyncio.to_thread(
+            save_country_trends_and_validators, country_name, country_trends, regions, self.validator_cache
+        )
+        if self.validator_cache is not None:
+            await asyncio.to_thread(self.validator_cache.save)
+        return saved
+
+    async def close(self):
+        """关闭共享的 ClientSession（验证器已在每个国家保存成功后写入）"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def fetch_single_region(self, region: dict, country_name: str = None, max_retries: int = None) -> list:
+        """
+        异步拉取单个区域的 RSS 数据，并实现重试和退避逻辑。
+
+        Args:
+            region (dict): 包含区域信息的字典，需包含 'code' 和 'name' 键
+            country_name (str, optional): 数据所属的国家名称
+            max_retries (int, optional): 最大重试次数，如果为 None 则使用配置中的值
+
+        Returns:
+            list: 包含趋势数据的字典列表，失败或源数据未变化时返回空列表
+        """
+        url = current_config.GOOGLE_TRENDS_RSS_URL.format(code=region['code'])
+        if max_retries is None:
+            max_retries = current_config.REQUEST_MAX_RETRIES
+
+        session = await self._get_session()
+        timeout = aiohttp.ClientTimeout(total=current_config.REQUEST_TIMEOUT)
+
+        for attempt in range(max_retries):
+            try:
+                logger.info(f"正在拉取 {region['name']} ({region['code']}) 的数据... (尝试 {attempt + 1}/{max_retries})")
+                await self._acquire(url)
+                headers = self.validator_cache.request_headers(region['code']) if self.validator_cache is not None else None
+                async with session.get(url, headers=headers, proxy=self.proxy, timeout=timeout) as response:
+                    if response.status == 304:
+                        logger.info(f"{region['name']} 数据未变化 (304)，跳过解析")
+                        return []
+                    elif response.status == 200:
+                        body = await response.read()
+                        logger.debug(f"{region['name']} 数据拉取成功，长度: {len(body)}")
+                        if self.validator_cache is not None and self.validator_cache.is_unchanged(region['code'], body):
+                            logger.info(f"{region['name']} 数据内容未变化，跳过解析")
+                            return []
+                        text = body.decode(response.get_encoding())
+                        trends = parse_xml_to_dict(text, region['name'], country_name)
+                        if self.validator_cache is not None and trends:
+                            self.validator_cache.update(region['code'], response.headers, body)
+                        return trends
+                    elif response.status == 429:
+                        logger.warning(f"收到 429 错误，为 {region['name']} 等待更长时间后重试...")
+                        # 429 错误后暂停该主机 5-8 秒
+                        self.rate_limiter.penalize(url, 5 + random.uniform(1, 3))
+                        continue
+                    elif response.status >= 500:
+                        logger.warning(f"收到服务器错误 {response.status}，为 {region['name']} 等待后重试...")
+                        await asyncio.sleep(2 + random.uniform(0, 2))
+                    else:
+                        logger.warning(f"拉取 {region['name']} 数据失败，状态码: {response.status}")
+                        await asyncio.sleep(1 + random.uniform(0, 1))
+            except asyncio.TimeoutError:
+                logger.warning(f"拉取 {region['name']} 数据超时 (尝试 {attempt + 1}/{max_retries})")
+            except aiohttp.ClientError as e:
+                logger.warning(f"拉取 {region['name']} 数据连接错误: {e} (尝试 {attempt + 1}/{max_retries})")
+            except Exception as e:
+                logger.error(f"拉取 {region['name']} 数据时发生未知错误: {e} (尝试 {attempt + 1}/{max_retries})")
+
+            if attempt < max_retries - 1:
+                # 指数退避，但最大不超过 10 秒
+                sleep_time = min(10, 1 * (2 ** attempt))
+                logger.info(f"等待 {sleep_time:.2f} 秒后重试...")
+                await asyncio.sleep(sleep_time)
+
+        logger.error(f"拉取 {region['name']} 数据失败 (已重试 {max_retries} 次)")
+        return []
+
+    async def fetch_regions(self, regions_config: dict) -> dict:
+        """
+        并发拉取所有指定国家和区域的趋势数据（不保存）
+
+        Args:
+            regions_config (dict): 包含国家和区域信息的字典结构，格式同 data_fetcher.fetch_all_regions
+
+        Returns:
+            dict: 国家名称 -> 该国家趋势数据列表（按配置中的区域顺序排列）
+        """
+        country_tasks = {}
+        for country_name, country_data in regions_config.items():
+            logger.info(f"开始拉取 {country_name} 的数据 (异步模式)...")
+            country_tasks[country_name] = [
+                asyncio.ensure_future(self.fetch_single_region(region, country_name))
+                for region in country_data['regions']
+            ]
+
+        results = {}
+        for country_name, tasks in country_tasks.items():
+            country_trends = []
+            for region_trends in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(region_trends, Exception):
+                    logger.error(f"异步拉取 {country_name} 的区域数据时发生错误: {region_trends}")
+                    continue
+                country_trends.extend(region_trends)
+            results[country_name] = country_trends
+        return results
+
+
+async def fetch_all_regions_async(regions_config: dict, fetcher: AsyncTrendsFetcher = None) -> list:
+    """
+    异步版 fetch_all_regions：拉取所有指定国家和区域的数据并按国家保存
+
+    Args:
+        regions_config (dict): 包含国家和区域信息的字典结构
+        fetcher (AsyncTrendsFetcher, optional): 复用的拉取器，为 None 时临时创建并在结束后关闭
+
+    Returns:
+        list: 所有国家和区域的趋势数据列表
+    """
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = AsyncTrendsFetcher()
+
+    all_new_trends = []
+    try:
+        results = await fetcher.fetch_regions(regions_config)
+        for country_name, country_trends in results.items():
+            # 保存该国家的数据，成功后才提交验证器
+            await fetcher.save_country(country_name, country_trends, regions_config[country_name]['regions'])
+            all_new_trends.extend(country_trends)
+    finally:
+        if own_fetcher:
+            await fetcher.close()
+
+    logger.info(f"总共拉取到 {len(all_new_trends)} 个新条目")
+    return all_new_trends
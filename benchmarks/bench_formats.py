@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+AI 上下文格式的 token 对比：用 tiktoken 的真实编码（cl100k_base、o200k_base）对 markdown / ison / grouped 计数
+
+token_counter 在 tiktoken 不可用时按 4 个字符一个 token 估算，中文等非拉丁文字的实际比例与此相差很大，
+因此格式之间的节省比例必须用真实编码测量。这里同时列出按字符估算的结果以便对比。
+tiktoken 需要编码文件（首次使用时下载，离线环境可通过 TIKTOKEN_CACHE_DIR 指向已缓存的目录）。
+
+用法:
+    python benchmarks/bench_formats.py --start 2026-01-06 --end 2026-02-05
+    python benchmarks/bench_formats.py --rows 3000 0          # 0 表示全部行
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import tiktoken
+
+from prompt_formats import compare_formats
+from token_counter import CHARS_PER_TOKEN
+from trend_loader import load_rows_parallel, rows_to_frame
+
+ENCODINGS = ["cl100k_base", "o200k_base"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AI 上下文格式的 token 对比（tiktoken）')
+    parser.add_argument('--folder', default=os.path.join(ROOT, 'JSONs'), help='数据根目录')
+    parser.add_argument('--start', type=date.fromisoformat, default=date(2026, 1, 6), help='开始日期')
+    parser.add_argument('--end', type=date.fromisoformat, default=date(2026, 2, 5), help='结束日期（含）')
+    parser.add_argument('--rows', nargs='+', type=int, default=[3000, 0], help='按流量排序后取前多少行，0 表示全部')
+    args = parser.parse_args()
+
+    rows, _ = load_rows_parallel(args.folder, args.start, args.end)
+    if not rows:
+        sys.exit(f'{args.folder} 中没有 {args.start} 至 {args.end} 的数据')
+    # 与看板一致：按流量降序
+    df = rows_to_frame(rows).sort_values('流量', ascending=False)
+    encodings = {name: tiktoken.get_encoding(name) for name in ENCODINGS}
+    counters = {f'len/{CHARS_PER_TOKEN}': lambda text: (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN}
+    counters.update({name: (lambda encoding: lambda text: len(encoding.encode_ordinary(text)))(encoding)
+                     for name, encoding in encodings.items()})
+
+    print(f"{args.start} 至 {args.end}，共 {len(df):,} 行")
+    print(f"{'rows':>7} {'counter':<12} {'format':<9} {'chars':>10} {'tokens':>9} {'vs markdown':>12} {'vs ison':>8}")
+    for size in args.rows:
+        sample = df.head(size) if size else df
+        for name, count in counters.items():
+            for result in compare_formats(sample, lambda text, _: count(text), max_rows=len(sample)):
+                print(f"{len(sample):>7} {name:<12} {result['format']:<9} {result['chars']:>10,} {result['tokens']:>9,} "
+                      f"{0.0 - result['vs_markdown']:>+12.1%} {0.0 - result['vs_ison']:>+8.1%}")
+
+
+if __name__ == '__main__':
+    main()
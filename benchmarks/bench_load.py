@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+每日数据文件加载基准：对比 trend_loader.load_rows_parallel 的串行加载和不同进程数的进程池加载
+
+不使用 DayFileCache，每次都完整解析全部文件。进程池的耗时包含启动工作进程和把行记录序列化回主进程的开销，
+只有 CPU 核心数大于 1 时才可能比串行更快；load_rows_parallel 在单核主机上（或 max_workers=1 时）直接串行加载。
+
+用法:
+    python benchmarks/bench_load.py                            # 使用 JSONs/ 下的全部数据
+    python benchmarks/bench_load.py --days 30 --workers 2 4 8 --repeat 3
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from trend_loader import build_file_manifest, load_rows_parallel
+
+
+def best_time(func, repeat: int):
+    """返回 (最短耗时秒, 结果)"""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='每日数据文件加载基准')
+    parser.add_argument('--folder', default=os.path.join(ROOT, 'JSONs'), help='数据根目录')
+    parser.add_argument('--days', type=int, default=0, help='加载最近多少天的数据，0 表示全部')
+    parser.add_argument('--workers', nargs='+', type=int, default=None, help='进程池的进程数（默认 2 和 CPU 核心数）')
+    parser.add_argument('--repeat', type=int, default=3, help='每个样本重复次数（取最小值）')
+    args = parser.parse_args()
+
+    end_date = date.today()
+    start_date = end_date - timedelta(days=args.days) if args.days else date(2000, 1, 1)
+    files = len(build_file_manifest(args.folder, start_date, end_date))
+    if not files:
+        sys.exit(f'未找到 {args.folder} 下的数据文件')
+    cpus = os.cpu_count() or 1
+    workers = args.workers or sorted({2, cpus} - {1})
+
+    serial_time, (rows, _) = best_time(lambda: load_rows_parallel(args.folder, start_date, end_date, max_workers=1), args.repeat)
+    print(f"CPU 核心数 {cpus}，{files} 个文件，{len(rows):,} 行")
+    print(f"{'mode':<10} {'seconds':>8} {'vs serial':>10}")
+    print(f"{'serial':<10} {serial_time:>8.2f} {1.0:>9.2f}x")
+    for count in workers:
+        # 显式给出进程数时即使在单核主机上也使用进程池，可以直接测量进程池的开销
+        pool_time, _ = best_time(lambda: load_rows_parallel(args.folder, start_date, end_date, max_workers=count), args.repeat)
+        print(f"{f'pool x{count}':<10} {pool_time:>8.2f} {serial_time / pool_time:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
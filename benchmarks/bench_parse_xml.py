@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+RSS 解析微基准：对比基于 ET.fromstring 的旧实现与 data_fetcher 中的流式解析实现
+
+用法:
+    python benchmarks/bench_parse_xml.py                       # 使用 JSONs/ 下的历史数据生成 feed 样本
+    python benchmarks/bench_parse_xml.py --feeds a.xml b.xml   # 使用保存下来的 RSS 原文
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_fetcher import HT_NS, parse_xml_to_dict
+
+
+def legacy_parse_xml_to_dict(xml_content, region_name, country_name=None):
+    """改造前的实现：构建完整 ElementTree，再对每个字段调用 find"""
+    trends = []
+    root = ET.fromstring(xml_content)
+    channel = root.find('channel')
+    if channel is None:
+        return trends
+    for item in channel.findall('item'):
+        title_elem = item.find('title')
+        title = title_elem.text.strip() if title_elem is not None and title_elem.text else '无标题'
+        pub_date_elem = item.find('pubDate')
+        pub_date_str = pub_date_elem.text if pub_date_elem is not None and pub_date_elem.text else datetime.now(timezone.utc).isoformat()
+        try:
+            pub_date = parsedate_to_datetime(pub_date_str)
+            if pub_date.tzinfo is None:
+                pub_date = pub_date.replace(tzinfo=timezone.utc)
+        except (ValueError, TypeError):
+            pub_date = datetime.now(timezone.utc)
+        traffic_elem = item.find(f'{{{HT_NS}}}approx_traffic')
+        traffic_str = traffic_elem.text if traffic_elem is not None and traffic_elem.text else '0'
+        traffic_num = int(traffic_str.replace(',', '').replace('+', '')) if traffic_str.replace(',', '').replace('+', '').isdigit() else 0
+        picture_elem = item.find(f'{{{HT_NS}}}picture')
+        picture = picture_elem.text if picture_elem is not None and picture_elem.text else ''
+        news_list = []
+        for news_item in item.findall(f'{{{HT_NS}}}news_item'):
+            title_e = news_item.find(f'{{{HT_NS}}}news_item_title')
+            url_e = news_item.find(f'{{{HT_NS}}}news_item_url')
+            source_e = news_item.find(f'{{{HT_NS}}}news_item_source')
+            pic_e = news_item.find(f'{{{HT_NS}}}news_item_picture')
+            news_list.append({
+                'title': title_e.text if title_e is not None and title_e.text else '',
+                'url': url_e.text if url_e is not None and url_e.text else '',
+                'source': source_e.text if source_e is not None and source_e.text else '未知来源',
+                'picture': pic_e.text if pic_e is not None and pic_e.text else ''
+            })
+        trends.append({
+            'title': title,
+            'traffic_str': traffic_str,
+            'traffic_num': traffic_num,
+            'pub_date_str': pub_date_str,
+            'pub_date': pub_date.isoformat(),
+            'picture': picture,
+            'news': news_list,
+            'regions': [region_name],
+            'country': country_name if country_name else None
+        })
+    return trends
+
+
+def build_feed_from_day_file(path, max_items):
+    """把历史 JSON 数据还原为 Google Trends RSS 结构，作为 feed 样本"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<rss xmlns:atom="http://www.w3.org/2005/Atom" xmlns:ht="{HT_NS}" version="2.0">',
+        '<channel><title>Daily Search Trends</title>',
+    ]
+    for item in data[:max_items]:
+        try:
+            pub_date = format_datetime(datetime.fromisoformat(item['pub_date']))
+        except (KeyError, ValueError):
+            pub_date = format_datetime(datetime.now(timezone.utc))
+        parts.append('<item>')
+        parts.append(f"<title>{escape(item.get('title', ''))}</title>")
+        parts.append(f"<ht:approx_traffic>{item.get('traffic_num', 0)}+</ht:approx_traffic>")
+        parts.append(f"<pubDate>{pub_date}</pubDate>")
+        parts.append(f"<ht:picture>{escape(item.get('picture', ''))}</ht:picture>")
+        for news in item.get('news', []):
+            parts.append('<ht:news_item>')
+            parts.append(f"<ht:news_item_title>{escape(news.get('title', ''))}</ht:news_item_title>")
+            parts.append(f"<ht:news_item_url>{escape(news.get('url', ''))}</ht:news_item_url>")
+            parts.append(f"<ht:news_item_picture>{escape(news.get('picture', ''))}</ht:news_item_picture>")
+            parts.append(f"<ht:news_item_source>{escape(news.get('source', ''))}</ht:news_item_source>")
+            parts.append('</ht:news_item>')
+        parts.append('</item>')
+    parts.append('</channel></rss>')
+    return '\n'.join(parts)
+
+
+def measure(func, xml_content, repeat):
+    """返回 (单次平均耗时秒, 峰值内存字节)"""
+    elapsed = min(timeit.repeat(lambda: func(xml_content, 'bench'), number=1, repeat=repeat))
+    tracemalloc.start()
+    func(xml_content, 'bench')
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RSS 解析微基准')
+    parser.add_argument('--feeds', nargs='+', help='保存下来的 RSS XML 文件')
+    parser.add_argument('--source', default=None, help='用于生成 feed 样本的 JSON 日文件（默认取 JSONs/India 中最大的文件）')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000], help='生成 feed 样本的条目数')
+    parser.add_argument('--repeat', type=int, default=5, help='每个样本重复次数（取最小值）')
+    args = parser.parse_args()
+
+    samples = []
+    if args.feeds:
+        for path in args.feeds:
+            with open(path, 'r', encoding='utf-8') as f:
+                samples.append((os.path.basename(path), f.read()))
+    else:
+        source = args.source
+        if source is None:
+            candidates = glob.glob(os.path.join('JSONs', 'India', '*.json'))
+            if not candidates:
+                sys.exit('未找到 JSONs/India 下的数据文件，请使用 --source 或 --feeds 指定样本')
+            source = max(candidates, key=os.path.getsize)
+        for size in args.sizes:
+            samples.append((f"{os.path.basename(source)}[:{size}]", build_feed_from_day_file(source, size)))
+
+    print(f"{'sample':<40} {'items':>6} {'legacy ms':>10} {'stream ms':>10} {'legacy KiB':>11} {'stream KiB':>11}")
+    for name, xml_content in samples:
+        legacy = legacy_parse_xml_to_dict(xml_content, 'bench')
+        streamed = parse_xml_to_dict(xml_content, 'bench')
+        # 旧实现没有预先计算的时间戳字段，比较时忽略
+        comparable = [{k: v for k, v in item.items() if k != 'pub_ts'} for item in streamed]
+        if legacy != comparable:
+            print(f"警告: {name} 的两种实现解析结果不一致")
+        legacy_time, legacy_peak = measure(legacy_parse_xml_to_dict, xml_content, args.repeat)
+        stream_time, stream_peak = measure(parse_xml_to_dict, xml_content, args.repeat)
+        print(f"{name:<40} {len(streamed):>6} {legacy_time * 1000:>10.2f} {stream_time * 1000:>10.2f} "
+              f"{legacy_peak / 1024:>11.1f} {stream_peak / 1024:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+AI 上下文序列化基准：对比逐行 iterrows 的旧实现与 prompt_formats 中按列拼接的实现
+
+markdown 的输出必须与旧实现完全相同；ISON 的新实现会对引号、反斜杠、换行以及看起来像数字/布尔值的字符串
+正确加引号和转义，因此只统计与旧实现不同的行数（这些行都是旧实现输出了无法正确解析的值）。
+
+用法:
+    python benchmarks/bench_serializers.py                          # 使用 JSONs/ 下最近 30 天的数据
+    python benchmarks/bench_serializers.py --sizes 1000 10000 100000 --repeat 3
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from prompt_formats import FIELD_NAMES, generate_ison_content, generate_simple_markdown_table
+from trend_loader import load_rows_parallel, rows_to_frame
+
+
+def legacy_markdown_table(df_filtered, max_rows=100000):
+    """改造前的实现：iterrows 逐行构建 f-string"""
+    if df_filtered.empty:
+        return "No data to display."
+    df_simple = df_filtered.head(max_rows).rename(columns=FIELD_NAMES)
+    df_simple["pub_date"] = df_simple["pub_date"].astype(str)
+    df_simple["traffic_num"] = df_simple["traffic_num"].astype(int)
+    lines = ['', "news_title | source | title | traffic_num | pub_date | regions | country", "---|---|---|---|---|---|---"]
+    for _, row in df_simple.iterrows():
+        lines.append(f"{row['news_title']} | {row['source']} | {row['title']} | {row['traffic_num']} | {row['pub_date']} | {row['regions']} | {row['country']}")
+    return "\n".join(lines)
+
+
+def legacy_ison_content(df_filtered, max_rows=100000):
+    """改造前的实现：iterrows 逐行构建，只对含空格的值加引号（不转义）"""
+    if df_filtered.empty:
+        return "table.empty"
+    df_simple = df_filtered.head(max_rows).rename(columns=FIELD_NAMES)
+    df_simple["pub_date"] = df_simple["pub_date"].astype(str)
+    df_simple["traffic_num"] = df_simple["traffic_num"].astype(int)
+    lines = ["table.trends", "news_title source title traffic_num:int pub_date regions country"]
+    for _, row in df_simple.iterrows():
+        values = []
+        for field in ("news_title", "source", "title", "traffic_num", "pub_date", "regions", "country"):
+            value = str(row[field])
+            values.append(f'"{value}"' if ' ' in value else value)
+        lines.append(" ".join(values))
+    return "\n".join(lines)
+
+
+def load_frame(days: int, size: int) -> pd.DataFrame:
+    """加载 JSONs/ 中最近 days 天的数据（按流量排序，与看板一致）；行数不足 size 时重复拼接"""
+    end_date = date.today()
+    rows, _ = load_rows_parallel(os.path.join(ROOT, 'JSONs'), end_date - timedelta(days=days), end_date)
+    if not rows:
+        # 数据较旧时退回全部历史数据
+        rows, _ = load_rows_parallel(os.path.join(ROOT, 'JSONs'), date(2000, 1, 1), end_date)
+    if not rows:
+        sys.exit('未找到 JSONs/ 下的数据文件')
+    df = rows_to_frame(rows).sort_values('流量', ascending=False)
+    while len(df) < size:
+        df = pd.concat([df, df], ignore_index=True)
+    return df
+
+
+def best_time(func, df, repeat: int):
+    """返回 (最短耗时秒, 输出)"""
+    best, output = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = func(df)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AI 上下文序列化基准')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000], help='序列化的行数')
+    parser.add_argument('--days', type=int, default=30, help='加载最近多少天的数据')
+    parser.add_argument('--repeat', type=int, default=3, help='每个样本重复次数（取最小值）')
+    args = parser.parse_args()
+
+    df = load_frame(args.days, max(args.sizes))
+    print(f"{'format':<9} {'rows':>7} {'legacy ms':>10} {'columnar ms':>12} {'speedup':>8}  output")
+    for size in args.sizes:
+        sample = df.head(size)
+        for name, legacy, columnar in (
+            ('markdown', legacy_markdown_table, generate_simple_markdown_table),
+            ('ison', legacy_ison_content, generate_ison_content),
+        ):
+            legacy_time, legacy_output = best_time(legacy, sample, args.repeat)
+            columnar_time, columnar_output = best_time(columnar, sample, args.repeat)
+            if legacy_output == columnar_output:
+                note = '相同'
+            else:
+                changed = sum(a != b for a, b in zip(legacy_output.splitlines(), columnar_output.splitlines()))
+                note = f'{changed} 行因转义不同'
+            print(f"{name:<9} {size:>7} {legacy_time * 1000:>10.1f} {columnar_time * 1000:>12.1f} "
+                  f"{legacy_time / columnar_time:>7.1f}x  {note}")
+
+
+if __name__ == '__main__':
+    main()
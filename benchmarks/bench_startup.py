@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+看板启动基准：测量 global_trends_analyzer.py 顶层导入语句的耗时
+
+Streamlit 为新会话首次执行脚本时，必须先完成所有顶层导入，才能渲染数据概览。
+此脚本用 ast 取出脚本中模块级别的 import 语句，在全新的子进程中执行并计时（重复多次取中位数），
+并用 python -X importtime 列出最耗时的模块。未安装的依赖会被跳过并单独列出。
+
+用法:
+    python benchmarks/bench_startup.py                        # 测量当前工作区的脚本
+    python benchmarks/bench_startup.py --compare-rev HEAD~1   # 同时测量某个 git 版本的脚本作为对照
+
+对照版本的全部 .py 文件会被导出到临时目录中测量，因此它导入的项目模块也是该版本的实现。
+"""
+
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = 'global_trends_analyzer.py'
+
+# 子进程中执行的计时程序：逐条执行导入语句，缺失的依赖记录下来后跳过
+RUNNER = textwrap.dedent('''
+    import json, sys, time
+    statements = json.loads(sys.argv[1])
+    missing = []
+    started = time.perf_counter()
+    for statement in statements:
+        try:
+            exec(statement, {})
+        except ImportError as e:
+            missing.append(getattr(e, 'name', None) or str(e))
+    elapsed = time.perf_counter() - started
+    print(json.dumps({'elapsed': elapsed, 'missing': sorted(set(missing))}))
+''')
+
+
+def top_level_imports(source: str) -> list:
+    """取出脚本中模块级别的 import 语句（不包括函数内部按需导入的模块）"""
+    tree = ast.parse(source)
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def export_rev(rev: str, target_dir: str) -> str:
+    """把某个 git 版本的全部 .py 文件导出到 target_dir，返回导出目录"""
+    archive = subprocess.run(
+        ['git', 'archive', '--format=tar', rev, '--', '*.py'], cwd=ROOT, capture_output=True, check=True
+    ).stdout
+    archive_path = os.path.join(target_dir, 'rev.tar')
+    with open(archive_path, 'wb') as f:
+        f.write(archive)
+    with tarfile.open(archive_path) as tar:
+        tar.extractall(target_dir)
+    return target_dir
+
+
+def read_source(root: str) -> str:
+    with open(os.path.join(root, SCRIPT), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def measure(statements: list, repeat: int, root: str) -> dict:
+    """在全新的子进程中执行导入语句 repeat 次，返回耗时的中位数和最小值"""
+    import json
+
+    timings = []
+    missing = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-c', RUNNER, json.dumps(statements)],
+            cwd=root, capture_output=True, text=True, check=True
+        )
+        payload = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(payload['elapsed'])
+        missing = payload['missing']
+    return {'median': statistics.median(timings), 'min': min(timings), 'missing': missing}
+
+
+def slowest_modules(statements: list, top: int, root: str) -> list:
+    """用 -X importtime 统计各个顶层模块的累计导入耗时（微秒）"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', '\n'.join(
+            f"try:\n    {statement}\nexcept ImportError:\n    pass" for statement in statements
+        )],
+        cwd=root, capture_output=True, text=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        # 只保留最外层的模块（importtime 在名称前用额外的缩进表示嵌套导入）
+        name = parts[2][1:]
+        if name.startswith(' '):
+            continue
+        modules.append((int(parts[1]), name))
+    return sorted(modules, reverse=True)[:top]
+
+
+def report(label: str, root: str, repeat: int, top: int):
+    statements = top_level_imports(read_source(root))
+    stats = measure(statements, repeat, root)
+    print(f"\n{label}: {len(statements)} 条顶层导入")
+    print(f"  中位数 {stats['median'] * 1000:8.1f} ms    最小值 {stats['min'] * 1000:8.1f} ms")
+    if stats['missing']:
+        print(f"  未安装（已跳过，实际耗时会更长）: {', '.join(stats['missing'])}")
+    for cumulative, name in slowest_modules(statements, top, root):
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='看板启动（顶层导入）基准')
+    parser.add_argument('--repeat', type=int, default=5, help='每个版本重复测量的次数')
+    parser.add_argument('--top', type=int, default=10, help='列出最耗时的模块数量')
+    parser.add_argument('--compare-rev', default=None, help='作为对照的 git 版本（例如 HEAD~1）')
+    args = parser.parse_args()
+
+    current = report('当前脚本', ROOT, args.repeat, args.top)
+    if args.compare_rev:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            baseline = report(f'{args.compare_rev} 的脚本', export_rev(args.compare_rev, temp_dir), args.repeat, args.top)
+        if current['median'] > 0:
+            print(f"\n启动导入耗时: {baseline['median'] * 1000:.1f} ms -> {current['median'] * 1000:.1f} ms "
+                  f"({baseline['median'] / current['median']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
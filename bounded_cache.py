@@ -0,0 +1,71 @@
+"""
+有界 LRU 缓存模块
+
+看板的图表缓存、筛选结果缓存、token 计数缓存和每日文件缓存都需要同样的结构：
+按最近使用顺序淘汰、带锁、统计命中和未命中次数。此模块提供它们共用的实现。
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class BoundedLRUCache:
+    """
+    线程安全的有界 LRU 缓存。
+
+    每个条目带一个大小（默认计为 1，即按条目数限制），大小之和超过 capacity 时从最久未使用的条目开始淘汰。
+    hits / misses 为命中和未命中次数。可以在多个看板会话（线程）之间共享。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # 键 -> (值, 大小)
+        self.entries = OrderedDict()
+        self.total_size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key, valid=None):
+        """
+        返回缓存的值并标记为最近使用
+
+        Args:
+            key (hashable): 键
+            valid (callable, optional): 校验缓存的值，返回 False 时视为未命中（例如源文件签名已变化）
+
+        Returns:
+            缓存的值；不存在或校验失败时为 None
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (valid is not None and not valid(entry[0])):
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size: int = 1):
+        """
+        保存一个值（替换同键的旧值），超出容量时淘汰最久未使用的条目；单个条目超过容量时不保存
+
+        Args:
+            key (hashable): 键
+            value: 值
+            size (int): 条目大小，与 capacity 的单位一致
+        """
+        if size > self.capacity:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.total_size -= previous[1]
+            self.entries[key] = (value, size)
+            self.total_size += size
+            while self.total_size > self.capacity:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.total_size -= evicted_size
@@ -0,0 +1,330 @@
+"""
+分块（map-reduce）AI 分析模块
+
+30 天、8 个国家的筛选结果远超单个模型的上下文窗口，单次 chat.completions.create 会失败或被截断。
+此模块把数据按国家和日期拆分为不超过 token 上限的若干块：
+    split_into_chunks  以趋势（同一国家、同一天的同一搜索词）为单位，按 (国家, 日期) 顺序装箱，每块只含一个国家的连续日期
+    run_map            并发分析各块（线程池大小即同时进行的请求数上限），每块失败后按指数退避重试
+    reduce_messages    把各块的部分报告合并为最终分析的消息；报告合计超出预算时先分组做中间合并，直到放得下
+最终的合并请求由调用方发送（看板以流式显示，命令行直接等待结果）。
+
+可以用 tools/openai_stand_in.py 启动的本地 OpenAI 兼容服务测试完整流程：
+    python tools/openai_stand_in.py --port 8765 &
+    python chunked_analysis.py --endpoint http://127.0.0.1:8765/v1 --model stand-in --days 30
+"""
+
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# 导入配置
+from config import current_config
+from context_budget import TrendCosts
+from llm_cache import cache_key
+from prompt_formats import generate_prompt_content
+from token_counter import count_tokens
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+PROMPTS = current_config.PROMPTS
+
+
+def split_into_chunks(df: pd.DataFrame, compression_format: str, chunk_tokens: int, model_name: str = "gpt-4o") -> list:
+    """
+    按国家和日期把数据拆分为不超过 chunk_tokens 的块（单个趋势超过上限时独占一块）
+
+    Args:
+        df (pd.DataFrame): 看板筛选后的数据
+        compression_format (str): markdown / ison / grouped
+        chunk_tokens (int): 每块数据表格的 token 上限
+        model_name (str): 用于估算的模型名称
+
+    Returns:
+        list: 每块一个字典 {index, country, start_date, end_date, scope, df, trends, rows, estimated_tokens}，
+              块内的行保持原有顺序
+    """
+    if df.empty:
+        return []
+
+    trend_costs = TrendCosts(df, compression_format, model_name)
+    groups, costs = trend_costs.groups, trend_costs.costs
+    first = np.unique(groups, return_index=True)[1]
+    trend_country = df["国家"].astype(str).to_numpy()[first]
+    trend_day = df["发布日期"].to_numpy()[first]
+    order = pd.DataFrame({"country": trend_country, "day": trend_day}).sort_values(["country", "day"], kind="stable").index.to_numpy()
+
+    # 按 (国家, 日期) 顺序装箱：国家变化或放不下时开始新的一块
+    limit = chunk_tokens - trend_costs.overhead
+    chunk_of_trend = np.empty(len(costs), dtype=np.int64)
+    chunks = []
+    used = 0
+    for trend in order:
+        chunk = chunks[-1] if chunks else None
+        if chunk is None or chunk["country"] != trend_country[trend] or (used > 0 and used + costs[trend] > limit):
+            chunk = {"index": len(chunks) + 1, "country": trend_country[trend], "start_date": trend_day[trend],
+                     "end_date": trend_day[trend], "trends": 0, "estimated_tokens": trend_costs.overhead}
+            chunks.append(chunk)
+            used = 0
+        chunk_of_trend[trend] = chunk["index"] - 1
+        chunk["end_date"] = trend_day[trend]
+        chunk["trends"] += 1
+        chunk["estimated_tokens"] += int(costs[trend])
+        used += costs[trend]
+
+    # 按块编号稳定排序行号，每块的行保持原有顺序
+    chunk_of_row = chunk_of_trend[groups]
+    row_order = np.argsort(chunk_of_row, kind="stable")
+    bounds = np.searchsorted(chunk_of_row[row_order], np.arange(len(chunks) + 1))
+    for chunk in chunks:
+        positions = row_order[bounds[chunk["index"] - 1]:bounds[chunk["index"]]]
+        chunk["df"] = df.iloc[positions]
+        chunk["rows"] = len(positions)
+        if chunk["start_date"] == chunk["end_date"]:
+            chunk["scope"] = f"{chunk['country']}，{chunk['start_date']}"
+        else:
+            chunk["scope"] = f"{chunk['country']}，{chunk['start_date']} ~ {chunk['end_date']}"
+    return chunks
+
+
+def complete(client, model_name: str, messages: list, max_retries: int = None, response_cache=None) -> str:
+    """
+    发送一次非流式请求并返回回复内容，失败后按指数退避重试
+
+    Args:
+        client: OpenAI 兼容客户端
+        model_name (str): 模型名称
+        messages (list): 消息列表
+        max_retries (int, optional): 重试次数，默认使用 config.AI_MAP_MAX_RETRIES
+        response_cache (LLMResponseCache, optional): 回复缓存，相同请求直接返回缓存的回复
+
+    Returns:
+        str: 回复内容
+    """
+    if max_retries is None:
+        max_retries = current_config.AI_MAP_MAX_RETRIES
+    key = None
+    if response_cache is not None:
+        key = cache_key(str(client.base_url), model_name, messages)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+    for attempt in range(max_retries + 1):
+        try:
+            response = client.chat.completions.create(model=model_name, messages=messages)
+            content = response.choices[0].message.content or ""
+            if key is not None:
+                response_cache.put(key, str(client.base_url), model_name, content)
+            return content
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            delay = 2 ** attempt
+            logger.warning(f"AI 请求失败，{delay} 秒后重试 ({attempt + 1}/{max_retries}): {e}")
+            time.sleep(delay)
+
+
+def map_messages(chunk: dict, total: int, compression_format: str, system_prompt: str, user_prompt: str) -> list:
+    """构建分析单个块的消息（表格在工作线程中按需生成）"""
+    content = PROMPTS.AI_MAP_USER_PROMPT.format(user_prompt=user_prompt, total=total, index=chunk["index"], scope=chunk["scope"])
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": content + "\n\n" + generate_prompt_content(chunk["df"], compression_format)},
+    ]
+
+
+def run_map(client, model_name: str, chunks: list, compression_format: str, system_prompt: str, user_prompt: str,
+            max_in_flight: int = None, max_retries: int = None, on_result=None, response_cache=None) -> list:
+    """
+    并发分析各块，同时进行的请求不超过 max_in_flight 个
+
+    Args:
+        client: OpenAI 兼容客户端（可以在线程之间共享）
+        model_name (str): 模型名称
+        chunks (list): split_into_chunks 的结果
+        compression_format (str): markdown / ison / grouped
+        system_prompt (str): 系统提示词
+        user_prompt (str): 用户的分析要求
+        max_in_flight (int, optional): 并发请求数上限，默认使用 config.AI_MAP_MAX_IN_FLIGHT
+        max_retries (int, optional): 每块的重试次数，默认使用 config.AI_MAP_MAX_RETRIES
+        on_result (callable, optional): 每完成一块时在调用线程中调用 on_result(完成数, 总数, 结果)
+        response_cache (LLMResponseCache, optional): 回复缓存，筛选条件未变化时重新分析直接使用缓存的部分报告
+
+    Returns:
+        list: 按块顺序的结果 {index, scope, report, error, elapsed}，失败的块 report 为 None
+    """
+    if max_in_flight is None:
+        max_in_flight = current_config.AI_MAP_MAX_IN_FLIGHT
+
+    def analyze(chunk):
+        started = time.perf_counter()
+        messages = map_messages(chunk, len(chunks), compression_format, system_prompt, user_prompt)
+        report = complete(client, model_name, messages, max_retries, response_cache)
+        return report, time.perf_counter() - started
+
+    results = [None] * len(chunks)
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+        futures = {executor.submit(analyze, chunk): chunk for chunk in chunks}
+        for done, future in enumerate(as_completed(futures), start=1):
+            chunk = futures[future]
+            result = {"index": chunk["index"], "scope": chunk["scope"], "report": None, "error": None, "elapsed": 0.0}
+            try:
+                result["report"], result["elapsed"] = future.result()
+            except Exception as e:
+                logger.error(f"第 {chunk['index']} 块（{chunk['scope']}）分析失败: {e}")
+                result["error"] = str(e)
+            results[chunk["index"] - 1] = result
+            if on_result is not None:
+                on_result(done, len(chunks), result)
+    return results
+
+
+def reduce_prompt(user_prompt: str, results: list) -> str:
+    """把各块的部分报告拼接为合并请求的用户消息（以用户的分析要求开头）"""
+    reports = [result for result in results if result["report"]]
+    failed = [result for result in results if not result["report"]]
+    missing = ""
+    if failed:
+        missing = PROMPTS.AI_REDUCE_MISSING_NOTE.format(count=len(failed), scopes="；".join(result["scope"] for result in failed))
+    sections = "\n\n".join(
+        PROMPTS.AI_REPORT_SECTION.format(index=result["index"], scope=result["scope"], report=result["report"].strip())
+        for result in reports
+    )
+    return user_prompt + "\n\n" + PROMPTS.AI_REDUCE_USER_PROMPT.format(count=len(reports), missing=missing, reports=sections)
+
+
+def reduce_messages(client, model_name: str, results: list, system_prompt: str, user_prompt: str, token_budget: int,
+                    max_in_flight: int = None, max_retries: int = None, response_cache=None) -> list:
+    """
+    构建最终合并请求的消息；部分报告合计超出 token_budget 时，先把报告分组并发做中间合并，逐层减少，直到放得下
+
+    Args:
+        client: OpenAI 兼容客户端
+        model_name (str): 模型名称
+        results (list): run_map 的结果
+        system_prompt (str): 系统提示词
+        user_prompt (str): 用户的分析要求
+        token_budget (int): 合并请求中用户消息的 token 上限
+        max_in_flight (int, optional): 中间合并的并发请求数上限
+        max_retries (int, optional): 每次请求的重试次数
+        response_cache (LLMResponseCache, optional): 中间合并使用的回复缓存
+
+    Returns:
+        list: 最终合并请求的消息 [system, user]
+    """
+    if max_in_flight is None:
+        max_in_flight = current_config.AI_MAP_MAX_IN_FLIGHT
+    content = reduce_prompt(user_prompt, results)
+    level = 0
+    while count_tokens(content, model_name) > token_budget:
+        reports = [result for result in results if result["report"]]
+        # 按顺序把报告装入不超过预算的分组
+        batches, batch, used = [], [], 0
+        for result in reports:
+            tokens = count_tokens(result["report"], model_name)
+            if batch and used + tokens > token_budget * 0.9:
+                batches.append(batch)
+                batch, used = [], 0
+            batch.append(result)
+            used += tokens
+        if batch:
+            batches.append(batch)
+        # 只有一份报告的分组原样保留，不发送合并请求
+        pending = [batch for batch in batches if len(batch) > 1]
+        if not pending:
+            # 单份报告已经超出预算，无法继续合并，交给调用方提示超限
+            logger.warning("部分报告超出合并请求的 token 预算，无法继续分组合并")
+            break
+
+        level += 1
+        logger.info(f"部分报告超出合并请求的预算，第 {level} 层中间合并：{len(reports)} 份 -> {len(batches)} 份")
+
+        def merge(batch):
+            # 重试后仍失败的分组保留原有的部分报告，不中断整个分析
+            try:
+                return complete(client, model_name, [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": reduce_prompt(user_prompt, batch)},
+                ], max_retries, response_cache)
+            except Exception as e:
+                logger.error(f"第 {level} 层中间合并（{batch[0]['scope']} 等 {len(batch)} 份报告）失败，保留原报告: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+            merged = dict(zip(map(id, pending), executor.map(merge, pending)))
+
+        failed = [result for result in results if not result["report"]]
+        kept = []
+        for batch in batches:
+            report = merged.get(id(batch))
+            if report is None:
+                kept.extend({"scope": result["scope"], "report": result["report"]} for result in batch)
+            else:
+                scope = f"{batch[0]['scope']} 至 {batch[-1]['scope']}" if len(batch) > 1 else batch[0]["scope"]
+                kept.append({"scope": scope, "report": report})
+        # 合并后的报告编号排在失败的块之后，避免与其编号重复
+        first_index = max((result["index"] for result in failed), default=0) + 1
+        results = failed + [
+            {"index": position, "scope": entry["scope"], "report": entry["report"], "error": None, "elapsed": 0.0}
+            for position, entry in enumerate(kept, start=first_index)
+        ]
+        content = reduce_prompt(user_prompt, results)
+        if len(kept) >= len(reports):
+            # 本层没有减少报告数量（合并全部失败），继续分层也不会有进展
+            logger.warning(f"第 {level} 层中间合并没有减少报告数量，停止分组合并")
+            break
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": content},
+    ]
+
+
+if __name__ == "__main__":
+    from openai import OpenAI
+
+    from context_budget import context_window
+    from trend_loader import load_rows_parallel, rows_to_frame
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='分块（map-reduce）AI 分析：按国家和日期拆分数据，并发分析后合并')
+    parser.add_argument('--endpoint', required=True, help='OpenAI 兼容接口地址，例如 http://127.0.0.1:8765/v1')
+    parser.add_argument('--api-key', default='stand-in', help='API Key')
+    parser.add_argument('--model', required=True, help='模型名称')
+    parser.add_argument('--days', type=int, default=30, help='分析截至 --end 的最近多少天')
+    parser.add_argument('--end', default=None, help='结束日期 YYYY-MM-DD（默认今天）')
+    parser.add_argument('--source-dir', default=None, help='源数据目录（默认使用配置中的 OUTPUT_DIR）')
+    parser.add_argument('--format', default='grouped', help='markdown / ison / grouped')
+    parser.add_argument('--chunk-tokens', type=int, default=current_config.AI_MAP_CHUNK_TOKENS, help='每块数据的 token 上限')
+    parser.add_argument('--max-in-flight', type=int, default=current_config.AI_MAP_MAX_IN_FLIGHT, help='同时进行的请求数上限')
+    args = parser.parse_args()
+
+    end_date = date.fromisoformat(args.end) if args.end else date.today()
+    rows, _ = load_rows_parallel(args.source_dir or current_config.OUTPUT_DIR, end_date - timedelta(days=args.days - 1), end_date)
+    df = rows_to_frame(rows).sort_values('流量', ascending=False)
+    system_prompt = PROMPTS.AI_DEFAULT_SYSTEM_PROMPT
+    user_prompt = PROMPTS.AI_DEFAULT_USER_PROMPT
+    reduce_budget = context_window(args.model) - current_config.AI_RESPONSE_TOKEN_RESERVE - count_tokens(system_prompt, args.model)
+
+    started = time.perf_counter()
+    chunks = split_into_chunks(df, args.format, args.chunk_tokens, args.model)
+    print(f"{len(df)} 行拆分为 {len(chunks)} 块（每块不超过 {args.chunk_tokens:,} tokens），耗时 {time.perf_counter() - started:.2f}s")
+
+    def print_result(done, total, result):
+        outcome = f"失败 {result['error']}" if result['error'] else f"{len(result['report'])} 字符"
+        print(f"  [{done}/{total}] 第 {result['index']} 块 {result['scope']}: {outcome} ({result['elapsed']:.2f}s)")
+
+    client = OpenAI(base_url=args.endpoint, api_key=args.api_key)
+    started = time.perf_counter()
+    results = run_map(client, args.model, chunks, args.format, system_prompt, user_prompt, args.max_in_flight, on_result=print_result)
+    print(f"map 阶段耗时 {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    messages = reduce_messages(client, args.model, results, system_prompt, user_prompt, reduce_budget, args.max_in_flight)
+    report = complete(client, args.model, messages)
+    print(f"reduce 阶段耗时 {time.perf_counter() - started:.2f}s\n")
+    print(report)
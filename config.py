@@ -195,6 +195,12 @@ REQUEST_MAX_RETRIES = 3
 REQUEST_DELAY_BETWEEN_REGIONS = (1, 2)
 REQUEST_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36"
 
+# 并发拉取配置
+FETCH_MODE = "sequential"  # sequential: 逐个区域拉取; concurrent: 线程池并发拉取; async: asyncio 单事件循环拉取
+FETCH_MAX_WORKERS = 8  # 并发模式下的最大工作线程数（async 模式下为连接池大小）
+REQUEST_RATE_PER_HOST = 2.0  # 每个主机每秒补充的令牌数（平均请求速率）
+REQUEST_BURST_PER_HOST = 8  # 每个主机令牌桶的容量（允许的突发请求数）
+
 # 代理配置
 USE_PROXY = True  # 是否启用代理
 HTTP_PROXY_HOST = "127.0.0.1"  # 代理服务器地址
@@ -204,6 +210,61 @@ HTTP_PROXY_PORT = 10808  # 代理服务器端口
 OUTPUT_DIR = "JSONs"
 OUTPUT_FILE_PREFIX = "trends_"
 OUTPUT_FILE_EXTENSION = ".json"
+STORAGE_MODE = "snapshot"  # snapshot: 每次重写当天的 JSON 文件; journal: 变化的记录追加到 JSON Lines 日志，再压缩进快照
+JOURNAL_COMPACT_THRESHOLD_BYTES = 4 * 1024 * 1024  # 日志超过该大小时折叠进当天的快照
+
+# 缓存配置
+CACHE_DIR = ".cache"  # 本地缓存目录（不纳入版本控制）
+USE_FEED_VALIDATOR_CACHE = True  # 是否启用 RSS 条件请求缓存 (ETag / Last-Modified / 响应体哈希)
+FEED_VALIDATOR_CACHE_FILE = f"{CACHE_DIR}/feed_validators.json"
+ARCHIVE_DIR = f"{CACHE_DIR}/archive"  # 按国家/日期分区的 Parquet 列式归档（由 trend_archive.py 生成）
+ROW_CACHE_DIR = f"{CACHE_DIR}/row_cache"  # 每个每日数据文件展开后的内存映射行缓存（由 row_cache.py 生成）
+USE_SQLITE_STORE = False  # 是否在保存 JSON 文件的同时把变化的记录 upsert 进 SQLite 趋势存储
+ROLLUP_DIR = f"{CACHE_DIR}/rollups"  # 每个每日数据文件的聚合汇总（按国家/地区/信源/日期）
+USE_DAILY_ROLLUPS = True  # 保存每日文件后是否立即重新计算聚合汇总（看板读取时也会按需重建）
+SQLITE_DB_FILE = f"{CACHE_DIR}/trends.db"  # SQLite 趋势存储文件（可通过 python trend_store.py 从 JSONs 重建）
+SEARCH_INDEX_FILE = f"{CACHE_DIR}/news_search.db"  # 新闻全文搜索索引（SQLite FTS5，由 news_search.py 增量维护）
+USE_AI_RESPONSE_CACHE = True  # 是否缓存 AI 的完整回复（相同端点、模型和消息的请求直接回放缓存）
+AI_RESPONSE_CACHE_FILE = f"{CACHE_DIR}/llm_responses.db"  # AI 回复缓存文件（SQLite）
+AI_RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 3600  # AI 回复缓存的有效期（秒），0 表示不过期
+AI_RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # AI 回复缓存的大小上限，超出时淘汰最久未使用的条目
+
+# 看板配置
+DASHBOARD_LOAD_WORKERS = None  # json 模式下并行解析每日文件的进程数，None 表示 CPU 核心数
+DASHBOARD_CACHE_MAX_BYTES = 512 * 1024 * 1024  # json 模式下已展开行记录的每日文件缓存的内存上限（估算值）
+DASHBOARD_FILTER_CACHE_SIZE = 16  # 每个会话缓存的筛选结果数量（按数据集版本和筛选条件），0 表示不缓存
+DASHBOARD_CHART_BACKEND = "matplotlib"  # matplotlib: 服务端绘制 PNG（按汇总数据缓存）; native: 浏览器端渲染的 Vega-Lite 图表
+DASHBOARD_CHART_CACHE_SIZE = 64  # matplotlib 后端缓存的图表数量（所有会话共享）
+DASHBOARD_USE_ROLLUPS = True  # 概览卡片和图表是否读取预先计算的每日聚合汇总（仅 DASHBOARD_DATA_SOURCE 为 json 时生效）
+DASHBOARD_DATA_SOURCE = "json"  # json: 逐个解析每日 JSON 文件; archive: 从 Parquet 归档只读取所需分区和列（需要 pyarrow）; row_cache: 内存映射行缓存; sqlite: 从 SQLite 趋势存储查询，日期、国家和流量条件下推到 SQL
+
+# AI 分析配置
+AI_CONTEXT_WINDOWS = {  # 模型名（或前缀）-> 上下文窗口的 token 数，未列出的模型使用 AI_DEFAULT_CONTEXT_WINDOW
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4-turbo": 128000,
+    "gpt-3.5-turbo": 16385,
+    "o1": 200000,
+    "o3": 200000,
+    "o4-mini": 200000,
+    "deepseek-chat": 65536,
+    "deepseek-reasoner": 65536,
+    "qwen-plus": 131072,
+    "qwen-max": 32768,
+    "claude": 200000,
+    "gemini": 1048576,
+}
+AI_DEFAULT_CONTEXT_WINDOW = 128 * 1024  # 未知模型的上下文窗口
+AI_RESPONSE_TOKEN_RESERVE = 16 * 1024  # 为模型回复和后续几轮对话预留的 token 数
+AI_BUDGETED_SELECTION = True  # 是否按 token 预算选择发送给 AI 的趋势（False 时发送全部筛选结果）
+AI_SELECTION_WEIGHTS = {"traffic": 0.5, "breadth": 0.3, "recency": 0.2}  # 趋势优先级：流量、地区广度、时效的权重
+AI_RECENCY_HALF_LIFE_DAYS = 7  # 时效的半衰期（天）
+AI_COUNTRY_BALANCE = 0.5  # 国家平衡指数：同一国家第 n 个趋势的优先级除以 n ** 该值，0 表示不平衡
+AI_ANALYSIS_MODE = "single"  # single: 单次请求（超出上下文时按预算选择趋势）; map_reduce: 按国家和日期分块并发分析，再合并各块的报告
+AI_MAP_CHUNK_TOKENS = 32 * 1024  # map_reduce 模式下每块数据的 token 上限（不超过模型上下文中可用于表格的预算）
+AI_MAP_MAX_IN_FLIGHT = 4  # map_reduce 模式下同时进行的请求数上限
+AI_MAP_MAX_RETRIES = 2  # 每块请求失败后的重试次数
 
 # 调度器配置
 SCHEDULER_CRON_EXPRESSION = "0,30 11,17,23 * * *"  # 每天 11:00, 11:30, 17:00, 17:30, 23:00, 23:30 运行
@@ -221,9 +282,47 @@ class Config:
     REQUEST_MAX_RETRIES = REQUEST_MAX_RETRIES
     REQUEST_DELAY_BETWEEN_REGIONS = REQUEST_DELAY_BETWEEN_REGIONS
     REQUEST_USER_AGENT = REQUEST_USER_AGENT
+    FETCH_MODE = FETCH_MODE
+    FETCH_MAX_WORKERS = FETCH_MAX_WORKERS
+    REQUEST_RATE_PER_HOST = REQUEST_RATE_PER_HOST
+    REQUEST_BURST_PER_HOST = REQUEST_BURST_PER_HOST
     OUTPUT_DIR = OUTPUT_DIR
     OUTPUT_FILE_PREFIX = OUTPUT_FILE_PREFIX
     OUTPUT_FILE_EXTENSION = OUTPUT_FILE_EXTENSION
+    STORAGE_MODE = STORAGE_MODE
+    JOURNAL_COMPACT_THRESHOLD_BYTES = JOURNAL_COMPACT_THRESHOLD_BYTES
+    CACHE_DIR = CACHE_DIR
+    USE_FEED_VALIDATOR_CACHE = USE_FEED_VALIDATOR_CACHE
+    FEED_VALIDATOR_CACHE_FILE = FEED_VALIDATOR_CACHE_FILE
+    ARCHIVE_DIR = ARCHIVE_DIR
+    ROW_CACHE_DIR = ROW_CACHE_DIR
+    USE_SQLITE_STORE = USE_SQLITE_STORE
+    SQLITE_DB_FILE = SQLITE_DB_FILE
+    SEARCH_INDEX_FILE = SEARCH_INDEX_FILE
+    USE_AI_RESPONSE_CACHE = USE_AI_RESPONSE_CACHE
+    AI_RESPONSE_CACHE_FILE = AI_RESPONSE_CACHE_FILE
+    AI_RESPONSE_CACHE_TTL_SECONDS = AI_RESPONSE_CACHE_TTL_SECONDS
+    AI_RESPONSE_CACHE_MAX_BYTES = AI_RESPONSE_CACHE_MAX_BYTES
+    ROLLUP_DIR = ROLLUP_DIR
+    USE_DAILY_ROLLUPS = USE_DAILY_ROLLUPS
+    DASHBOARD_LOAD_WORKERS = DASHBOARD_LOAD_WORKERS
+    DASHBOARD_CACHE_MAX_BYTES = DASHBOARD_CACHE_MAX_BYTES
+    DASHBOARD_FILTER_CACHE_SIZE = DASHBOARD_FILTER_CACHE_SIZE
+    DASHBOARD_CHART_BACKEND = DASHBOARD_CHART_BACKEND
+    DASHBOARD_CHART_CACHE_SIZE = DASHBOARD_CHART_CACHE_SIZE
+    DASHBOARD_USE_ROLLUPS = DASHBOARD_USE_ROLLUPS
+    DASHBOARD_DATA_SOURCE = DASHBOARD_DATA_SOURCE
+    AI_CONTEXT_WINDOWS = AI_CONTEXT_WINDOWS
+    AI_DEFAULT_CONTEXT_WINDOW = AI_DEFAULT_CONTEXT_WINDOW
+    AI_RESPONSE_TOKEN_RESERVE = AI_RESPONSE_TOKEN_RESERVE
+    AI_BUDGETED_SELECTION = AI_BUDGETED_SELECTION
+    AI_SELECTION_WEIGHTS = AI_SELECTION_WEIGHTS
+    AI_RECENCY_HALF_LIFE_DAYS = AI_RECENCY_HALF_LIFE_DAYS
+    AI_COUNTRY_BALANCE = AI_COUNTRY_BALANCE
+    AI_ANALYSIS_MODE = AI_ANALYSIS_MODE
+    AI_MAP_CHUNK_TOKENS = AI_MAP_CHUNK_TOKENS
+    AI_MAP_MAX_IN_FLIGHT = AI_MAP_MAX_IN_FLIGHT
+    AI_MAP_MAX_RETRIES = AI_MAP_MAX_RETRIES
     SCHEDULER_CRON_EXPRESSION = SCHEDULER_CRON_EXPRESSION
     REGIONS = REGIONS
     PROMPTS = prompts
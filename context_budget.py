@@ -0,0 +1,285 @@
+"""
+AI 分析的 Token 预算行选择模块
+
+看板原先把筛选结果的前 100000 行全部发给模型，超出上下文窗口时请求直接失败。
+此模块按模型的上下文窗口计算可用于数据表格的 token 预算，再以趋势（同一国家、同一天的同一搜索词）为单位，
+按价值从高到低选择，直到填满预算：
+    价值      流量（对数）、地区广度（出现的地区数，对数）、时效（距最新日期的天数按半衰期衰减）的加权和
+    国家平衡  同一国家内排名越靠后，价值按 (1 + 排名) ** -AI_COUNTRY_BALANCE 递减，避免单个国家占满预算
+    token 数  按所选格式逐行估算：每列的不同取值只计数一次（tiktoken 批量编码），再加上分隔符的固定开销，
+              不需要对候选表格反复整体编码
+选中的行保持原有顺序（看板按流量排序）。
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+# 导入配置
+from config import current_config
+from prompt_formats import column_strings, ison_value
+from token_counter import count_tokens_batch
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 每行除字段外的分隔符开销（token）：markdown 为 6 个 " | " 和换行，ison 为换行（空格通常并入下一个 token），
+# grouped 的新闻行为 "- " 前缀、" | " 和换行
+ROW_OVERHEAD_TOKENS = {"markdown": 7, "ison": 1, "grouped": 3}
+# grouped 格式每个趋势标题行的固定开销（日期、流量和分隔符）以及每个地区 "CODE:traffic," 的开销
+GROUPED_TREND_OVERHEAD_TOKENS = 12
+GROUPED_REGION_TOKENS = 7
+# 表头、图例等与行数无关的开销
+TABLE_OVERHEAD_TOKENS = {"markdown": 40, "ison": 30, "grouped": 600}
+
+
+def context_window(model_name: str, windows: dict = None, default: int = None) -> int:
+    """
+    查找模型的上下文窗口大小：先精确匹配，再按最长前缀匹配（例如 gpt-4o-2024-08-06 匹配 gpt-4o）
+
+    Args:
+        model_name (str): 模型名称
+        windows (dict, optional): 模型名 -> 上下文 token 数，默认使用 config.AI_CONTEXT_WINDOWS
+        default (int, optional): 未知模型使用的大小，默认使用 config.AI_DEFAULT_CONTEXT_WINDOW
+
+    Returns:
+        int: 上下文窗口的 token 数
+    """
+    if windows is None:
+        windows = current_config.AI_CONTEXT_WINDOWS
+    if default is None:
+        default = current_config.AI_DEFAULT_CONTEXT_WINDOW
+    if model_name in windows:
+        return windows[model_name]
+    # 供应商前缀（如 openai/gpt-4o）不参与匹配
+    name = (model_name or "").rsplit("/", 1)[-1]
+    matches = [prefix for prefix in windows if name.startswith(prefix)]
+    return windows[max(matches, key=len)] if matches else default
+
+
+def _value_tokens(values: list, model_name: str) -> np.ndarray:
+    """字符串列表中每个值的 token 数，不同的值只计数一次"""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    counts = np.asarray(count_tokens_batch(list(uniques), model_name), dtype=np.int64)
+    return counts[codes]
+
+
+def trend_groups(df: pd.DataFrame) -> np.ndarray:
+    """每行所属趋势的编号（同一国家、同一天的同一搜索词为一个趋势），按首次出现的顺序编号"""
+    return df.groupby(["国家", "发布日期", "搜索词"], sort=False, observed=True, dropna=False).ngroup().to_numpy()
+
+
+def row_token_estimates(df: pd.DataFrame, compression_format: str, groups: np.ndarray, model_name: str = "gpt-4o") -> np.ndarray:
+    """
+    估算每个趋势在所选格式中占用的 token 数
+
+    Args:
+        df (pd.DataFrame): 看板筛选后的数据
+        compression_format (str): markdown / ison / grouped
+        groups (np.ndarray): trend_groups 得到的每行趋势编号
+        model_name (str): 用于计数的模型名称
+
+    Returns:
+        np.ndarray: 每个趋势的 token 估算值
+    """
+    trend_count = int(groups.max()) + 1 if len(groups) else 0
+    if compression_format == "grouped":
+        # 新闻行：同一趋势内 (标题, 来源) 重复的行不输出
+        duplicate = pd.DataFrame({"g": groups, "t": df["标题"].to_numpy(), "s": df["信源"].to_numpy()}).duplicated().to_numpy()
+        news = _value_tokens(column_strings(df["标题"]), model_name) + _value_tokens(column_strings(df["信源"]), model_name)
+        news = np.where(duplicate, 0, news + ROW_OVERHEAD_TOKENS["grouped"])
+        costs = np.bincount(groups, weights=news, minlength=trend_count)
+
+        # 趋势标题行：搜索词、国家各一次，地区按不同的地区取值累计地区数
+        first = np.unique(groups, return_index=True)[1]
+        header = _value_tokens(column_strings(df["搜索词"].iloc[first]), model_name) \
+            + _value_tokens(column_strings(df["国家"].iloc[first]), model_name) + GROUPED_TREND_OVERHEAD_TOKENS
+        regions = pd.DataFrame({"g": groups, "r": df["地区"].to_numpy(), "n": df["地区数量"].to_numpy()}) \
+            .drop_duplicates(["g", "r"])
+        region_counts = np.bincount(regions["g"].to_numpy(), weights=regions["n"].to_numpy(), minlength=trend_count)
+        costs[groups[first]] += header + GROUPED_REGION_TOKENS * region_counts[groups[first]]
+        return costs
+
+    transform = ison_value if compression_format == "ison" else None
+    per_row = np.full(len(df), ROW_OVERHEAD_TOKENS.get(compression_format, ROW_OVERHEAD_TOKENS["markdown"]), dtype=np.int64)
+    for column in ("标题", "信源", "搜索词", "流量", "发布日期", "地区", "国家"):
+        series = df[column].astype(int) if column == "流量" else df[column]
+        per_row += _value_tokens(column_strings(series, transform), model_name)
+    return np.bincount(groups, weights=per_row, minlength=trend_count)
+
+
+def trend_scores(df: pd.DataFrame, groups: np.ndarray, weights: dict = None, half_life_days: float = None,
+                 country_balance: float = None) -> np.ndarray:
+    """
+    计算每个趋势的选择优先级（已包含国家平衡的递减）
+
+    Args:
+        df (pd.DataFrame): 看板筛选后的数据
+        groups (np.ndarray): trend_groups 得到的每行趋势编号
+        weights (dict, optional): {"traffic", "breadth", "recency"} 的权重，默认使用 config.AI_SELECTION_WEIGHTS
+        half_life_days (float, optional): 时效的半衰期（天），默认使用 config.AI_RECENCY_HALF_LIFE_DAYS
+        country_balance (float, optional): 国家平衡指数，0 表示不平衡，默认使用 config.AI_COUNTRY_BALANCE
+
+    Returns:
+        np.ndarray: 每个趋势的优先级
+    """
+    if weights is None:
+        weights = current_config.AI_SELECTION_WEIGHTS
+    if half_life_days is None:
+        half_life_days = current_config.AI_RECENCY_HALF_LIFE_DAYS
+    if country_balance is None:
+        country_balance = current_config.AI_COUNTRY_BALANCE
+
+    rows = pd.DataFrame({
+        "g": groups,
+        "traffic": df["流量"].to_numpy(dtype=np.int64),
+        "region": df["地区"].to_numpy(),
+        "region_count": df["地区数量"].to_numpy(dtype=np.int64),
+        "day": pd.to_datetime(df["发布日期"].to_numpy(), errors="coerce"),
+        "country": df["国家"].astype(str).to_numpy(),
+    })
+    trends = rows.groupby("g", sort=True).agg(traffic=("traffic", "max"), day=("day", "first"), country=("country", "first"))
+    breadth = rows.drop_duplicates(["g", "region"]).groupby("g", sort=True)["region_count"].sum()
+
+    def normalized_log(values):
+        values = np.log1p(np.maximum(values.to_numpy(dtype=float), 0))
+        peak = values.max() if len(values) else 0
+        return values / peak if peak > 0 else values
+
+    age_days = (trends["day"].max() - trends["day"]).dt.days.fillna(0).to_numpy(dtype=float)
+    recency = np.power(0.5, age_days / half_life_days) if half_life_days and half_life_days > 0 else np.ones(len(trends))
+    scores = weights.get("traffic", 0) * normalized_log(trends["traffic"]) \
+        + weights.get("breadth", 0) * normalized_log(breadth) \
+        + weights.get("recency", 0) * recency
+
+    if country_balance:
+        # 同一国家内按优先级排名（0 起），排名越靠后递减越多
+        rank = pd.Series(scores, index=trends.index).groupby(trends["country"]).rank(ascending=False, method="first").to_numpy() - 1
+        scores = scores / np.power(1 + rank, country_balance)
+    return scores
+
+
+class TrendCosts:
+    """一次筛选结果的趋势编号、token 估算和优先级，调整预算重新选择时复用"""
+
+    def __init__(self, df: pd.DataFrame, compression_format: str, model_name: str = "gpt-4o"):
+        self.df = df
+        self.groups = trend_groups(df)
+        self.costs = row_token_estimates(df, compression_format, self.groups, model_name)
+        self.overhead = TABLE_OVERHEAD_TOKENS.get(compression_format, TABLE_OVERHEAD_TOKENS["markdown"])
+        self.total = int(self.costs.sum()) + self.overhead
+        self._order = None
+
+    @property
+    def order(self) -> np.ndarray:
+        """按优先级从高到低排列的趋势编号（只在需要截断时计算）"""
+        if self._order is None:
+            self._order = np.argsort(-trend_scores(self.df, self.groups), kind="stable")
+        return self._order
+
+
+def select_rows(df: pd.DataFrame, compression_format: str, token_budget: int, model_name: str = "gpt-4o",
+                trend_costs: TrendCosts = None) -> tuple:
+    """
+    在 token 预算内按优先级选择趋势
+
+    Args:
+        df (pd.DataFrame): 看板筛选后的数据
+        compression_format (str): markdown / ison / grouped
+        token_budget (int): 可用于数据表格的 token 数
+        model_name (str): 用于计数的模型名称
+        trend_costs (TrendCosts, optional): 同一 df 和格式已计算的估算，为 None 时重新计算
+
+    Returns:
+        tuple: (选中的行组成的 DataFrame（保持原有顺序）, 统计信息字典
+               {trends, total_trends, rows, total_rows, estimated_tokens, budget, truncated})
+    """
+    stats = {"trends": 0, "total_trends": 0, "rows": 0, "total_rows": len(df),
+             "estimated_tokens": 0, "budget": int(token_budget), "truncated": False}
+    if df.empty:
+        return df, stats
+
+    if trend_costs is None:
+        trend_costs = TrendCosts(df, compression_format, model_name)
+    costs = trend_costs.costs
+    stats["total_trends"] = len(costs)
+    if trend_costs.total <= token_budget:
+        stats.update(trends=len(costs), rows=len(df), estimated_tokens=trend_costs.total)
+        return df, stats
+
+    # 按优先级从高到低贪心选择，放不下的趋势跳过，继续尝试更小的趋势
+    remaining = token_budget - trend_costs.overhead
+    selected = np.zeros(len(costs), dtype=bool)
+    smallest = costs.min()
+    for trend in trend_costs.order:
+        if costs[trend] <= remaining:
+            selected[trend] = True
+            remaining -= costs[trend]
+            if remaining < smallest:
+                break
+
+    positions = np.flatnonzero(selected[trend_costs.groups])
+    stats.update(trends=int(selected.sum()), rows=len(positions), truncated=True,
+                 estimated_tokens=int(token_budget - remaining))
+    return df.iloc[positions], stats
+
+
+def fit_to_budget(df: pd.DataFrame, compression_format: str, token_budget: int, render, count,
+                  model_name: str = "gpt-4o", max_attempts: int = 3, fill_ratio: float = 0.9) -> tuple:
+    """
+    选择趋势并生成内容，用实际计数校正估算：超出预算时按实际/估算的比例缩小预算重新选择，
+    填充不足 fill_ratio 时放大预算重新选择
+
+    只接受实际 token 数不超过 token_budget 的结果：超出时不受 max_attempts 限制，持续缩小直到放得下，
+    一个趋势都放不下（或预算为 0）时返回空内容。max_attempts 只限制为提高填充率而进行的尝试。
+    每次尝试只对选中的结果（不超过预算大小）生成并计数一次，估算与分词器的偏差（例如不同文字的字符/token 比例）由校正吸收。
+
+    Args:
+        df (pd.DataFrame): 看板筛选后的数据
+        compression_format (str): markdown / ison / grouped
+        token_budget (int): 可用于数据表格的 token 数
+        render (callable): 生成内容的函数 DataFrame -> str
+        count (callable): 计数函数 str -> token 数
+        model_name (str): 用于估算的模型名称
+        max_attempts (int): 为提高填充率最多选择的次数
+        fill_ratio (float): 低于预算的该比例时尝试放入更多趋势
+
+    Returns:
+        tuple: (内容, 实际 token 数, 统计信息字典（见 select_rows，另含实际的 tokens）)
+    """
+    trend_costs = TrendCosts(df, compression_format, model_name) if not df.empty else None
+    best = None
+    estimate_budget = int(token_budget)
+    attempts = 0
+    while estimate_budget > 0:
+        selection, stats = select_rows(df, compression_format, estimate_budget, model_name, trend_costs)
+        if selection.empty:
+            break
+        content = render(selection)
+        tokens = count(content)
+        stats.update(tokens=tokens, budget=int(token_budget))
+        attempts += 1
+        if tokens <= token_budget and (best is None or tokens > best[1]):
+            best = (content, tokens, stats)
+        if best is not None and (not stats["truncated"] or best[1] >= token_budget * fill_ratio
+                                 or attempts >= max_attempts or tokens == 0):
+            break
+        if tokens > token_budget:
+            # 超出预算：按实际计数与估算的比例缩小并多留一点余量，至少缩小 1 个 token，保证最终能放得下
+            estimate_budget = min(int(estimate_budget * token_budget / tokens * 0.98), estimate_budget - 1)
+        else:
+            estimate_budget = int(estimate_budget * token_budget / tokens)
+    if best is None:
+        # 预算内放不下任何趋势：不发送数据
+        stats = {"trends": 0, "total_trends": len(trend_costs.costs) if trend_costs is not None else 0,
+                 "rows": 0, "total_rows": len(df), "estimated_tokens": 0, "budget": int(token_budget),
+                 "truncated": not df.empty, "tokens": 0}
+        logger.info(f"Token 预算 {int(token_budget):,} 内放不下任何趋势，不发送数据")
+        return "", 0, stats
+
+    stats = best[2]
+    if stats["truncated"]:
+        logger.info(f"按 Token 预算选择了 {stats['trends']}/{stats['total_trends']} 个趋势（{stats['rows']}/{stats['total_rows']} 行），"
+                    f"{stats['tokens']:,}/{token_budget:,} tokens")
+    return best
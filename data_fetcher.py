@@ -7,11 +7,28 @@ import json
 import os
 import logging
 import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from urllib.parse import urlsplit
 
 # 导入配置
 from config import current_config
+from feed_cache import FeedValidatorCache
+from merge_index import MergeIndex
+from trend_store import create_trend_store
+from trend_rollups import write_day_rollup
+from trend_storage import (
+    append_journal,
+    atomic_write_json,
+    compact_journal,
+    compact_stale_journals,
+    get_journal_filename,
+    journal_size,
+    load_day_records
+)
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -19,6 +36,83 @@ logger = logging.getLogger(__name__)
 # Google Trends 命名空间
 HT_NS = 'https://trends.google.com/trending/rss'
 
+class TokenBucket:
+    """
+    线程安全的令牌桶，用于限制对同一主机的请求速率。
+    
+    每秒补充 rate 个令牌，最多累积 capacity 个；每次请求消耗一个令牌，
+    令牌不足时阻塞等待，从而在并发拉取时保持平均请求速率不超过 rate。
+    try_acquire 不阻塞，异步拉取器（async_fetcher）用它配合 asyncio.sleep 等待。
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        # 暂停期内不补充令牌
+        elapsed = max(0.0, now - max(self.updated_at, self.paused_until))
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self) -> float:
+        """
+        尝试获取一个令牌（不阻塞）
+
+        Returns:
+            float: 获取成功时为 0，否则为需要等待的秒数
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """获取一个令牌，令牌不足或处于暂停期时阻塞等待"""
+        while True:
+            wait_time = self.try_acquire()
+            if wait_time <= 0:
+                return
+            time.sleep(wait_time)
+
+    def penalize(self, seconds: float):
+        """收到 429 等限流响应时，清空令牌并暂停该主机的所有请求一段时间"""
+        with self.lock:
+            self.tokens = 0.0
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class HostRateLimiter:
+    """按主机维护令牌桶，所有工作线程共享同一份礼貌性预算"""
+
+    def __init__(self, rate: float = None, capacity: int = None):
+        self.rate = rate if rate is not None else current_config.REQUEST_RATE_PER_HOST
+        self.capacity = capacity if capacity is not None else current_config.REQUEST_BURST_PER_HOST
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.capacity)
+            return self.buckets[host]
+
+    def acquire(self, url: str):
+        self.bucket_for(url).acquire()
+
+    def penalize(self, url: str, seconds: float):
+        self.bucket_for(url).penalize(seconds)
+
 def get_output_filename(country_name: str = None):
     """
     生成当天的输出文件名，格式为 OUTPUT_DIR/[country_name]/OUTPUT_FILE_PREFIX_YYYY-MM-DD.OUTPUT_FILE_EXTENSION
@@ -43,6 +137,141 @@ def get_output_filename(country_name: str = None):
         f"{current_config.OUTPUT_FILE_PREFIX}{today_str}{current_config.OUTPUT_FILE_EXTENSION}"
     )
 
+# 预先拼接好的标签名，避免在每个条目上重复格式化命名空间路径
+TAG_CHANNEL = 'channel'
+TAG_ITEM = 'item'
+TAG_TITLE = 'title'
+TAG_PUB_DATE = 'pubDate'
+TAG_APPROX_TRAFFIC = f'{{{HT_NS}}}approx_traffic'
+TAG_PICTURE = f'{{{HT_NS}}}picture'
+TAG_NEWS_ITEM = f'{{{HT_NS}}}news_item'
+# 新闻子元素标签 -> 输出字段名
+NEWS_FIELD_TAGS = {
+    f'{{{HT_NS}}}news_item_title': 'title',
+    f'{{{HT_NS}}}news_item_url': 'url',
+    f'{{{HT_NS}}}news_item_source': 'source',
+    f'{{{HT_NS}}}news_item_picture': 'picture',
+}
+# 趋势条目子元素标签
+ITEM_FIELD_TAGS = frozenset((TAG_TITLE, TAG_PUB_DATE, TAG_APPROX_TRAFFIC, TAG_PICTURE))
+# 每次喂给增量解析器的字符数
+PARSE_CHUNK_SIZE = 64 * 1024
+
+@lru_cache(maxsize=1024)
+def parse_rss_date(pub_date_str: str) -> tuple:
+    """
+    将 RSS 日期字符串转换为 (ISO 格式字符串, UTC 时间戳秒数)；
+    同一个 feed 中大量条目共享相同的发布时间，因此缓存结果
+    
+    Raises:
+        ValueError, TypeError: 日期格式无法解析时抛出
+    """
+    # parsedate_to_datetime 可以处理 RFC 2822 格式
+    pub_date = parsedate_to_datetime(pub_date_str)
+    if pub_date.tzinfo is None:
+        # 如果解析出的时间没有时区信息，假设为 UTC
+        pub_date = pub_date.replace(tzinfo=timezone.utc)
+    return pub_date.isoformat(), int(pub_date.timestamp())
+
+def build_trend_item(fields: dict, news_list: list, region_name: str, country_name: str = None) -> dict:
+    """
+    将一个 <item> 中收集到的字段文本组装为趋势字典
+    
+    Args:
+        fields (dict): 子元素标签 -> 文本（None 表示元素存在但没有文本）
+        news_list (list): 已解析的相关新闻列表
+        region_name (str): 数据所属的区域名称
+        country_name (str, optional): 数据所属的国家名称
+    
+    Returns:
+        dict: 趋势数据字典
+    """
+    title_text = fields.get(TAG_TITLE)
+    title = title_text.strip() if title_text else '无标题'
+
+    pub_date_str = fields.get(TAG_PUB_DATE) or datetime.now(timezone.utc).isoformat()
+    
+    # 尝试解析 RSS 格式的日期 (e.g., "Mon, 13 Oct 2025 01:40:00 -0700")
+    try:
+        pub_date_iso, pub_ts = parse_rss_date(pub_date_str)
+    except (ValueError, TypeError) as e:
+        logger.warning(f"无法解析 {region_name} - {title} 的日期: {pub_date_str} ({e}), 使用当前时间")
+        now = datetime.now(timezone.utc)
+        pub_date_iso, pub_ts = now.isoformat(), int(now.timestamp())
+
+    traffic_str = fields.get(TAG_APPROX_TRAFFIC) or '0'
+    # 移除流量字符串中的逗号和加号，然后转换为整数
+    traffic_digits = traffic_str.replace(',', '').replace('+', '')
+    traffic_num = int(traffic_digits) if traffic_digits.isdigit() else 0
+
+    return {
+        'title': title,
+        'traffic_str': traffic_str,  # 保留原始格式，用于后续处理
+        'traffic_num': traffic_num,  # 用于比较和排序的数值
+        'pub_date_str': pub_date_str, # 保留原始格式，用于后续处理
+        'pub_date': pub_date_iso, # 保存为 ISO 格式字符串
+        'pub_ts': pub_ts, # UTC 时间戳（秒），看板据此计算 UTC 日期，无需再解析字符串
+        'picture': fields.get(TAG_PICTURE) or '',
+        'news': news_list,
+        'regions': [region_name], # 初始化区域列表
+        'country': country_name if country_name else None # 添加国家信息
+    }
+
+def iter_parse_trends(xml_content, region_name: str, country_name: str = None):
+    """
+    以流式方式解析 RSS XML，每当一个 <item> 结束时立即产出对应的趋势字典。
+    
+    使用 XMLPullParser 分块喂入数据，只监听元素结束事件；条目结束时遍历一次其直接子元素
+    （不再对每个字段做命名空间路径的 find），处理完成后立即清空该条目，
+    峰值内存不随 feed 条目数量增长。
+    
+    Args:
+        xml_content (str | bytes): XML格式的趋势数据
+        region_name (str): 数据所属的区域名称
+        country_name (str, optional): 数据所属的国家名称
+    
+    Yields:
+        dict: 趋势数据字典
+    
+    Raises:
+        ET.ParseError: XML 格式错误时抛出
+    """
+    parser = ET.XMLPullParser(events=('end',))
+    channel_found = False
+
+    for offset in range(0, len(xml_content), PARSE_CHUNK_SIZE):
+        parser.feed(xml_content[offset:offset + PARSE_CHUNK_SIZE])
+        for _, elem in parser.read_events():
+            tag = elem.tag
+            if tag == TAG_ITEM:
+                fields = {}
+                news_list = []
+                for child in elem:
+                    child_tag = child.tag
+                    if child_tag == TAG_NEWS_ITEM:
+                        news = {}
+                        for news_child in child:
+                            field = NEWS_FIELD_TAGS.get(news_child.tag)
+                            if field is not None and field not in news:
+                                news[field] = news_child.text
+                        news_list.append({
+                            'title': news.get('title') or '',
+                            'url': news.get('url') or '',
+                            'source': news.get('source') or '未知来源',
+                            'picture': news.get('picture') or ''
+                        })
+                    elif child_tag in ITEM_FIELD_TAGS and child_tag not in fields:
+                        fields[child_tag] = child.text
+                # 释放已处理的条目
+                elem.clear()
+                yield build_trend_item(fields, news_list, region_name, country_name)
+            elif tag == TAG_CHANNEL:
+                channel_found = True
+
+    parser.close()
+    if not channel_found:
+        logger.warning(f"在 {region_name} 的数据中未找到 channel 元素")
+
 def parse_xml_to_dict(xml_content: str, region_name: str, country_name: str = None) -> list:
     """
     解析 XML 内容并返回一个包含趋势数据的字典列表。
@@ -56,77 +285,16 @@ def parse_xml_to_dict(xml_content: str, region_name: str, country_name: str = No
     Returns:
         list: 包含趋势数据的字典列表
     """
-    trends = []
     try:
-        root = ET.fromstring(xml_content)
-        channel = root.find('channel')
-        if channel is None:
-            logger.warning(f"在 {region_name} 的数据中未找到 channel 元素")
-            return trends
-
-        items = channel.findall('item')
-        for item in items:
-            title_elem = item.find('title')
-            title = title_elem.text.strip() if title_elem is not None and title_elem.text else '无标题'
-
-            pub_date_elem = item.find('pubDate')
-            pub_date_str = pub_date_elem.text if pub_date_elem is not None and pub_date_elem.text else datetime.now(timezone.utc).isoformat()
-            
-            # 尝试解析 RSS 格式的日期 (e.g., "Mon, 13 Oct 2025 01:40:00 -0700")
-            try:
-                # parsedate_to_datetime 可以处理 RFC 2822 格式
-                pub_date = parsedate_to_datetime(pub_date_str)
-                if pub_date.tzinfo is None:
-                    # 如果解析出的时间没有时区信息，假设为 UTC
-                    pub_date = pub_date.replace(tzinfo=timezone.utc)
-            except (ValueError, TypeError) as e:
-                logger.warning(f"无法解析 {region_name} - {title} 的日期: {pub_date_str} ({e}), 使用当前时间")
-                pub_date = datetime.now(timezone.utc)
-
-            traffic_elem = item.find(f'{{{HT_NS}}}approx_traffic')
-            traffic_str = traffic_elem.text if traffic_elem is not None and traffic_elem.text else '0'
-            # 移除流量字符串中的逗号和加号，然后转换为整数
-            traffic_num = int(traffic_str.replace(',', '').replace('+', '')) if traffic_str.replace(',', '').replace('+', '').isdigit() else 0
-
-            picture_elem = item.find(f'{{{HT_NS}}}picture')
-            picture = picture_elem.text if picture_elem is not None and picture_elem.text else ''
-
-            # 解析相关新闻
-            news_items = item.findall(f'{{{HT_NS}}}news_item')
-            news_list = []
-            for news_item in news_items:
-                title_elem = news_item.find(f'{{{HT_NS}}}news_item_title')
-                url_elem = news_item.find(f'{{{HT_NS}}}news_item_url')
-                source_elem = news_item.find(f'{{{HT_NS}}}news_item_source')
-                pic_elem = news_item.find(f'{{{HT_NS}}}news_item_picture')
-
-                news_list.append({
-                    'title': title_elem.text if title_elem is not None and title_elem.text else '',
-                    'url': url_elem.text if url_elem is not None and url_elem.text else '',
-                    'source': source_elem.text if source_elem is not None and source_elem.text else '未知来源',
-                    'picture': pic_elem.text if pic_elem is not None and pic_elem.text else ''
-                })
-
-            trends.append({
-                'title': title,
-                'traffic_str': traffic_str,  # 保留原始格式，用于后续处理
-                'traffic_num': traffic_num,  # 用于比较和排序的数值
-                'pub_date_str': pub_date_str, # 保留原始格式，用于后续处理
-                'pub_date': pub_date.isoformat(), # 保存为 ISO 格式字符串
-                'picture': picture,
-                'news': news_list,
-                'regions': [region_name], # 初始化区域列表
-                'country': country_name if country_name else None # 添加国家信息
-            })
+        return list(iter_parse_trends(xml_content, region_name, country_name))
     except ET.ParseError as e:
         logger.error(f"解析 {region_name} 的 XML 数据时出错: {e}")
         return [] # 解析失败返回空列表
     except Exception as e:
         logger.error(f"处理 {region_name} 的 XML 数据时发生未知错误: {e}")
         return [] # 处理失败返回空列表
-    return trends
 
-def fetch_single_region_with_session(session: requests.Session, region: dict, country_name: str = None, max_retries: int = None) -> list:
+def fetch_single_region_with_session(session: requests.Session, region: dict, country_name: str = None, max_retries: int = None, rate_limiter: HostRateLimiter = None, validator_cache: FeedValidatorCache = None) -> list:
     """
     使用同一个 session 拉取单个区域的 RSS 数据，并实现重试逻辑。
     
@@ -135,6 +303,9 @@ def fetch_single_region_with_session(session: requests.Session, region: dict, co
         region (dict): 包含区域信息的字典，需包含 'code' 和 'name' 键
         country_name (str, optional): 数据所属的国家名称
         max_retries (int, optional): 最大重试次数，如果为 None 则使用配置中的值
+        rate_limiter (HostRateLimiter, optional): 主机限速器，提供时每次请求前先获取令牌
+        validator_cache (FeedValidatorCache, optional): RSS 验证器缓存，提供时发送条件请求，
+            源数据未变化时直接返回空列表，跳过解析和合并；新的验证器只暂存，见 save_country_trends_and_validators
         
     Returns:
         list: 包含趋势数据的字典列表
@@ -150,16 +321,32 @@ def fetch_single_region_with_session(session: requests.Session, region: dict, co
         try:
             logger.info(f"正在拉取 {region['name']} ({region['code']}) 的数据... (尝试 {attempt + 1}/{max_retries})")
             
-            response = session.get(url, timeout=current_config.REQUEST_TIMEOUT)
+            if rate_limiter is not None:
+                rate_limiter.acquire(url)
+            headers = validator_cache.request_headers(region['code']) if validator_cache is not None else None
+            response = session.get(url, headers=headers, timeout=current_config.REQUEST_TIMEOUT)
             
-            if response.status_code == 200:
+            if response.status_code == 304:
+                logger.info(f"{region['name']} 数据未变化 (304)，跳过解析")
+                return []
+            elif response.status_code == 200:
                 logger.debug(f"{region['name']} 数据拉取成功，长度: {len(response.text)}")
-                return parse_xml_to_dict(response.text, region['name'], country_name)
+                if validator_cache is not None and validator_cache.is_unchanged(region['code'], response.content):
+                    logger.info(f"{region['name']} 数据内容未变化，跳过解析")
+                    return []
+                trends = parse_xml_to_dict(response.text, region['name'], country_name)
+                if validator_cache is not None and trends:
+                    validator_cache.update(region['code'], response.headers, response.content)
+                return trends
             elif response.status_code == 429:
                 logger.warning(f"收到 429 错误，为 {region['name']} 等待更长时间后重试...")
                 # 429 错误后等待 5-8 秒
                 wait_time = 5 + random.uniform(1, 3)
-                time.sleep(wait_time)
+                if rate_limiter is not None:
+                    # 并发模式下暂停整个主机的请求，而不仅是当前线程
+                    rate_limiter.penalize(url, wait_time)
+                else:
+                    time.sleep(wait_time)
                 continue # 立即进入下一次重试循环
             elif response.status_code >= 500:
                 logger.warning(f"收到服务器错误 {response.status_code}，为 {region['name']} 等待后重试...")
@@ -186,7 +373,7 @@ def fetch_single_region_with_session(session: requests.Session, region: dict, co
     logger.error(f"拉取 {region['name']} 数据失败 (已重试 {max_retries} 次)")
     return [] # 返回空列表表示失败
 
-def merge_and_deduplicate(new_trends: list, existing_trends: list) -> list:
+def merge_and_deduplicate(new_trends: list, existing_trends: list, index: MergeIndex = None) -> list:
     """
     将新拉取的数据与现有数据合并并去重。
     如果标题相同，则更新区域列表、热度和时间。
@@ -194,88 +381,118 @@ def merge_and_deduplicate(new_trends: list, existing_trends: list) -> list:
     Args:
         new_trends (list): 新拉取的趋势数据列表
         existing_trends (list): 现有的趋势数据列表
+        index (MergeIndex, optional): 与 existing_trends 对应的合并索引；提供时只触及发生变化的记录，
+            为 None 时根据 existing_trends 临时构建
         
     Returns:
         list: 合并并去重后的趋势数据列表
     """
-    existing_map = {item['title']: item for item in existing_trends}
-    updated_titles = set()
-
-    for new_item in new_trends:
-        title = new_item['title']
-        if title in existing_map:
-            existing_item = existing_map[title]
-            # 更新区域（合并集合）
-            existing_item['regions'] = list(set(existing_item['regions'] + new_item['regions']))
-            # 更新国家信息（合并国家集合）
-            if existing_item.get('country') and new_item.get('country'):
-                # 如果两者都有国家信息，合并为集合
-                if isinstance(existing_item['country'], str):
-                    existing_item['country'] = {existing_item['country']}
-                if isinstance(new_item['country'], str):
-                    new_item['country'] = {new_item['country']}
-                existing_item['country'] = existing_item['country'].union(new_item['country'])
-            elif new_item.get('country'):
-                # 如果旧项没有国家信息，使用新项的
-                existing_item['country'] = new_item['country']
-            # 更新热度（保留较高的）
-            if new_item['traffic_num'] > existing_item['traffic_num']:
-                existing_item['traffic_str'] = new_item['traffic_str']
-                existing_item['traffic_num'] = new_item['traffic_num']
-            # 更新时间（保留较新的）
-            if new_item['pub_date'] > existing_item['pub_date']:
-                existing_item['pub_date_str'] = new_item['pub_date_str']
-                existing_item['pub_date'] = new_item['pub_date']
-            # 更新图片（如果新项有图片且旧项没有）
-            if not existing_item.get('picture') and new_item.get('picture'):
-                existing_item['picture'] = new_item['picture']
-            # 更新新闻（简单合并，可根据需要调整策略）
-            existing_item['news'].extend(new_item['news'])
-            # 防止重复添加
-            updated_titles.add(title)
-        else:
-            # 如果是新标题，直接添加
-            existing_trends.append(new_item)
-
-    # 去除新闻列表中的重复项（基于标题和来源）
-    for item in existing_trends:
-        seen_news = set()
-        unique_news = []
-        for news in item['news']:
-            # 创建一个用于判断重复性的键
-            news_key = (news.get('title', ''), news.get('source', ''))
-            if news_key not in seen_news:
-                seen_news.add(news_key)
-                unique_news.append(news)
-        item['news'] = unique_news
-
+    if index is None:
+        index = MergeIndex.build(existing_trends)
+    index.merge(new_trends, existing_trends)
     return existing_trends
 
-def fetch_all_regions(regions_config: dict) -> list:
+def create_validator_cache() -> FeedValidatorCache:
+    """根据配置创建 RSS 验证器缓存，未启用时返回 None"""
+    if current_config.USE_FEED_VALIDATOR_CACHE:
+        return FeedValidatorCache()
+    return None
+
+def save_country_trends_and_validators(country_name: str, country_trends: list, regions: list,
+                                      validator_cache: FeedValidatorCache = None) -> bool:
     """
-    拉取所有指定国家和区域的趋势数据
+    保存某个国家的数据，并且只在保存成功后提交这些区域暂存的 RSS 验证器；
+    保存失败（或抛出异常）时丢弃，下次运行重新拉取并解析，而不是收到 304 后跳过未保存的数据。
+
+    Args:
+        country_name (str): 国家名称
+        country_trends (list): 该国家新拉取的趋势数据列表
+        regions (list): 该国家的区域配置（含 'code'）
+        validator_cache (FeedValidatorCache, optional): RSS 验证器缓存
+
+    Returns:
+        bool: 保存是否成功
+    """
+    saved = False
+    try:
+        saved = save_country_trends(country_name, country_trends)
+    finally:
+        if validator_cache is not None:
+            region_codes = [region['code'] for region in regions]
+            if saved:
+                validator_cache.commit(region_codes)
+            else:
+                validator_cache.discard(region_codes)
+    return saved
+
+def save_country_trends(country_name: str, country_trends: list) -> bool:
+    """
+    将某个国家新拉取的数据合并到当天的文件中并保存。
+    
+    区域数据未变化时会被跳过（返回空列表），因此这里必须与当天已有数据合并，
+    而不能直接覆盖当天的文件；没有任何新数据时不写文件。
+    合并通过根据当天数据构建的 MergeIndex 完成，只触及发生变化的记录。
+    STORAGE_MODE 为 journal 时，变化的记录只追加到日志中，而不重写整个快照。
     
     Args:
-        regions_config (dict): 包含国家和区域信息的字典结构，格式为：
-            {
-                "Country1": {
-                    "name": "Country1",
-                    "regions": [{"code": "REG1", "name": "Region1"}, ...]
-                },
-                ...
-            }
+        country_name (str): 国家名称
+        country_trends (list): 该国家新拉取的趋势数据列表
         
     Returns:
-        list: 所有国家和区域的趋势数据列表
+        bool: 保存是否成功（无新数据时返回 True）
+    """
+    if not country_trends:
+        logger.info(f"{country_name} 没有新的数据，跳过保存")
+        return True
+    output_filename = get_output_filename(country_name)
+    if current_config.STORAGE_MODE == "journal":
+        # 跨天后前一天的日志不会再被追加，先折叠进对应的快照
+        compact_stale_journals(output_filename)
+    existing_data = load_existing_data(output_filename)
+    index = MergeIndex.build(existing_data)
+
+    changed = index.merge(country_trends, existing_data)
+    if not changed:
+        logger.info(f"{country_name} 的数据没有变化，跳过保存")
+        return True
+    changed_records = [existing_data[offset] for offset in sorted(changed)]
+    # 只有新增或修改过的记录可能带有不需要的字段
+    remove_unnecessary_fields(changed_records)
+    logger.info(f"{country_name} 合并完成，{len(changed)} 条记录新增或更新")
+
+    if current_config.STORAGE_MODE == "journal" and os.path.exists(output_filename):
+        # 追加模式：只把变化的记录写入日志，日志过大时再折叠进快照
+        if not append_journal(output_filename, changed_records):
+            return False
+        sync_trend_store(output_filename, changed_records)
+        if journal_size(output_filename) >= current_config.JOURNAL_COMPACT_THRESHOLD_BYTES:
+            compact_journal(output_filename)
+    elif not save_trends_data(existing_data, output_filename, changed_records=changed_records):
+        return False
+    update_day_rollup(output_filename, country_name, existing_data)
+    return True
+
+def create_session(pool_maxsize: int = None) -> requests.Session:
+    """
+    创建带重试策略、连接池、User-Agent 和代理配置的 requests session
+    
+    Args:
+        pool_maxsize (int, optional): 连接池大小，并发拉取时应不小于工作线程数
+        
+    Returns:
+        requests.Session: 配置好的会话对象
     """
-    # 配置 requests session 以实现重试策略和连接池
     session = requests.Session()
     retry_strategy = Retry(
         total=current_config.REQUEST_MAX_RETRIES,
         backoff_factor=1, # 重试间隔的乘数因子
-        status_forcelist=[429, 500, 502, 503, 504],
+        # 429 不在此重试：交给 fetch_single_region_with_session 处理，并发模式下由速率限制器暂停整个主机的请求
+        status_forcelist=[500, 502, 503, 504],
     )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    if pool_maxsize:
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=pool_maxsize)
+    else:
+        adapter = HTTPAdapter(max_retries=retry_strategy)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     # 设置 User-Agent
@@ -291,6 +508,39 @@ def fetch_all_regions(regions_config: dict) -> list:
             "https": proxy_url
         }
         logger.info(f"已启用代理: {proxy_url}")
+    return session
+
+def fetch_all_regions(regions_config: dict, mode: str = None) -> list:
+    """
+    拉取所有指定国家和区域的趋势数据
+    
+    Args:
+        regions_config (dict): 包含国家和区域信息的字典结构，格式为：
+            {
+                "Country1": {
+                    "name": "Country1",
+                    "regions": [{"code": "REG1", "name": "Region1"}, ...]
+                },
+                ...
+            }
+        mode (str, optional): 拉取模式，sequential、concurrent 或 async，为 None 时使用配置中的 FETCH_MODE
+        
+    Returns:
+        list: 所有国家和区域的趋势数据列表
+    """
+    if mode is None:
+        mode = current_config.FETCH_MODE
+    if mode == "concurrent":
+        return fetch_all_regions_concurrent(regions_config)
+    if mode == "async":
+        # 延迟导入，避免与 async_fetcher 循环导入，并且仅在需要时依赖 aiohttp
+        import asyncio
+        from async_fetcher import fetch_all_regions_async
+        return asyncio.run(fetch_all_regions_async(regions_config))
+
+    # 配置 requests session 以实现重试策略和连接池
+    session = create_session()
+    validator_cache = create_validator_cache()
 
     all_new_trends = []
     # 遍历所有国家
@@ -300,24 +550,116 @@ def fetch_all_regions(regions_config: dict) -> list:
         
         # 遍历该国家的所有区域
         for region in country_data['regions']:
-            trends_data = fetch_single_region_with_session(session, region, country_name)
+            trends_data = fetch_single_region_with_session(session, region, country_name, validator_cache=validator_cache)
             country_trends.extend(trends_data)
             
             # 每拉取完一个区域后，等待指定时间，避免过于频繁的请求
             delay_min, delay_max = current_config.REQUEST_DELAY_BETWEEN_REGIONS
             time.sleep(delay_min + random.uniform(0, delay_max - delay_min))
         
-        # 保存该国家的数据
-        save_trends_data(country_trends, get_output_filename(country_name))
+        # 保存该国家的数据，成功后才提交验证器
+        save_country_trends_and_validators(country_name, country_trends, country_data['regions'], validator_cache)
         all_new_trends.extend(country_trends)
 
     # 关闭 session
     session.close()
+    if validator_cache is not None:
+        validator_cache.save()
+
+    logger.info(f"总共拉取到 {len(all_new_trends)} 个新条目")
+    return all_new_trends
+
+def fetch_all_regions_concurrent(regions_config: dict, max_workers: int = None) -> list:
+    """
+    使用有界线程池并发拉取所有指定国家和区域的趋势数据。
+    
+    所有区域请求共享一个 session 和一个按主机划分的令牌桶限速器，
+    用令牌桶代替固定的区域间等待，总耗时接近最慢的请求，同时平均速率
+    不超过 REQUEST_RATE_PER_HOST，避免触发 Google 的 429 限流。
+    
+    Args:
+        regions_config (dict): 包含国家和区域信息的字典结构，格式同 fetch_all_regions
+        max_workers (int, optional): 最大工作线程数，为 None 时使用配置中的 FETCH_MAX_WORKERS
+        
+    Returns:
+        list: 所有国家和区域的趋势数据列表（按配置中的国家和区域顺序排列）
+    """
+    if max_workers is None:
+        max_workers = current_config.FETCH_MAX_WORKERS
+
+    session = create_session(pool_maxsize=max_workers)
+    rate_limiter = HostRateLimiter()
+    validator_cache = create_validator_cache()
+
+    all_new_trends = []
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trends-fetch") as executor:
+            # 先提交所有国家的所有区域，保留提交顺序以便按配置顺序汇总结果
+            country_futures = {}
+            for country_name, country_data in regions_config.items():
+                logger.info(f"开始拉取 {country_name} 的数据 (并发模式)...")
+                country_futures[country_name] = [
+                    executor.submit(fetch_single_region_with_session, session, region, country_name, None, rate_limiter, validator_cache)
+                    for region in country_data['regions']
+                ]
+
+            for country_name, futures in country_futures.items():
+                country_trends = []
+                for future in futures:
+                    try:
+                        country_trends.extend(future.result())
+                    except Exception as e:
+                        logger.error(f"并发拉取 {country_name} 的区域数据时发生错误: {e}")
+
+                # 保存该国家的数据，成功后才提交验证器
+                save_country_trends_and_validators(
+                    country_name, country_trends, regions_config[country_name]['regions'], validator_cache
+                )
+                all_new_trends.extend(country_trends)
+    finally:
+        session.close()
+        if validator_cache is not None:
+            validator_cache.save()
 
     logger.info(f"总共拉取到 {len(all_new_trends)} 个新条目")
     return all_new_trends
 
-def save_trends_data(trends_data: list, output_filename: str = None, country_name: str = None) -> bool:
+def sync_trend_store(output_filename: str, records: list):
+    """
+    把写入每日文件的记录 upsert 进 SQLite 趋势存储（未启用时什么都不做）。
+    JSON 文件仍是主存储，同步失败只记录日志，不影响保存结果。
+    
+    Args:
+        output_filename (str): 记录所属的每日快照文件路径
+        records (list): 需要同步的记录
+    """
+    store = create_trend_store()
+    if store is None or not records:
+        return
+    try:
+        store.upsert_trends(output_filename, records)
+    except Exception as e:
+        logger.error(f"同步 {output_filename} 到 SQLite 趋势存储时出错: {e}")
+
+def update_day_rollup(output_filename: str, country_name: str, records: list):
+    """
+    每日文件写入后重新计算该文件的聚合汇总，供看板概览和图表直接读取（未启用时什么都不做）
+    
+    Args:
+        output_filename (str): 每日快照文件路径
+        country_name (str): 国家名称（即国家目录名）
+        records (list): 该文件中的全部趋势记录
+    """
+    if not current_config.USE_DAILY_ROLLUPS:
+        return
+    try:
+        base_name = os.path.splitext(os.path.basename(output_filename))[0]
+        file_date = datetime.strptime(base_name[len(current_config.OUTPUT_FILE_PREFIX):], '%Y-%m-%d').date()
+        write_day_rollup(output_filename, records, file_date, country_name)
+    except Exception as e:
+        logger.error(f"更新 {output_filename} 的聚合汇总时出错: {e}")
+
+def save_trends_data(trends_data: list, output_filename: str = None, country_name: str = None, changed_records: list = None) -> bool:
     """
     将趋势数据保存到 JSON 文件
     
@@ -325,6 +667,7 @@ def save_trends_data(trends_data: list, output_filename: str = None, country_nam
         trends_data (list): 包含趋势数据的字典列表
         output_filename (str, optional): 输出文件路径，如果为 None 则自动生成
         country_name (str, optional): 国家名称，用于生成文件路径
+        changed_records (list, optional): 需要同步到 SQLite 趋势存储的记录，为 None 时同步全部
         
     Returns:
         bool: 保存是否成功
@@ -333,13 +676,14 @@ def save_trends_data(trends_data: list, output_filename: str = None, country_nam
         output_filename = get_output_filename(country_name)
     
     try:
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            json.dump(trends_data, f, ensure_ascii=False, indent=2)
+        # 原子写入，看板不会读到写了一半的文件
+        atomic_write_json(output_filename, trends_data)
         logger.info(f"数据已保存到 {output_filename}，共 {len(trends_data)} 个条目")
-        return True
     except Exception as e:
         logger.error(f"保存数据到文件 {output_filename} 时出错: {e}")
         return False
+    sync_trend_store(output_filename, trends_data if changed_records is None else changed_records)
+    return True
 
 def load_existing_data(filename: str = None, country_name: str = None) -> list:
     """
@@ -356,10 +700,10 @@ def load_existing_data(filename: str = None, country_name: str = None) -> list:
         filename = get_output_filename(country_name)
     
     existing_data = []
-    if os.path.exists(filename):
+    if os.path.exists(filename) or os.path.exists(get_journal_filename(filename)):
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
+            # 快照叠加追加日志中尚未压缩的记录
+            existing_data = load_day_records(filename)
             logger.info(f"已加载现有数据文件: {filename}, 包含 {len(existing_data)} 个条目")
         except json.JSONDecodeError:
             logger.warning(f"现有数据文件 {filename} 格式错误，将从空数据开始。")
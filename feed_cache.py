@@ -0,0 +1,135 @@
+"""
+RSS 验证器缓存模块
+
+此模块按区域代码在磁盘上保存上一次拉取到的 ETag、Last-Modified 和响应体哈希，
+用于发送条件请求 (If-None-Match / If-Modified-Since)，并在源数据未变化时跳过解析和合并。
+新拉取到的验证器先暂存，只有该国家的数据成功写入后才提交，
+写入失败时丢弃，下次运行会重新拉取并解析这些区域，不会因为 304 而漏存数据。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+# 导入配置
+from config import current_config
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+def _today_str() -> str:
+    """与输出文件名保持一致，按 UTC 日期划分"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+
+class FeedValidatorCache:
+    """
+    按区域代码保存 RSS 验证器的磁盘缓存。
+
+    缓存条目只在同一个 UTC 日期内有效：输出文件按天划分，跨天后即使源数据未变化，
+    也需要重新拉取并写入新一天的文件。
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path if path is not None else current_config.FEED_VALIDATOR_CACHE_FILE
+        self.lock = threading.Lock()
+        self.entries = {}
+        # 已拉取但数据尚未成功写入的验证器：区域代码 -> 条目
+        self.pending = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """从磁盘加载缓存，文件不存在或格式错误时从空缓存开始"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"RSS 验证器缓存 {self.path} 无法读取，将从空缓存开始: {e}")
+            self.entries = {}
+
+    def save(self):
+        """将缓存写回磁盘（临时文件 + 重命名，保证原子性）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            entries = dict(self.entries)
+            self.dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"保存 RSS 验证器缓存 {self.path} 时出错: {e}")
+
+    def _entry(self, region_code: str) -> dict:
+        entry = self.entries.get(region_code)
+        if entry and entry.get('date') == _today_str():
+            return entry
+        return None
+
+    def request_headers(self, region_code: str) -> dict:
+        """
+        生成条件请求头
+
+        Args:
+            region_code (str): 区域代码
+
+        Returns:
+            dict: 包含 If-None-Match / If-Modified-Since 的请求头，无有效缓存时为空字典
+        """
+        with self.lock:
+            entry = self._entry(region_code)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def is_unchanged(self, region_code: str, body: bytes) -> bool:
+        """服务器不支持条件请求时，通过响应体哈希判断数据是否变化"""
+        with self.lock:
+            entry = self._entry(region_code)
+        return bool(entry) and entry.get('body_hash') == hashlib.sha256(body).hexdigest()
+
+    def update(self, region_code: str, headers, body: bytes):
+        """
+        暂存一次成功拉取的验证器，数据写入后由 commit 提交
+
+        Args:
+            region_code (str): 区域代码
+            headers: 响应头（支持大小写不敏感的 get）
+            body (bytes): 响应体
+        """
+        with self.lock:
+            self.pending[region_code] = {
+                'date': _today_str(),
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'body_hash': hashlib.sha256(body).hexdigest()
+            }
+
+    def commit(self, region_codes: list):
+        """数据已成功写入：提交这些区域暂存的验证器"""
+        with self.lock:
+            for region_code in region_codes:
+                entry = self.pending.pop(region_code, None)
+                if entry is not None:
+                    self.entries[region_code] = entry
+                    self.dirty = True
+
+    def discard(self, region_codes: list):
+        """数据写入失败：丢弃这些区域暂存的验证器"""
+        with self.lock:
+            for region_code in region_codes:
+                self.pending.pop(region_code, None)
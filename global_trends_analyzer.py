@@ -3,18 +3,23 @@ import os
 import json
 from datetime import datetime, timedelta
 from collections import defaultdict
-import tiktoken  # 用于估算 token 数量
-import openai
-from openai import OpenAI
-import matplotlib.pyplot as plt
-import seaborn as sns
+# tiktoken、openai、requests 和绘图库只在用到时才导入（见 token_counter、create_openai_client 和 trend_charts），
+# 新会话首次渲染数据概览时不必为 AI 面板加载这些依赖
 import pandas as pd
-import requests
-from ison_parser import dumps
 
 # 导入配置模块
 from config import get_config
 config = get_config()
+from trend_loader import load_rows_parallel, DayFileCache, rows_to_frame, compact_frame
+from trend_rollups import load_rollups, summarize_frame
+from trend_index import TrendTextIndex, FilterResultCache, filter_positions
+from news_search import NewsSearchIndex
+from trend_charts import ChartCache, cached_chart, vega_spec, box_stats
+from token_counter import TokenCounter, ConversationTokens, count_tokens
+from prompt_formats import FORMATS, generate_prompt_content, compare_formats
+from context_budget import context_window, fit_to_budget
+from chunked_analysis import split_into_chunks, run_map, reduce_messages
+from llm_cache import LLMResponseCache, cache_key, replay
 
 # 导入模型供应商配置
 from model_providers import (
@@ -53,7 +58,7 @@ from credentials import (
 DEFAULT_ENDPOINT = MODEL_API_ENDPOINT  # 从凭证模块导入
 DEFAULT_API_KEY = MODEL_API_KEY  # 从凭证模块导入
 DEFAULT_MODEL = MODEL_NAME  # 从凭证模块导入
-DEFAULT_MAX_TOKENS = 128*1024  # 64K tokens
+DEFAULT_MAX_TOKENS = config.AI_DEFAULT_CONTEXT_WINDOW  # 未知模型的上下文窗口（已知模型见 config.AI_CONTEXT_WINDOWS）
 DEFAULT_USER_PROMPT = AI_DEFAULT_USER_PROMPT  # 从提示词模块导入
 DEFAULT_TABLE_CONTENT_PLACEHOLDER = AI_DEFAULT_TABLE_CONTENT_PLACEHOLDER  # 从提示词模块导入
 DEFAULT_SYSTEM_PROMPT = AI_DEFAULT_SYSTEM_PROMPT  # 从提示词模块导入
@@ -61,190 +66,170 @@ DEFAULT_SUPPLIER = "OpenAI"  # 默认供应商
 
 
 # --- 函数定义 ---
-def parse_pub_date(pub_date_str):
-    """解析 ISO 8601 格式的 pubDate 字符串为 datetime 对象"""
-    # 示例格式: "2025-10-21T17:20:00-07:00", "2025-12-30"
-    try:
-        # Python 的 fromisoformat 在 3.11+ 中支持带时区的格式，对于旧版本，需要手动处理
-        # 移除时区偏移部分并手动解析
-        # 格式为 YYYY-MM-DDTHH:MM:SS+HH:MM 或 -HH:MM
-        # 这里简单地移除时区部分，只取日期时间
-        # 更精确的处理可以使用 dateutil 库
-        # 为了兼容性，这里手动分割
-        if pub_date_str:
-            # 检查是否包含时间部分
-            if 'T' in pub_date_str:
-                # 分割日期时间和时区
-                dt_part = pub_date_str.split('T')[0]
-                time_part = pub_date_str.split('T')[1].split('-')[0].split('+')[0] # 移除时区
-                full_dt_str = f"{dt_part}T{time_part}"
-                # 直接解析完整的日期时间字符串，不进行额外的分割
-                dt = datetime.fromisoformat(full_dt_str.replace('Z', '+00:00'))
-            else:
-                # 简单日期格式，如 "2025-12-30"
-                dt = datetime.strptime(pub_date_str, '%Y-%m-%d')
-            return dt.date()
-    except ValueError:
-        try:
-            # 尝试其他可能的格式
-            dt = datetime.strptime(pub_date_str.split('T')[0], '%Y-%m-%d')
-            return dt.date()
-        except ValueError:
-            st.warning(f"无法解析日期字符串: {pub_date_str}")
-            return None
-    return None
+@st.cache_resource
+def get_day_file_cache():
+    """进程内共享的每日文件缓存（跨会话和重新运行保留），签名未变化的文件不再重新解析"""
+    return DayFileCache(max_bytes=config.DASHBOARD_CACHE_MAX_BYTES)
 
-def is_date_in_range(pub_date_str, start_date, end_date):
-    """检查 pubDate 是否在指定范围内"""
-    parsed_date = parse_pub_date(pub_date_str)
-    if parsed_date:
-        return start_date <= parsed_date <= end_date
-    return False
+@st.cache_resource
+def get_chart_cache():
+    """进程内共享的图表缓存，汇总数据和参数不变的图表不再重新绘制"""
+    return ChartCache(config.DASHBOARD_CHART_CACHE_SIZE)
 
-def load_and_process_file_for_date(target_date, results_list):
-    """加载并处理指定日期的 JSON 文件，将每个新闻项作为一行添加到列表中"""
-    filename = JSON_FILENAME_PATTERN.format(target_date.strftime('%Y-%m-%d'))
-    
-    # 搜索所有国家子文件夹中的JSON文件
-    search_paths = [FOLDER_PATH]
-    
-    # 添加所有国家子文件夹
-    try:
-        for item in os.listdir(FOLDER_PATH):
-            item_path = os.path.join(FOLDER_PATH, item)
-            if os.path.isdir(item_path):
-                search_paths.append(item_path)
-    except Exception as e:
-        st.warning(f"无法读取文件夹结构: {e}")
-    
-    # 处理每个可能的文件路径
-    for search_path in search_paths:
-        # 检查所有匹配日期前缀的文件，包括带国家后缀的
-        base_name, ext = os.path.splitext(filename)
-        matching_files = []
-        
+def show_chart(kind, data, **options):
+    """
+    显示一张图表：DASHBOARD_CHART_BACKEND 为 "native" 时交给浏览器端的 Vega-Lite 渲染，
+    否则用 matplotlib 绘制（结果按汇总数据和参数缓存）
+    """
+    if config.DASHBOARD_CHART_BACKEND == "native":
+        st.vega_lite_chart(vega_spec(kind, data, **options), width='stretch')
+    else:
+        st.image(cached_chart(get_chart_cache(), kind, data, **options), width='stretch')
+
+@st.cache_resource
+def get_news_search_index():
+    """进程内共享的新闻全文搜索索引"""
+    return NewsSearchIndex()
+
+def load_data_by_date_range(start_date, end_date, _progress_callback=None):
+    """根据日期范围加载数据：一次性列出目录树，复用缓存中未变化的文件，再在进程池中并行解析其余文件"""
+    all_extracted_data_list, messages = load_rows_parallel(
+        FOLDER_PATH, start_date, end_date,
+        max_workers=config.DASHBOARD_LOAD_WORKERS,
+        _progress_callback=_progress_callback,
+        cache=get_day_file_cache()
+    )
+    for level, message in messages:
+        if level == 'error':
+            st.error(message)
+        else:
+            st.warning(message)
+    return all_extracted_data_list
+
+def records_to_frame(records):
+    """把 load_data_by_date_range 返回的行记录按列转换为看板使用的 DataFrame（重复取值的字符串列为 category）"""
+    return rows_to_frame(records)
+
+def load_dashboard_summary(df_rows, country_label=None, use_rollups=True):
+    """
+    获取概览卡片和图表使用的汇总表。
+    可以时读取抓取阶段预先计算的每日聚合汇总（只按国家筛选），否则直接对行级数据 df_rows 做 groupby。
+    聚合汇总按每日 JSON 文件的规则统计，只有数据源为 "json" 时才与已加载的数据一致；
+    archive、row_cache、sqlite 数据源总是对 df_rows 统计，概览卡片和图表与表格保持一致。
+    """
+    if (use_rollups and config.DASHBOARD_USE_ROLLUPS and config.DASHBOARD_DATA_SOURCE == "json"
+            and 'data_range' in st.session_state):
         try:
-            # 获取该路径下所有以base_name开头的文件
-            all_files = os.listdir(search_path)
-            matching_files = [f for f in all_files if f.startswith(base_name)]
+            return load_rollups(FOLDER_PATH, *st.session_state['data_range'], country_label=country_label)
         except Exception as e:
-            continue
-        
-        for matching_file in matching_files:
-                file_path = os.path.join(search_path, matching_file)
-                
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                except json.JSONDecodeError as e:
-                    st.error(f"解码 JSON 文件错误 {file_path}: {e}")
-                    continue
-                except FileNotFoundError:
-                    # 这个错误理论上不会触发，因为上面已经检查了文件是否存在
-                    st.error(f"文件未找到 (此错误不应出现): {file_path}")
-                    continue
-                except Exception as e:
-                    st.error(f"读取文件时发生意外错误 {file_path}: {e}")
-                    continue
-
-                if not isinstance(data, list):
-                    st.warning(f"警告: {file_path} 中的数据不是列表。跳过。")
-                    continue
-
-                # 从文件夹路径提取国家信息
-                # 例如：JSONs/India/trends_2025-10-14.json → "India"
-                folder_country = None
-                # 检查search_path是否是FOLDER_PATH的子目录
-                if search_path != FOLDER_PATH:
-                    # 获取search_path相对于FOLDER_PATH的路径
-                    relative_path = os.path.relpath(search_path, FOLDER_PATH)
-                    # 获取相对路径的第一部分，即国家名称
-                    folder_country = relative_path.split(os.sep)[0]
-                    # 验证这个国家名称是否真的存在
-                    if not os.path.isdir(os.path.join(FOLDER_PATH, folder_country)):
-                        folder_country = None
-
-                for item in data:
-                    # 1. 筛选 traffic_num (这里假设是 traffic_num，原代码是 traffic)
-                    # 调整阈值为0，显示所有流量数据
-                    if item.get('traffic_num', 0) < 0: # 可以根据需要调整阈值
-                        continue
-
-                    # 2. 筛选 pub_date 是否为当天 (因为文件名已经限定了日期范围)
-                    # 我们仍然可以检查 pub_date，以确保它与文件名代表的日期一致
-                    pub_date_str = item.get('pub_date')
-                    if not pub_date_str:
-                        continue # 没有日期的条目跳过
-
-                    # 解析 pub_date，确认它确实是目标日期
-                    item_date = parse_pub_date(pub_date_str)
-                    if item_date != target_date:
-                        continue # pubDate 与文件日期不匹配，跳过
-
-                    # 3. 提取所需信息
-                    search_term = item.get('title', 'N/A')
-                    traffic_num = item.get('traffic_num', 0)
-                    pub_date = item_date # 使用解析后的日期
-                    regions = item.get('regions', [])
-                    # 如果JSON中没有国家信息，则使用文件夹名称作为国家
-                    country = item.get('country', folder_country)
-                    news_list = item.get('news', [])
-
-                    if not news_list:
-                         continue # 如果没有 news 项，则跳过
-
-                    # 遍历 news 列表，为每个 news_item 创建一行记录
-                    for news_item in news_list:
-                        news_title = news_item.get('title', 'N/A')
-                        news_source = news_item.get('source', 'N/A')
-
-                        # 添加这一行到结果列表
-                        results_list.append({
-                            "Search Term": search_term,
-                            "News Title": news_title,
-                            "News Source": news_source,
-                            "Traffic Num": traffic_num,
-                            "Pub Date": pub_date,
-                            "Regions": regions, # 可以保留整个列表
-                            "Country": country # 添加国家信息
-                        })
+            st.warning(f"读取聚合汇总失败，改为直接统计: {e}")
+    return summarize_frame(df_rows)
 
-def load_data_by_date_range(start_date, end_date, _progress_callback=None):
-    """根据日期范围加载数据"""
-    all_extracted_data_list = []
-    current_date = start_date
-    total_days = (end_date - start_date).days + 1
-    current_day = 0
-    
-    while current_date <= end_date:
-        # print(f"Attempting to load file for date: {current_date.strftime('%Y-%m-%d')}") # 可选：显示加载进度
-        load_and_process_file_for_date(current_date, all_extracted_data_list)
-        current_date += timedelta(days=1)
-        current_day += 1
-        
-        # 调用进度回调函数
+def load_dashboard_frame(start_date, end_date, _progress_callback=None):
+    """
+    根据日期范围加载看板数据，返回 DataFrame。
+    DASHBOARD_DATA_SOURCE 为 "archive" 时先增量更新 Parquet 归档，再只读取日期范围内的分区和所需的列；
+    为 "row_cache" 时映射每个每日文件的二进制行缓存（缓存失效时自动重建）；
+    为 "sqlite" 时从 SQLite 趋势存储查询；
+    否则（或 pyarrow 不可用时）逐个解析每日 JSON 文件。
+    """
+    # 记录当前加载的日期范围，供 SQLite 模式下推筛选条件时使用
+    st.session_state['data_range'] = (start_date, end_date)
+    # 数据集版本：每次加载递增，筛选结果缓存和倒排索引以此区分数据集
+    st.session_state['data_version'] = st.session_state.get('data_version', 0) + 1
+    if config.DASHBOARD_DATA_SOURCE == "sqlite":
+        from trend_store import TrendStore
+        df = compact_frame(TrendStore().query_frame(start_date, end_date))
         if _progress_callback:
-            progress = current_day / total_days
-            _progress_callback(progress, f"正在加载 {current_date.strftime('%Y-%m-%d')} 的数据...")
-
-    # 按发布日期（降序）和流量数（降序）排序
-    all_extracted_data_list.sort(key=lambda x: (x["Pub Date"], x["Traffic Num"]), reverse=True)
-    return all_extracted_data_list
+            _progress_callback(1.0, f"已读取 {len(df)} 条记录")
+        return df
+    if config.DASHBOARD_DATA_SOURCE == "row_cache":
+        from row_cache import load_row_cache_frame
+        return compact_frame(load_row_cache_frame(start_date, end_date, FOLDER_PATH, _progress_callback=_progress_callback))
+    if config.DASHBOARD_DATA_SOURCE == "archive":
+        try:
+            from trend_archive import build_archive, load_archive_frame
+            if _progress_callback:
+                _progress_callback(0.0, "正在更新列式归档...")
+            build_archive(FOLDER_PATH)
+            if _progress_callback:
+                _progress_callback(0.5, "正在从列式归档读取数据...")
+            df = compact_frame(load_archive_frame(start_date, end_date))
+            if _progress_callback:
+                _progress_callback(1.0, f"已读取 {len(df)} 条记录")
+            return df
+        except ImportError as e:
+            st.warning(f"无法使用列式归档，改为读取 JSON 文件: {e}")
+    return records_to_frame(load_data_by_date_range(start_date, end_date, _progress_callback))
+
+@st.cache_resource
+def get_token_counter():
+    """进程内共享的 token 计数器（编码器和计数结果都在进程内缓存）"""
+    return TokenCounter()
+
+@st.cache_resource
+def get_response_cache():
+    """进程内共享的 AI 回复磁盘缓存（命中/未命中次数为本进程的累计）"""
+    return LLMResponseCache()
+
+def active_response_cache():
+    """当前会话启用回复缓存时返回缓存对象，否则返回 None"""
+    if st.session_state.get('ai_config', {}).get('use_response_cache', config.USE_AI_RESPONSE_CACHE):
+        return get_response_cache()
+    return None
 
-@st.cache_data
+def estimate_tokens(text, model_name="gpt-4o", key=None):
+    """
+    估算文本的 token 数量。
+    大段文本（如表格）应传入代表其内容的 key（例如筛选条件和格式），相同 key 只计数一次，不必对文本做哈希
+    """
+    return get_token_counter().count(text, model_name, key=key)
 
-def estimate_tokens(text, model_name="gpt-4o"):
+def get_prompt_table(df_view, compression_format, view_key, token_budget=None, model_name="gpt-4o"):
     """
-    估算文本的 token 数量
+    生成发送给 AI 的表格内容和完整的用户提示词。
+    每个会话只保留最近一次的结果，(筛选条件, 格式, 预算) 不变的重新运行直接复用，不再重新生成和哈希表格。
+    给出 token_budget 且启用了 AI_BUDGETED_SELECTION 时，按预算选择优先级最高的趋势（见 context_budget）；
+    预算为 0 时不包含任何数据
+
+    Returns:
+        tuple: (表格键, 用户提示词（含表格）, 选择统计（未按预算选择时为 None）)
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model_name)
-    except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base") # fallback
-    num_tokens = len(encoding.encode(text))
-    return num_tokens
+    budgeted = token_budget is not None and config.AI_BUDGETED_SELECTION
+    table_key = (view_key, compression_format, token_budget if budgeted else None, model_name if budgeted else None)
+    cached = st.session_state.get('prompt_table')
+    if cached is None or cached[0] != table_key:
+        if budgeted:
+            content, _, selection = fit_to_budget(
+                df_view, compression_format, token_budget,
+                render=lambda df_selected: generate_prompt_content(df_selected, compression_format),
+                count=lambda text: count_tokens(text, model_name),
+                model_name=model_name
+            )
+        else:
+            content, selection = generate_prompt_content(df_view, compression_format), None
+        cached = (table_key, DEFAULT_USER_PROMPT + "\n\n" + content, selection)
+        st.session_state['prompt_table'] = cached
+    return cached
 
+def get_chunk_plan(df_view, compression_format, view_key, chunk_tokens, model_name="gpt-4o"):
+    """
+    按国家和日期把数据拆分为分块分析的各块（见 chunked_analysis），每个会话只保留最近一次的结果
 
+    Returns:
+        list: split_into_chunks 的结果
+    """
+    plan_key = (view_key, compression_format, chunk_tokens, model_name)
+    cached = st.session_state.get('chunk_plan')
+    if cached is None or cached[0] != plan_key:
+        cached = (plan_key, split_into_chunks(df_view, compression_format, chunk_tokens, model_name))
+        st.session_state['chunk_plan'] = cached
+    return cached[1]
+
+def create_openai_client(base_url, api_key):
+    """创建 OpenAI 兼容客户端（按需导入 openai，只有使用 AI 功能时才加载）"""
+    from openai import OpenAI
+    return OpenAI(base_url=base_url, api_key=api_key)
 
 def refresh_model_list(endpoint, api_key):
     """从指定端点刷新模型列表"""
@@ -253,7 +238,7 @@ def refresh_model_list(endpoint, api_key):
             st.write("🔄 尝试使用 OpenAI 客户端获取模型列表...")
             # 首先尝试使用 OpenAI 客户端获取模型列表
             try:
-                client = OpenAI(base_url=endpoint, api_key=api_key)
+                client = create_openai_client(base_url=endpoint, api_key=api_key)
                 models = client.models.list()
                 model_options = [m.id for m in models.data]
                 # 更新会话状态中的模型列表
@@ -280,6 +265,7 @@ def refresh_model_list(endpoint, api_key):
                     models_endpoint += '/v1/models'
             
             st.write(f"🌐 访问端点: {models_endpoint}")
+            import requests  # 按需导入
             response = requests.get(models_endpoint, headers=headers, timeout=10)
             response.raise_for_status()  # 检查响应状态
             
@@ -314,92 +300,6 @@ def refresh_model_list(endpoint, api_key):
             status.update(label="获取模型列表失败", state="error", expanded=True)
             st.error(f"获取模型列表失败: {e}")
 
-@st.cache_data
-
-def generate_simple_markdown_table(df_filtered, max_rows=100000):
-    """
-    生成简化版的 markdown 表格
-    """
-    if df_filtered.empty:
-        return "No data to display."
-
-    # 限制行数以减少 token
-    df_to_use = df_filtered.head(max_rows)
-
-    # 重命名列以符合要求
-    df_simple = df_to_use.rename(columns={
-        "标题": "news_title",
-        "信源": "source",
-        "搜索词": "title",
-        "流量": "traffic_num",
-        "发布日期": "pub_date",
-        "地区": "regions",
-        "国家": "country"
-    })
-
-    # 转换日期格式和流量格式
-    df_simple["pub_date"] = df_simple["pub_date"].astype(str)
-    df_simple["traffic_num"] = df_simple["traffic_num"].astype(int)
-
-    # 生成 markdown 表格
-    lines = []
-    lines.append('')
-    lines.append("news_title | source | title | traffic_num | pub_date | regions | country")
-    lines.append("---|---|---|---|---|---|---")
-
-    for _, row in df_simple.iterrows():
-        line = f"{row['news_title']} | {row['source']} | {row['title']} | {row['traffic_num']} | {row['pub_date']} | {row['regions']} | {row['country']}"
-        lines.append(line)
-
-    return "\n".join(lines)
-
-
-def generate_ison_content(df_filtered, max_rows=100000):
-    """
-    生成 ISON 格式的内容
-    """
-    if df_filtered.empty:
-        return "table.empty"
-
-    # 限制行数以减少 token
-    df_to_use = df_filtered.head(max_rows)
-
-    # 重命名列以符合要求
-    df_simple = df_to_use.rename(columns={
-        "标题": "news_title",
-        "信源": "source",
-        "搜索词": "title",
-        "流量": "traffic_num",
-        "发布日期": "pub_date",
-        "地区": "regions",
-        "国家": "country"
-    })
-
-    # 转换日期格式和流量格式
-    df_simple["pub_date"] = df_simple["pub_date"].astype(str)
-    df_simple["traffic_num"] = df_simple["traffic_num"].astype(int)
-
-    # 生成 ISON 格式
-    ison_lines = []
-    ison_lines.append("table.trends")
-    ison_lines.append("news_title source title traffic_num:int pub_date regions country")
-
-    for _, row in df_simple.iterrows():
-        # 处理可能包含空格的字段，使用引号包围
-        news_title = f'"{row["news_title"]}"' if ' ' in str(row["news_title"]) else str(row["news_title"])
-        source = f'"{row["source"]}"' if ' ' in str(row["source"]) else str(row["source"])
-        title = f'"{row["title"]}"' if ' ' in str(row["title"]) else str(row["title"])
-        traffic_num = int(row["traffic_num"])
-        pub_date = str(row["pub_date"])
-        regions = f'"{row["regions"]}"' if ' ' in str(row["regions"]) else str(row["regions"])
-        country = f'"{row["country"]}"' if ' ' in str(row["country"]) else str(row["country"])
-        
-        line = f"{news_title} {source} {title} {traffic_num} {pub_date} {regions} {country}"
-        ison_lines.append(line)
-
-    return "\n".join(ison_lines)
-
-
 # --- Streamlit 应用 ---
 st.set_page_config(page_title="Global Trending Now 看板", layout="wide")
 
@@ -447,7 +347,7 @@ with guide_container:
 
 # 初始化 session state 来存储数据
 if 'data' not in st.session_state:
-    st.session_state['data'] = []
+    st.session_state['data'] = pd.DataFrame()
 if 'selected_date_range' not in st.session_state:
     st.session_state['selected_date_range'] = '7d' # 默认为近7天
 if 'df' not in st.session_state:
@@ -485,7 +385,7 @@ with date_container:
                     progress_bar.progress(progress)
                     status_text.text(message)
                 
-                st.session_state['data'] = load_data_by_date_range(start_date, end_date, progress_callback)
+                st.session_state['data'] = load_dashboard_frame(start_date, end_date, progress_callback)
                 st.session_state['selected_date_range'] = '3d'
                 # 重置 AI 状态
                 st.session_state['ai_active'] = False
@@ -510,7 +410,7 @@ with date_container:
                     progress_bar.progress(progress)
                     status_text.text(message)
                 
-                st.session_state['data'] = load_data_by_date_range(start_date, end_date, progress_callback)
+                st.session_state['data'] = load_dashboard_frame(start_date, end_date, progress_callback)
                 st.session_state['selected_date_range'] = '7d'
                 # 重置 AI 状态
                 st.session_state['ai_active'] = False
@@ -535,7 +435,7 @@ with date_container:
                     progress_bar.progress(progress)
                     status_text.text(message)
                 
-                st.session_state['data'] = load_data_by_date_range(start_date, end_date, progress_callback)
+                st.session_state['data'] = load_dashboard_frame(start_date, end_date, progress_callback)
                 st.session_state['selected_date_range'] = '30d'
                 # 重置 AI 状态
                 st.session_state['ai_active'] = False
@@ -547,7 +447,7 @@ with date_container:
                 st.rerun()
 
 # 如果 session state 中没有数据，则加载默认的近7天数据
-if not st.session_state['data']:
+if st.session_state['data'].empty:
     start_date = (datetime.now().date() - timedelta(days=7))
     end_date = datetime.now().date()
     
@@ -560,64 +460,44 @@ if not st.session_state['data']:
             progress_bar.progress(progress)
             status_text.text(message)
         
-        st.session_state['data'] = load_data_by_date_range(start_date, end_date, progress_callback)
+        st.session_state['data'] = load_dashboard_frame(start_date, end_date, progress_callback)
         st.session_state['selected_date_range'] = '7d'
         
         status.update(label="默认数据加载完成", state="complete", expanded=False)
         st.toast("✅ 默认数据加载完成！", icon="📊")
 
 # 显示加载的数据
-if st.session_state['data']:
-    st.caption(f"数据范围: {min(item['Pub Date'] for item in st.session_state['data'])} 至 {max(item['Pub Date'] for item in st.session_state['data'])}，共找到 {len(st.session_state['data'])} 条相关新闻记录")
+if not st.session_state['data'].empty:
+    df = st.session_state['data']
+    st.caption(f"数据范围: {df['发布日期'].min()} 至 {df['发布日期'].max()}，共找到 {len(df)} 条相关新闻记录")
     st.caption(f"")
 
-    # 创建 DataFrame 以便更好地展示
-    import pandas as pd
-    df_data = []
-    for item in st.session_state['data']:
-        regions_list = item["Regions"]
-        regions_str = "; ".join(regions_list)
-        # 处理国家信息，可能是字符串或集合
-        country_info = item["Country"]
-        if isinstance(country_info, (set, list)):
-            country_str = "; ".join(country_info)
-        else:
-            country_str = country_info if country_info else "未知"
-        df_data.append({
-            "搜索词": item["Search Term"],
-            "标题": item["News Title"],
-            "信源": item["News Source"],
-            "流量": item["Traffic Num"],
-            "发布日期": item["Pub Date"],
-            "地区": regions_str,
-            "地区数量": len(regions_list),
-            "国家": country_str
-        })
-
-    df = pd.DataFrame(df_data)
     st.session_state['df'] = df
 
     # --- 数据概览统计卡片 ---
     st.markdown("## 📊 数据概览")
+    overview = load_dashboard_summary(df)
+    overview_totals = overview['totals']
+    overview_countries = overview['country']
     stats_container = st.container(border=True)
     with stats_container:
         # 第一行统计卡片：核心指标
         col_stats1, col_stats2, col_stats3, col_stats4 = st.columns(4)
         
         with col_stats1:
-            total_records = len(df)
+            total_records = overview_totals['新闻数量']
             st.metric("总新闻记录数", f"{total_records:,}")
         
         with col_stats2:
-            unique_countries = df["国家"].nunique()
+            unique_countries = overview_totals['国家数量']
             st.metric("涉及国家数量", unique_countries)
         
         with col_stats3:
-            avg_traffic = df["流量"].mean()
+            avg_traffic = overview_totals['平均流量']
             st.metric("平均流量", f"{int(avg_traffic):,}")
         
         with col_stats4:
-            unique_sources = df["信源"].nunique()
+            unique_sources = overview_totals['信源数量']
             st.metric("新闻来源数量", unique_sources)
         
         # 第二行统计卡片：国家相关指标
@@ -625,26 +505,28 @@ if st.session_state['data']:
         
         with col_stats5:
             # 流量最高的国家
-            top_traffic_country = df.groupby("国家")["流量"].sum().idxmax()
-            top_traffic_value = df.groupby("国家")["流量"].sum().max()
+            top_traffic_row = overview_countries.loc[overview_countries["总流量"].idxmax()]
+            top_traffic_country = top_traffic_row["国家"]
+            top_traffic_value = top_traffic_row["总流量"]
             st.metric("流量最高的国家", top_traffic_country)
             st.caption(f"总流量: {int(top_traffic_value):,}")
         
         with col_stats6:
             # 新闻记录最多的国家
-            top_news_country = df.groupby("国家").size().idxmax()
-            top_news_count = df.groupby("国家").size().max()
+            top_news_row = overview_countries.loc[overview_countries["新闻数量"].idxmax()]
+            top_news_country = top_news_row["国家"]
+            top_news_count = int(top_news_row["新闻数量"])
             st.metric("新闻最多的国家", top_news_country)
             st.caption(f"总记录: {top_news_count:,}")
         
         with col_stats7:
             # 平均每条新闻的流量
-            avg_traffic_per_news = df["流量"].sum() / len(df)
+            avg_traffic_per_news = overview_totals['总流量'] / overview_totals['新闻数量']
             st.metric("平均每条新闻流量", f"{int(avg_traffic_per_news):,}")
         
         with col_stats8:
             # 不同搜索词的数量
-            unique_search_terms = df["搜索词"].nunique()
+            unique_search_terms = overview_totals['搜索词数量']
             st.metric("独特搜索词数量", unique_search_terms)
     
     # --- 筛选功能 ---
@@ -691,6 +573,13 @@ if st.session_state['data']:
                 key="min_traffic_filter",
                 help="筛选流量大于等于指定值的数据"
             )
+        term_filter = st.text_input(
+            "🔎 按搜索词筛选",
+            "",
+            key="term_filter",
+            placeholder="例如: iphone, 世界杯",
+            help="支持多个搜索词，用逗号分隔；匹配以关键字开头的搜索词或其中的单词"
+        )
         
         # 添加清除筛选按钮和筛选信息
         col_clear, col_info = st.columns([1, 3])
@@ -701,6 +590,7 @@ if st.session_state['data']:
                     st.session_state['country_filter'] = "所有国家"
                     st.session_state['region_filter'] = ""
                     st.session_state['min_traffic_filter'] = 0
+                    st.session_state['term_filter'] = ""
                     st.toast("✅ 筛选条件已清除！", icon="🗑️")
                     st.rerun()
         with col_info:
@@ -711,6 +601,8 @@ if st.session_state['data']:
                 active_filters.append(f"地区: {region_filter}")
             if min_traffic_filter > 0:
                 active_filters.append(f"最低流量: {min_traffic_filter}")
+            if term_filter:
+                active_filters.append(f"搜索词: {term_filter}")
             
             if active_filters:
                 st.info(f"当前激活的筛选条件: {', '.join(active_filters)}")
@@ -718,25 +610,60 @@ if st.session_state['data']:
                 st.info("未应用任何筛选条件，显示所有数据")
 
     with st.spinner("正在应用筛选条件..."):
-        df_current = df.copy()
-        # 国家筛选
-        if country_filter != "所有国家":
-            df_current = df_current[df_current["国家"] == country_filter]
-        
-        # 地区筛选
-        if region_filter:
-            regions_to_filter = [r.strip() for r in region_filter.split(",") if r.strip()]
-            mask = False
-            for r in regions_to_filter:
-                mask = mask | df_current["地区"].str.contains(r, case=False, na=False)
-            df_current = df_current[mask]
-        
-        # 最低流量筛选
-        if min_traffic_filter > 0:
-            df_current = df_current[df_current["流量"] >= min_traffic_filter]
-
         # 检查是否有筛选条件
-        has_active_filters = (country_filter != "所有国家") or region_filter or (min_traffic_filter > 0)
+        has_active_filters = (country_filter != "所有国家") or region_filter or (min_traffic_filter > 0) or term_filter
+        regions_to_filter = [r.strip() for r in region_filter.split(",") if r.strip()]
+        terms_to_filter = [t.strip() for t in term_filter.split(",") if t.strip()]
+
+        # (数据集版本, 筛选条件) 唯一确定当前视图，筛选结果、发送给 AI 的表格和 token 计数都以此为键
+        data_version = st.session_state.get('data_version', 0)
+        filter_key = (
+            data_version,
+            country_filter if country_filter != "所有国家" else None,
+            tuple(regions_to_filter),
+            tuple(terms_to_filter),
+            int(min_traffic_filter)
+        )
+        if not has_active_filters:
+            # 无筛选条件时直接使用已加载的数据，不做任何复制
+            df_current = df
+        else:
+            if 'filter_cache' not in st.session_state:
+                st.session_state['filter_cache'] = FilterResultCache(config.DASHBOARD_FILTER_CACHE_SIZE)
+            filter_cache = st.session_state['filter_cache']
+            cached = filter_cache.get(filter_key)
+            if cached is not None:
+                # 筛选条件和数据集都未变化，复用上一次的视图
+                df_current = cached[1]
+            elif config.DASHBOARD_DATA_SOURCE == "sqlite" and 'data_range' in st.session_state:
+                # 日期、国家和流量条件下推到 SQL，地区和搜索词按倒排索引相同的规则筛选
+                from trend_store import TrendStore
+                df_current = compact_frame(TrendStore().query_frame(
+                    *st.session_state['data_range'],
+                    country_label=filter_key[1],
+                    regions=regions_to_filter,
+                    search_terms=terms_to_filter,
+                    min_traffic=min_traffic_filter
+                ))
+                filter_cache.put(filter_key, None, df_current)
+            else:
+                # 地区和搜索词筛选：在每个数据集构建一次的倒排索引中做前缀查找
+                text_index = None
+                if regions_to_filter or terms_to_filter:
+                    if st.session_state.get('text_index_version') != data_version:
+                        st.session_state['text_index'] = TrendTextIndex(df)
+                        st.session_state['text_index_version'] = data_version
+                    text_index = st.session_state['text_index']
+                # 国家和最低流量用布尔掩码，与索引结果求交集后只按行号取出一次
+                rows = filter_positions(
+                    df, text_index,
+                    country=filter_key[1],
+                    regions=regions_to_filter,
+                    terms=terms_to_filter,
+                    min_traffic=min_traffic_filter
+                )
+                df_current = df.iloc[rows]
+                filter_cache.put(filter_key, rows, df_current)
         
         # 检查筛选条件是否发生变化
         if 'last_filter_state' not in st.session_state:
@@ -745,7 +672,8 @@ if st.session_state['data']:
         current_filter_state = {
             'country': country_filter,
             'region': region_filter,
-            'min_traffic': min_traffic_filter
+            'min_traffic': min_traffic_filter,
+            'term': term_filter
         }
         
         # 只有当筛选条件实际变化时才显示通知
@@ -770,6 +698,8 @@ if st.session_state['data']:
         filter_stats.append(f"地区: {region_filter}")
     if min_traffic_filter > 0:
         filter_stats.append(f"最低流量: {min_traffic_filter}")
+    if term_filter:
+        filter_stats.append(f"搜索词: {term_filter}")
     
     if filter_stats:
         st.caption(f"当前筛选条件: {', '.join(filter_stats)} | 共 {len(df_current)} 条记录")
@@ -779,29 +709,17 @@ if st.session_state['data']:
     # --- 国家数据可视化图表 ---
     if not df_current.empty:
         st.markdown("## 📈 国家数据可视化")
+        # 只有国家筛选时可以直接使用预先计算的聚合汇总，地区和最低流量筛选需要对筛选后的行统计
+        chart_summary = load_dashboard_summary(
+            df_current,
+            country_label=country_filter if country_filter != "所有国家" else None,
+            use_rollups=not region_filter and not term_filter and min_traffic_filter <= 0
+        )
         
         # 创建图表容器
         chart_container = st.container(border=True)
         
         with chart_container:
-            # 设置图表样式，确保视觉一致性
-            sns.set_style("darkgrid")
-            sns.set_palette("deep")
-            sns.set_context("notebook", font_scale=1.0)
-            
-            # 设置统一的图表配置
-            plt.rcParams.update({
-                'font.size': 12,
-                'axes.titlesize': 14,
-                'axes.labelsize': 12,
-                'xtick.labelsize': 10,
-                'ytick.labelsize': 10,
-                'legend.fontsize': 10,
-                'figure.figsize': (10, 6),
-                'font.sans-serif': ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'WenQuanYi Micro Hei'],  # 添加支持中文的字体
-                'axes.unicode_minus': False  # 解决负号显示问题
-            })
-            
             # 第一行图表：国家新闻数量和平均流量
             st.markdown("### Country Core Metrics Comparison")
             col_chart1, col_chart2 = st.columns(2)
@@ -809,55 +727,26 @@ if st.session_state['data']:
             with col_chart1:
                 with st.spinner("正在生成国家新闻数量图表..."):
                     # 按国家分组统计新闻数量
-                    country_news_count = df_current.groupby("国家").size().reset_index(name="新闻数量")
+                    country_news_count = chart_summary['country'][["国家", "新闻数量"]]
                     country_news_count = country_news_count.sort_values(by="新闻数量", ascending=False).head(10)
-                    
-                    # 创建图表
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    sns.barplot(x="新闻数量", y="国家", data=country_news_count, hue="国家", palette="viridis", ax=ax, legend=False)
-                    ax.set_xlabel("Number of News Records")
-                    ax.set_ylabel("国家")
-                    
-                    # 根据筛选条件调整标题
-                    if country_filter == "所有国家":
-                        ax.set_title("News Records by Country")
-                    else:
-                        ax.set_title(f"{country_filter} 新闻记录数量")
-                    
-                    # 在柱状图上添加数值标签
-                    for i, v in enumerate(country_news_count["新闻数量"]):
-                        ax.text(v + 0.5, i, str(v), va='center', fontsize=10)
-                    
-                    # 设置图表边距
-                    plt.tight_layout()
-                    st.pyplot(fig)
+                    show_chart(
+                        'bar', country_news_count, x="新闻数量", y="国家", palette="viridis",
+                        xlabel="Number of News Records", ylabel="国家",
+                        # 根据筛选条件调整标题
+                        title="News Records by Country" if country_filter == "所有国家" else f"{country_filter} 新闻记录数量"
+                    )
             
             with col_chart2:
                 with st.spinner("正在生成国家平均流量图表..."):
                     # 按国家分组计算平均流量
-                    country_avg_traffic = df_current.groupby("国家")["流量"].mean().reset_index(name="平均流量")
+                    country_avg_traffic = chart_summary['country'][["国家", "平均流量"]].copy()
                     country_avg_traffic["平均流量"] = country_avg_traffic["平均流量"].astype(int)
                     country_avg_traffic = country_avg_traffic.sort_values(by="平均流量", ascending=False).head(10)
-                    
-                    # 创建图表
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    sns.barplot(x="平均流量", y="国家", data=country_avg_traffic, hue="国家", palette="plasma", ax=ax, legend=False)
-                    ax.set_xlabel("Average Traffic")
-                    ax.set_ylabel("国家")
-                    
-                    # 根据筛选条件调整标题
-                    if country_filter == "所有国家":
-                        ax.set_title("Average Traffic by Country")
-                    else:
-                        ax.set_title(f"{country_filter} 平均流量")
-                    
-                    # 在柱状图上添加数值标签
-                    for i, v in enumerate(country_avg_traffic["平均流量"]):
-                        ax.text(v + 0.5, i, f"{v:,}", va='center', fontsize=10)
-                    
-                    # 设置图表边距
-                    plt.tight_layout()
-                    st.pyplot(fig)
+                    show_chart(
+                        'bar', country_avg_traffic, x="平均流量", y="国家", palette="plasma", label_format="{:,}",
+                        xlabel="Average Traffic", ylabel="国家",
+                        title="Average Traffic by Country" if country_filter == "所有国家" else f"{country_filter} 平均流量"
+                    )
 
             # 第二行图表：流量趋势和新闻来源分布
             st.markdown("### Traffic Trend and Source Analysis")
@@ -868,28 +757,12 @@ if st.session_state['data']:
                     # 按日期的流量趋势（如果选择了单个国家或数据量足够）
                     if len(df_current) > 5:
                         # 按日期分组计算总流量
-                        daily_traffic = df_current.groupby("发布日期")["流量"].sum().reset_index(name="总流量")
-                        daily_traffic = daily_traffic.sort_values(by="发布日期")
-                        
-                        # 创建图表
-                        fig, ax = plt.subplots(figsize=(10, 6))
-                        sns.lineplot(x="发布日期", y="总流量", data=daily_traffic, marker='o', ax=ax, color="#4C72B0")
-                        ax.set_xlabel("Date")
-                        ax.set_ylabel("Total Traffic")
-                        
-                        # 根据筛选条件调整标题
-                        if country_filter == "所有国家":
-                            ax.set_title("Global Traffic Trend")
-                        else:
-                            ax.set_title(f"{country_filter} 流量趋势")
-                        
-                        # 优化日期显示
-                        plt.xticks(rotation=45, fontsize=8)
-                        plt.grid(True, alpha=0.3)
-                        
-                        # 设置图表边距
-                        plt.tight_layout()
-                        st.pyplot(fig)
+                        daily_traffic = chart_summary['day'][["发布日期", "总流量"]]
+                        show_chart(
+                            'line', daily_traffic, x="发布日期", y="总流量", color="#4C72B0",
+                            xlabel="Date", ylabel="Total Traffic",
+                            title="Global Traffic Trend" if country_filter == "所有国家" else f"{country_filter} 流量趋势"
+                        )
                     else:
                         st.info("数据量不足，无法显示流量趋势")
             
@@ -897,7 +770,7 @@ if st.session_state['data']:
                 with st.spinner("正在生成新闻来源分布图表..."):
                     # 新闻来源分布饼图
                     st.markdown("#### News Source Distribution")
-                    source_distribution = df_current.groupby("信源").size().reset_index(name="数量")
+                    source_distribution = chart_summary['source'][["信源", "新闻数量"]].rename(columns={"新闻数量": "数量"})
                     source_distribution = source_distribution.sort_values(by="数量", ascending=False).head(8)
                     
                     # 如果有超过8个来源，将剩余的合并为"其他"
@@ -908,20 +781,10 @@ if st.session_state['data']:
                             top_sources.loc[len(top_sources)] = ["其他", other_count]
                         source_distribution = top_sources
                     
-                    # 创建饼图
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    ax.pie(source_distribution["数量"], labels=source_distribution["信源"], autopct='%1.1f%%', startangle=90)
-                    ax.axis('equal')  # 确保饼图是圆形
-                    
-                    # 根据筛选条件调整标题
-                    if country_filter == "所有国家":
-                        ax.set_title("Global News Source Distribution")
-                    else:
-                        ax.set_title(f"{country_filter} 新闻来源分布")
-                    
-                    # 设置图表边距
-                    plt.tight_layout()
-                    st.pyplot(fig)
+                    show_chart(
+                        'pie', source_distribution, x="数量", y="信源",
+                        title="Global News Source Distribution" if country_filter == "所有国家" else f"{country_filter} 新闻来源分布"
+                    )
             
             # 第三行图表：流量分布和地区分布
             st.markdown("### Traffic and Regional Distribution Analysis")
@@ -929,94 +792,52 @@ if st.session_state['data']:
             
             with col_chart5:
                 with st.spinner("正在生成流量分布图表..."):
-                    # 流量分布箱线图
+                    # 流量分布箱线图：先在服务端计算四分位数和离群点，图表只使用这些统计量
                     st.markdown("#### Traffic Distribution")
                     if country_filter == "所有国家":
                         # 多国家流量分布对比
                         if len(df_current["国家"].unique()) > 1:
-                            fig, ax = plt.subplots(figsize=(10, 6))
-                            sns.boxplot(x="国家", y="流量", data=df_current, ax=ax, palette="Set3")
-                            ax.set_xlabel("国家")
-                            ax.set_ylabel("Traffic")
-                            ax.set_title("Traffic Distribution by Country")
-                            plt.xticks(rotation=45, fontsize=8)
-                            plt.tight_layout()
-                            st.pyplot(fig)
+                            show_chart(
+                                'box', box_stats(df_current, "国家"), rotate_labels=True,
+                                xlabel="国家", ylabel="Traffic", title="Traffic Distribution by Country"
+                            )
                         else:
                             # 单个国家流量分布
-                            fig, ax = plt.subplots(figsize=(10, 6))
-                            sns.boxplot(y="流量", data=df_current, ax=ax, palette="Set3")
-                            ax.set_ylabel("Traffic")
-                            ax.set_title(f"{country_filter} 流量分布")
-                            plt.tight_layout()
-                            st.pyplot(fig)
+                            show_chart('box', box_stats(df_current), ylabel="Traffic", title=f"{country_filter} 流量分布")
                     else:
                         # 单个国家不同地区的流量分布
                         if "地区" in df_current.columns and len(df_current["地区"].unique()) > 1:
-                            fig, ax = plt.subplots(figsize=(10, 6))
                             # 只显示流量最大的前10个地区
-                            top_regions = df_current.groupby("地区")["流量"].sum().nlargest(10).index
+                            top_regions = chart_summary['region'].nlargest(10, "总流量")["地区"]
                             df_top_regions = df_current[df_current["地区"].isin(top_regions)]
-                            sns.boxplot(x="地区", y="流量", data=df_top_regions, ax=ax, palette="Set3")
-                            ax.set_xlabel("Region")
-                            ax.set_ylabel("Traffic")
-                            ax.set_title(f"{country_filter} 各地区流量分布")
-                            plt.xticks(rotation=45, fontsize=8)
-                            plt.tight_layout()
-                            st.pyplot(fig)
+                            show_chart(
+                                'box', box_stats(df_top_regions, "地区"), rotate_labels=True,
+                                xlabel="Region", ylabel="Traffic", title=f"{country_filter} 各地区流量分布"
+                            )
                         else:
                             # 单个国家流量分布（无地区数据或地区数据不足）
-                            fig, ax = plt.subplots(figsize=(10, 6))
-                            sns.boxplot(y="流量", data=df_current, ax=ax, palette="Set3")
-                            ax.set_ylabel("流量")
-                            ax.set_title(f"{country_filter} 流量分布")
-                            plt.tight_layout()
-                            st.pyplot(fig)
+                            show_chart('box', box_stats(df_current), ylabel="流量", title=f"{country_filter} 流量分布")
             
             with col_chart6:
                 with st.spinner("正在生成地区分布图表..."):
                     # 国家地区分布（仅当选择单个国家时）
                     if country_filter != "所有国家" and len(df_current) > 0:
                         # 按地区分组统计新闻数量
-                        region_news_count = df_current.groupby("地区").size().reset_index(name="新闻数量")
+                        region_news_count = chart_summary['region'][["地区", "新闻数量"]]
                         region_news_count = region_news_count.sort_values(by="新闻数量", ascending=False).head(10)
-                        
-                        # 创建图表
-                        fig, ax = plt.subplots(figsize=(10, 6))
-                        sns.barplot(x="新闻数量", y="地区", data=region_news_count, hue="地区", palette="RdBu_r", ax=ax, legend=False)
-                        ax.set_xlabel("Number of News Records")
-                        ax.set_ylabel("Region")
-                        ax.set_title(f"News Records by Region")
-                        
-                        # 在柱状图上添加数值标签
-                        for i, v in enumerate(region_news_count["新闻数量"]):
-                            ax.text(v + 0.5, i, str(v), va='center', fontsize=10)
-                        
-                        # 设置图表边距
-                        plt.tight_layout()
-                        st.pyplot(fig)
+                        show_chart(
+                            'bar', region_news_count, x="新闻数量", y="地区", palette="RdBu_r",
+                            xlabel="Number of News Records", ylabel="Region", title="News Records by Region"
+                        )
                     else:
                         # 当选择所有国家时，显示地区数量分布
-                        region_count = df_current.groupby("国家")["地区数量"].mean().reset_index(name="平均地区数量")
+                        region_count = chart_summary['country'][["国家", "平均地区数量"]]
                         region_count = region_count.sort_values(by="平均地区数量", ascending=False).head(10)
-                        
-                        fig, ax = plt.subplots(figsize=(10, 6))
-                        sns.barplot(x="平均地区数量", y="国家", data=region_count, hue="国家", palette="Purples", ax=ax, legend=False)
-                        ax.set_xlabel("Average Number of Regions")
-                        ax.set_ylabel("国家")
-                        ax.set_title("Average Regions Involved by Country")
-                        
-                        # 在柱状图上添加数值标签
-                        for i, v in enumerate(region_count["平均地区数量"]):
-                            ax.text(v + 0.05, i, f"{v:.1f}", va='center', fontsize=10)
-                        
-                        # 设置图表边距
-                        plt.tight_layout()
-                        st.pyplot(fig)
-            
-            # 重置Matplotlib设置，避免影响后续图表
-            plt.close('all')
-            sns.reset_orig()
+                        show_chart(
+                            'bar', region_count, x="平均地区数量", y="国家", palette="Purples",
+                            label_format="{:.1f}", label_offset=0.05,
+                            xlabel="Average Number of Regions", ylabel="国家", title="Average Regions Involved by Country"
+                        )
     else:
         st.info("当前筛选条件下没有数据可用于可视化")
 
@@ -1085,8 +906,49 @@ if st.session_state['data']:
         }
     )
 
+    # --- 全文搜索（覆盖全部历史数据）---
+    st.subheader("🔎 全文搜索")
+    search_col1, search_col2 = st.columns([4, 1])
+    with search_col1:
+        search_query = st.text_input(
+            "搜索新闻标题、搜索词和来源",
+            placeholder="例如: world cup 或 \"prime minister\"",
+            help="在全部国家和日期中搜索，空格分隔的关键字需全部命中，双引号括起的部分作为整体匹配",
+            key="news_search_query"
+        )
+    with search_col2:
+        search_limit = st.number_input("最多结果数", min_value=10, max_value=1000, value=100, step=10, key="news_search_limit")
+    search_index = get_news_search_index()
+    if st.session_state.get('search_index_version') != st.session_state.get('data_version', 0):
+        # 只在数据重新加载或抓取后检查新增或变化的每日文件，在后台线程中进行，首次使用时会建立完整索引
+        search_index.update_in_background()
+        st.session_state['search_index_version'] = st.session_state.get('data_version', 0)
+    if search_query.strip():
+        if search_index.updating:
+            st.info("全文索引正在后台更新，结果可能不完整，稍后重新搜索即可获得完整结果")
+        search_started = datetime.now()
+        hits = search_index.search(search_query, limit=int(search_limit))
+        search_ms = (datetime.now() - search_started).total_seconds() * 1000
+        st.caption(f"找到 {len(hits)} 条结果（{search_ms:.0f} ms）")
+        if hits:
+            hits_df = pd.DataFrame(hits)[["file_date", "country", "term", "highlight", "source", "traffic_num", "url"]]
+            st.dataframe(
+                hits_df,
+                width='stretch',
+                hide_index=True,
+                column_config={
+                    "file_date": st.column_config.Column("日期", width="small"),
+                    "country": st.column_config.Column("国家", width="small"),
+                    "term": st.column_config.Column("搜索词", width="medium"),
+                    "highlight": st.column_config.Column("新闻标题", width="large", help="【】标出命中的位置"),
+                    "source": st.column_config.Column("新闻来源", width="medium"),
+                    "traffic_num": st.column_config.NumberColumn("流量", width="small", format="%d"),
+                    "url": st.column_config.LinkColumn("链接", width="small")
+                }
+            )
+
     # --- AI 功能区域 ---
-    if st.session_state['data']:  # 仅当有数据时才显示 AI 功能
+    if not st.session_state['data'].empty:  # 仅当有数据时才显示 AI 功能
         st.subheader("🤖 AI 分析功能")
 
         # AI 配置设置
@@ -1211,13 +1073,42 @@ if st.session_state['data']:
             # 压缩格式选择
             compression_format = st.selectbox(
                 "压缩格式选择", 
-                ["markdown", "ison"], 
-                index=["markdown", "ison"].index(st.session_state['ai_config'].get('compression_format', 'markdown')),
+                FORMATS, 
+                index=FORMATS.index(st.session_state['ai_config'].get('compression_format', 'markdown')),
                 key="compression_format",
-                help="选择发送给 AI 的数据压缩格式：markdown 为传统表格格式，ison 为更高效的压缩格式"
+                help="选择发送给 AI 的数据压缩格式：markdown 为传统表格格式，ison 为更高效的压缩格式，"
+                     "grouped 每个趋势只输出一次（合并各地区的记录、地区使用短代码、新闻去重），token 最少"
             )
             if compression_format != st.session_state['ai_config'].get('compression_format'):
                 st.session_state['ai_config']['compression_format'] = compression_format
+
+            # 分析模式选择
+            analysis_modes = ["single", "map_reduce"]
+            analysis_mode = st.selectbox(
+                "分析模式",
+                analysis_modes,
+                index=analysis_modes.index(st.session_state['ai_config'].get('analysis_mode', config.AI_ANALYSIS_MODE)),
+                key="analysis_mode",
+                help="single 为单次请求，数据超出上下文时按 Token 预算选择最重要的趋势；"
+                     "map_reduce 按国家和日期把全部数据拆分为多块并发分析，再合并各块的部分报告"
+            )
+            if analysis_mode != st.session_state['ai_config'].get('analysis_mode'):
+                st.session_state['ai_config']['analysis_mode'] = analysis_mode
+
+            # 回复缓存：相同端点、模型和消息的请求直接回放缓存的回复
+            cache_col1, cache_col2 = st.columns([3, 1])
+            with cache_col1:
+                use_response_cache = st.checkbox(
+                    "使用回复缓存",
+                    value=st.session_state['ai_config'].get('use_response_cache', config.USE_AI_RESPONSE_CACHE),
+                    key="use_response_cache",
+                    help="相同的端点、模型和对话内容直接回放上一次的回复，不再重新生成；取消勾选可强制重新生成"
+                )
+                st.session_state['ai_config']['use_response_cache'] = use_response_cache
+            with cache_col2:
+                if st.button("🗑️ 清空缓存", key="clear_response_cache"):
+                    get_response_cache().clear()
+                    st.toast("✅ 回复缓存已清空", icon="🗑️")
         
         # 模型测试按钮
         if st.button("🧪 测试模型连通性", key="test_model"):
@@ -1235,7 +1126,7 @@ if st.session_state['data']:
                         
                         # 创建临时客户端
                         st.write("🔧 创建测试客户端...")
-                        test_client = OpenAI(base_url=test_endpoint, api_key=test_api_key)
+                        test_client = create_openai_client(base_url=test_endpoint, api_key=test_api_key)
                         
                         # 发送测试消息
                         st.write("📝 准备测试消息...")
@@ -1294,34 +1185,40 @@ if st.session_state['data']:
         ai_api_key = st.session_state['ai_config'].get('api_key', DEFAULT_API_KEY)
         ai_model = st.session_state['ai_config'].get('model', DEFAULT_MODEL)
         compression_format = st.session_state['ai_config'].get('compression_format', 'markdown')
+        analysis_mode = st.session_state['ai_config'].get('analysis_mode', config.AI_ANALYSIS_MODE)
+
+        # 表格的 token 预算：模型上下文窗口减去系统提示词、用户提示词和为回复预留的部分；为 0 时不发送任何数据
+        max_tokens = context_window(ai_model, default=DEFAULT_MAX_TOKENS)
+        table_budget = max(max_tokens - config.AI_RESPONSE_TOKEN_RESERVE
+                           - estimate_tokens(DEFAULT_SYSTEM_PROMPT, ai_model)
+                           - estimate_tokens(DEFAULT_USER_PROMPT + "\n\n", ai_model), 0)
+        selection = None
 
         if df_current.empty:
                 st.error("当前筛选条件下无数据可供分析")
         elif not ai_api_key.strip():
             st.error("请先填写 API Key")
+        elif table_budget <= 0:
+            st.error(f"{ai_model} 的上下文窗口（{max_tokens:,} tokens）扣除提示词和回复预留后没有剩余空间，无法发送数据")
         else:
-            # 根据选择的压缩格式生成内容
-            if compression_format == 'ison':
-                content = generate_ison_content(df_current)
-            else:
-                content = generate_simple_markdown_table(df_current)
-            
-            # 拼接发送给 AI 的内容
-            user_prompt_with_table = DEFAULT_USER_PROMPT + "\n\n" + content
+            # 根据选择的压缩格式生成内容并拼接发送给 AI 的内容（按筛选条件、格式和预算缓存）
+            with st.spinner("正在按 Token 预算选择趋势..."):
+                table_key, user_prompt_with_table, selection = get_prompt_table(
+                    df_current, compression_format, filter_key, table_budget, ai_model
+                )
             
-            # 估算 Token
+            # 估算 Token：表格按 (筛选条件, 格式, 预算) 只计数一次
             with st.spinner("正在估算 Token 数量..."):
                 try:
                     system_tokens = estimate_tokens(DEFAULT_SYSTEM_PROMPT, ai_model)
-                    user_tokens = estimate_tokens(user_prompt_with_table, ai_model)
+                    user_tokens = estimate_tokens(user_prompt_with_table, ai_model, key=('user_prompt', table_key, DEFAULT_USER_PROMPT))
                     total_tokens = system_tokens + user_tokens
                 except Exception as e:
                     st.warning(f"Token 估算失败（使用默认模型估算）: {e}")
                     # fallback
-                    total_tokens = estimate_tokens(
-                        DEFAULT_SYSTEM_PROMPT + "\n\n" + user_prompt_with_table, 
-                        "gpt-4o"
-                    )
+                    system_tokens = estimate_tokens(DEFAULT_SYSTEM_PROMPT, "gpt-4o")
+                    user_tokens = estimate_tokens(user_prompt_with_table, "gpt-4o", key=('user_prompt', table_key, DEFAULT_USER_PROMPT))
+                    total_tokens = system_tokens + user_tokens
                 # 显示 Token 信息（持久显示）
                 st.session_state['token_count'] = total_tokens
                 
@@ -1329,7 +1226,7 @@ if st.session_state['data']:
                 token_info_container = st.container(border=True)
                 with token_info_container:
                     st.markdown("### 📊 Token 估算信息")
-                    col1, col2, col3, col4 = st.columns(4)
+                    col1, col2, col3, col4, col5 = st.columns(5)
                     with col1:
                         st.metric("系统提示词", f"{system_tokens:,}")
                     with col2:
@@ -1338,37 +1235,133 @@ if st.session_state['data']:
                         st.metric("首轮总计", f"{total_tokens:,}")
                     with col4:
                         st.metric("对话累计", f"{st.session_state['total_token_count']:,}")
+                    with col5:
+                        cache_stats = get_response_cache().stats()
+                        st.metric(
+                            "回复缓存 命中/未命中", f"{cache_stats['hits']:,} / {cache_stats['misses']:,}",
+                            help=f"本进程的累计次数；缓存中共 {cache_stats['entries']:,} 条回复，"
+                                 f"{cache_stats['bytes'] / 1024 / 1024:.1f} MB"
+                        )
                     
                     # 显示 Token 使用情况的进度条
-                    max_tokens = DEFAULT_MAX_TOKENS
                     progress = min(total_tokens / max_tokens, 1.0)
                     st.progress(progress)
                     
+                    if selection is not None and selection['rows'] == 0:
+                        st.error(f"⚠️ Token 预算（{selection['budget']:,}）放不下任何一个趋势，无法发送数据")
+                    elif selection is not None and selection['truncated']:
+                        st.info(
+                            f"✂️ 数据超出 {ai_model} 的上下文预算，已按流量、地区广度、时效和国家平衡选择 "
+                            f"{selection['trends']:,}/{selection['total_trends']:,} 个趋势"
+                            f"（{selection['rows']:,}/{selection['total_rows']:,} 行，表格约 {selection['tokens']:,} tokens）"
+                        )
+
                     if total_tokens > max_tokens:
                         st.error(f"⚠️ 首轮 Token 超过 {max_tokens:,} 限制！可能影响分析效果。")
                     else:
                         remaining = max_tokens - total_tokens
                         st.success(f"✅ 首轮剩余 Token: {remaining:,}")
 
+                    # 三种格式的实际 token 对比（按筛选条件缓存，需要时才生成另外两种格式）
+                    with st.expander("📏 各压缩格式的 Token 对比"):
+                        format_comparison = st.session_state.get('format_comparison')
+                        if format_comparison is None or format_comparison[0] != (filter_key, ai_model):
+                            format_comparison = None
+                            if st.button("测量当前数据在各格式下的 Token", key="measure_formats"):
+                                with st.spinner("正在生成各格式并计数..."):
+                                    format_comparison = ((filter_key, ai_model), compare_formats(
+                                        df_current,
+                                        lambda text, fmt: estimate_tokens(text, ai_model, key=('format_comparison', filter_key, fmt))
+                                    ))
+                                    st.session_state['format_comparison'] = format_comparison
+                        if format_comparison is not None:
+                            st.dataframe(
+                                pd.DataFrame(format_comparison[1]).rename(columns={
+                                    'format': '格式', 'chars': '字符数', 'tokens': 'Token',
+                                    'vs_markdown': '相对 markdown 节省', 'vs_ison': '相对 ison 节省'
+                                }),
+                                hide_index=True,
+                                width='stretch',
+                                column_config={
+                                    '相对 markdown 节省': st.column_config.NumberColumn(format="percent"),
+                                    '相对 ison 节省': st.column_config.NumberColumn(format="percent"),
+                                }
+                            )
+
+                # 分块分析：按国家和日期拆分全部数据（每块不超过上下文中可用于表格的预算）
+                if analysis_mode == 'map_reduce':
+                    chunk_tokens = min(config.AI_MAP_CHUNK_TOKENS, table_budget)
+                    with st.spinner("正在按国家和日期拆分数据..."):
+                        chunks = get_chunk_plan(df_current, compression_format, filter_key, chunk_tokens, ai_model)
+                    with st.container(border=True):
+                        st.markdown("### 🧩 分块分析计划")
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            st.metric("分块数", f"{len(chunks):,}")
+                        with col2:
+                            st.metric("数据估算 Token", f"{sum(chunk['estimated_tokens'] for chunk in chunks):,}")
+                        with col3:
+                            st.metric("并发上限", f"{config.AI_MAP_MAX_IN_FLIGHT}")
+                        st.caption(f"全部 {len(df_current):,} 行按国家和日期拆分，每块不超过 {chunk_tokens:,} tokens；"
+                                   f"各块的部分报告随后合并为一份完整分析（合并结果以流式显示）")
+
                 
         # 启动分析按钮
         if st.button("🚀 启动 AI 分析", type="primary"):
-            if total_tokens > DEFAULT_MAX_TOKENS:
-                st.warning(f"⚠️ 首轮 Token 超过 {DEFAULT_MAX_TOKENS} 限制！可能影响分析效果。")
+            if table_budget <= 0 or (analysis_mode != 'map_reduce' and selection is not None and selection['rows'] == 0):
+                st.error("Token 预算内放不下任何数据，未启动分析")
+            elif analysis_mode == 'map_reduce':
+                with st.status("正在分块分析...", expanded=True) as status:
+                    try:
+                        client = create_openai_client(base_url=ai_endpoint, api_key=ai_api_key)
+                        st.session_state['ai_client'] = client
+                        st.write(f"🧩 共 {len(chunks)} 块，最多同时进行 {config.AI_MAP_MAX_IN_FLIGHT} 个请求...")
+                        map_progress = st.progress(0.0)
+
+                        def show_chunk_result(done, total, result):
+                            # 在脚本线程中回调，可以直接更新界面
+                            map_progress.progress(done / total, text=f"已完成 {done}/{total} 块")
+                            if result['error']:
+                                st.write(f"⚠️ 第 {result['index']} 块（{result['scope']}）失败: {result['error']}")
+
+                        map_results = run_map(
+                            client, ai_model, chunks, compression_format, DEFAULT_SYSTEM_PROMPT, DEFAULT_USER_PROMPT,
+                            on_result=show_chunk_result, response_cache=active_response_cache()
+                        )
+                        st.session_state['map_results'] = map_results
+                        if not any(result['report'] for result in map_results):
+                            raise RuntimeError("所有分块的分析均失败")
+
+                        st.write("📝 合并各块的部分报告...")
+                        # 合并请求的用户消息以 DEFAULT_USER_PROMPT 开头，对话区域只显示提示词部分
+                        st.session_state['ai_messages'] = reduce_messages(
+                            client, ai_model, map_results, DEFAULT_SYSTEM_PROMPT, DEFAULT_USER_PROMPT, table_budget,
+                            response_cache=active_response_cache()
+                        )
+                        st.session_state['conversation_tokens'] = ConversationTokens(ai_model)
+                        st.session_state['total_token_count'] = st.session_state['conversation_tokens'].update(
+                            st.session_state['ai_messages']
+                        )
+                        st.session_state['ai_active'] = True
+
+                        status.update(label="分块分析完成，正在合并", state="complete", expanded=False)
+                        st.rerun()
+                    except Exception as e:
+                        status.update(label="分块分析失败", state="error", expanded=True)
+                        st.error(f"分块分析失败: {e}")
+                        st.toast("❌ AI 分析启动失败", icon="⚠️")
+            elif total_tokens > max_tokens:
+                st.warning(f"⚠️ 首轮 Token 超过 {max_tokens} 限制！可能影响分析效果。")
                 if st.button("❗ 确认继续分析", type="secondary", key="confirm_overlimit"):
                     with st.status("正在启动 AI 分析...", expanded=True) as status:
                         try:
                             st.write("🔧 初始化 AI 客户端...")
-                            client = OpenAI(base_url=ai_endpoint, api_key=ai_api_key)
+                            client = create_openai_client(base_url=ai_endpoint, api_key=ai_api_key)
                             
-                            # 再次生成内容以确保使用最新的压缩格式
-                            if compression_format == 'ison':
-                                content = generate_ison_content(df_current)
-                            else:
-                                content = generate_simple_markdown_table(df_current)
-                            
-                            # 拼接发送给 AI 的内容
-                            user_prompt_with_table = DEFAULT_USER_PROMPT + "\n\n" + content
+                            # 确保使用最新的压缩格式（筛选条件和格式未变化时直接复用）
+                            table_key, user_prompt_with_table, selection = get_prompt_table(
+                                df_current, compression_format, filter_key, table_budget, ai_model
+                            )
                             st.session_state['ai_client'] = client
                             
                             st.write("📝 准备分析数据...")
@@ -1378,8 +1371,11 @@ if st.session_state['data']:
                                 {"role": "user", "content": user_prompt_with_table} # 包含表格
                             ]
                             
-                            # 将初始 token 数量累加到 total_token_count 中
-                            st.session_state['total_token_count'] = total_tokens
+                            # 对话 token 增量计数：首轮两条消息使用已估算的数量，之后只对新增的消息计数
+                            st.session_state['conversation_tokens'] = ConversationTokens(ai_model)
+                            st.session_state['total_token_count'] = st.session_state['conversation_tokens'].update(
+                                st.session_state['ai_messages'], known_counts={0: system_tokens, 1: user_tokens}
+                            )
                             
                             st.write("🚀 启动分析流程...")
                             st.session_state['ai_active'] = True
@@ -1396,7 +1392,7 @@ if st.session_state['data']:
                 with st.status("正在启动 AI 分析...", expanded=True) as status:
                     try:
                         st.write("🔧 初始化 AI 客户端...")
-                        client = OpenAI(base_url=ai_endpoint, api_key=ai_api_key)
+                        client = create_openai_client(base_url=ai_endpoint, api_key=ai_api_key)
                         st.session_state['ai_client'] = client
                         
                         st.write("📝 准备分析数据...")
@@ -1406,8 +1402,11 @@ if st.session_state['data']:
                             {"role": "user", "content": user_prompt_with_table} # 包含表格
                         ]
                         
-                        # 将初始 token 数量累加到 total_token_count 中
-                        st.session_state['total_token_count'] = total_tokens
+                        # 对话 token 增量计数：首轮两条消息使用已估算的数量，之后只对新增的消息计数
+                        st.session_state['conversation_tokens'] = ConversationTokens(ai_model)
+                        st.session_state['total_token_count'] = st.session_state['conversation_tokens'].update(
+                            st.session_state['ai_messages'], known_counts={0: system_tokens, 1: user_tokens}
+                        )
                         
                         st.write("🚀 启动分析流程...")
                         st.session_state['ai_active'] = True
@@ -1426,6 +1425,14 @@ if st.session_state['data']:
             st.divider()
             st.subheader("💬 AI 对话")
 
+            # 分块分析的各块部分报告
+            map_results = st.session_state.get('map_results')
+            if map_results and analysis_mode == 'map_reduce':
+                with st.expander(f"🧩 各块的部分报告（{len(map_results)} 块）"):
+                    for result in map_results:
+                        st.markdown(f"**第 {result['index']} 块：{result['scope']}**")
+                        st.markdown(result['report'] or f"⚠️ 分析失败: {result['error']}")
+
             # 显示已有完整对话
             messages = st.session_state.get('ai_messages', [])
             print(f"DEBUG: 消息历史长度: {len(messages)}")
@@ -1433,7 +1440,7 @@ if st.session_state['data']:
             for msg in messages:
                 if msg["role"] == "user":
                     # 检查是否是初始消息（包含表格的消息）
-                    if DEFAULT_TABLE_CONTENT_PLACEHOLDER in msg['content'] or "news_title | source" in msg['content']:
+                    if DEFAULT_TABLE_CONTENT_PLACEHOLDER in msg['content'] or msg['content'].startswith(DEFAULT_USER_PROMPT + "\n\n"):
                         # 初始消息只显示提示词部分，不显示表格
                         st.markdown(f"🧑‍💻 **You** {DEFAULT_USER_PROMPT}")
                     else:
@@ -1485,49 +1492,55 @@ if st.session_state['data']:
                             st.error("AI 客户端未初始化")
                             st.toast("❌ AI 分析失败", icon="⚠️")
                         else:
-                            st.write("🚀 调用 AI 模型进行分析...")
-                            print("DEBUG: 调用 chat.completions.create()")
-                            stream = st.session_state['ai_client'].chat.completions.create(
-                                model=ai_model,
-                                messages=messages, # 包含完整历史（包含表格）
-                                stream=True,
-                            )
+                            # 回复缓存：相同端点、模型和对话（含系统提示词和表格）直接回放缓存的回复
+                            response_cache = active_response_cache()
+                            response_key = cache_key(ai_endpoint, ai_model, messages) if response_cache is not None else None
+                            cached_response = response_cache.get(response_key) if response_cache is not None else None
+                            if cached_response is not None:
+                                st.write("⚡ 命中回复缓存，直接回放...")
+                                pieces = replay(cached_response)
+                            else:
+                                st.write("🚀 调用 AI 模型进行分析...")
+                                print("DEBUG: 调用 chat.completions.create()")
+                                stream = st.session_state['ai_client'].chat.completions.create(
+                                    model=ai_model,
+                                    messages=messages, # 包含完整历史（包含表格）
+                                    stream=True,
+                                )
+                                print("DEBUG: 成功获取流式响应")
+                                pieces = (chunk.choices[0].delta.content for chunk in stream
+                                          if chunk.choices and chunk.choices[0].delta.content is not None)
                             
                             st.write("📊 正在接收分析结果...")
-                            print("DEBUG: 成功获取流式响应")
                             full_response = ""
                             # 创建一个占位符用于流式显示 AI 回复
                             ai_response_placeholder = st.empty()
                             ai_response_placeholder.markdown("🤖 **AI:** 生成中...")
                             
                             print("DEBUG: 开始接收流式数据")
-                            for chunk in stream:
-                                print(f"DEBUG: 接收到 chunk: {chunk}")
-                                if chunk.choices[0].delta.content is not None:
-                                    chunk_content = chunk.choices[0].delta.content
-                                    print(f"DEBUG: 接收到内容: '{chunk_content}'")
-                                    full_response += chunk_content
-                                    print(f"DEBUG: 当前 full_response: '{full_response}'")
-                                    # 实时更新占位符
-                                    ai_response_placeholder.markdown(f"🤖 **AI:** {full_response}")
+                            for chunk_content in pieces:
+                                print(f"DEBUG: 接收到内容: '{chunk_content}'")
+                                full_response += chunk_content
+                                # 实时更新占位符
+                                ai_response_placeholder.markdown(f"🤖 **AI:** {full_response}")
                             
                             print(f"DEBUG: 流式结束，最终 full_response: '{full_response}'")
                             print(f"DEBUG: full_response 长度: {len(full_response)}")
+                            if cached_response is None and response_cache is not None:
+                                response_cache.put(response_key, ai_endpoint, ai_model, full_response)
                             
                             # 循环结束后，保存完整的 AI 回复
                             st.session_state['ai_messages'].append({"role": "assistant", "content": full_response})
                             print(f"DEBUG: 会话状态消息长度: {len(st.session_state['ai_messages'])}")
                             print(f"DEBUG: 最后一条消息: {st.session_state['ai_messages'][-1]}")
                             
-                            # 计算并累计新的对话token
+                            # 计算并累计新的对话token：只对新增的用户消息和 AI 回复计数
                             try:
-                                # 计算AI回复的token
-                                assistant_tokens = estimate_tokens(full_response, ai_model)
-                                # 计算最后一条用户消息的token
-                                last_user_message = messages[-1]['content']
-                                user_tokens = estimate_tokens(last_user_message, ai_model)
-                                # 累计到总token数
-                                st.session_state['total_token_count'] += user_tokens + assistant_tokens
+                                if 'conversation_tokens' not in st.session_state:
+                                    st.session_state['conversation_tokens'] = ConversationTokens(ai_model)
+                                st.session_state['total_token_count'] = st.session_state['conversation_tokens'].update(
+                                    st.session_state['ai_messages'], ai_model
+                                )
                             except Exception as e:
                                 print(f"DEBUG: 计算对话token失败: {e}")
                             
@@ -1558,5 +1571,5 @@ else:
 # if st.button("Refresh Data"):
 #     start_date = (datetime.now().date() - timedelta(days=7)) # 或根据当前选择的范围
 #     end_date = datetime.now().date()
-#     st.session_state['data'] = load_data_by_date_range(start_date, end_date)
+#     st.session_state['data'] = load_dashboard_frame(start_date, end_date)
 #     st.rerun()
\ No newline at end of file
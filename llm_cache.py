@@ -0,0 +1,196 @@
+"""
+AI 回复缓存模块
+
+在相同的筛选条件和模型下重新“启动 AI 分析”，会把同样的大段提示词再次发送给模型并等待完整的重新生成。
+此模块把模型的完整回复保存在 SQLite 文件中，键为 (端点, 模型, 消息列表（含系统提示词）) 的 SHA-256，
+相同请求直接返回缓存的回复（看板通过同一个流式显示逻辑立即回放）。
+
+缓存只保存键的哈希和回复文本，不保存提示词本身。条目超过 TTL 后失效；
+总大小超过上限时按最近使用时间淘汰最久未使用的条目。每次操作打开独立的连接（WAL 模式），可以在多个线程之间共享。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+# 导入配置
+from config import current_config
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 键的格式版本，消息序列化方式变化时递增，旧条目自然失效
+CACHE_KEY_VERSION = 1
+
+# 回放缓存回复时每个片段的字符数
+REPLAY_PIECE_CHARS = 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+def cache_key(endpoint: str, model_name: str, messages: list) -> str:
+    """
+    计算请求的缓存键
+
+    Args:
+        endpoint (str): 接口地址（末尾的 / 不影响结果）
+        model_name (str): 模型名称
+        messages (list): 消息列表（{"role", "content"}，第一条通常是系统提示词）
+
+    Returns:
+        str: 十六进制的 SHA-256
+    """
+    payload = json.dumps(
+        [CACHE_KEY_VERSION, (endpoint or "").rstrip("/"), model_name,
+         [(message.get("role"), message.get("content") or "") for message in messages]],
+        ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def replay(text: str, piece_chars: int = REPLAY_PIECE_CHARS):
+    """把缓存的回复切分为片段依次产出，供流式显示逻辑使用"""
+    for start in range(0, len(text), piece_chars):
+        yield text[start:start + piece_chars]
+
+
+class LLMResponseCache:
+    """
+    AI 回复的磁盘缓存（SQLite）。
+
+    hits / misses 为本进程内的命中和未命中次数。
+    """
+
+    def __init__(self, db_path: str = None, ttl_seconds: float = None, max_bytes: int = None):
+        self.db_path = db_path if db_path is not None else current_config.AI_RESPONSE_CACHE_FILE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else current_config.AI_RESPONSE_CACHE_TTL_SECONDS
+        self.max_bytes = max_bytes if max_bytes is not None else current_config.AI_RESPONSE_CACHE_MAX_BYTES
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._initialized = False
+
+    def connect(self) -> sqlite3.Connection:
+        """打开连接，首次使用时创建表"""
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            self._initialized = True
+        return conn
+
+    def _count(self, hit: bool):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> str:
+        """
+        读取缓存的回复，过期的条目视为未命中并删除
+
+        Args:
+            key (str): cache_key 的结果
+
+        Returns:
+            str: 缓存的回复；未命中时为 None
+        """
+        now = time.time()
+        try:
+            with closing(self.connect()) as conn, conn:
+                row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    row = None
+                if row is not None:
+                    conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.error(f"读取 AI 回复缓存 {self.db_path} 时出错: {e}")
+            row = None
+        self._count(row is not None)
+        return row[0] if row is not None else None
+
+    def put(self, key: str, endpoint: str, model_name: str, response: str):
+        """
+        保存回复（空回复不保存），然后删除过期条目并按大小上限淘汰最久未使用的条目
+
+        Args:
+            key (str): cache_key 的结果
+            endpoint (str): 接口地址
+            model_name (str): 模型名称
+            response (str): 完整的回复
+        """
+        if not response:
+            return
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        try:
+            with closing(self.connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, endpoint, model, response, size, created, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, endpoint or "", model_name or "", response, size, now, now)
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.error(f"保存 AI 回复缓存 {self.db_path} 时出错: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """删除过期条目；总大小超过上限时从最久未使用的条目开始删除"""
+        if self.ttl_seconds:
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        if not self.max_bytes:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        logger.info(f"AI 回复缓存超过 {self.max_bytes:,} 字节，淘汰了 {len(evicted)} 个最久未使用的条目")
+
+    def clear(self):
+        """清空缓存"""
+        try:
+            with closing(self.connect()) as conn, conn:
+                conn.execute("DELETE FROM responses")
+        except sqlite3.Error as e:
+            logger.error(f"清空 AI 回复缓存 {self.db_path} 时出错: {e}")
+
+    def stats(self) -> dict:
+        """
+        缓存统计
+
+        Returns:
+            dict: {entries, bytes, hits, misses}
+        """
+        try:
+            with closing(self.connect()) as conn:
+                entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"读取 AI 回复缓存 {self.db_path} 时出错: {e}")
+            entries, total = 0, 0
+        with self.lock:
+            return {"entries": entries, "bytes": total, "hits": self.hits, "misses": self.misses}
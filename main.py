@@ -4,20 +4,16 @@ Google Trends 数据收集应用程序
 此应用程序用于定期从 Google Trends RSS 源收集印度各地区的趋势数据，并将其保存到 JSON 文件中。
 """
 
+import asyncio
 import logging
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
 import pytz
 
 # 导入自定义模块
 from config import Config, get_config
-from data_fetcher import (
-    fetch_all_regions,
-    merge_and_deduplicate,
-    load_existing_data,
-    save_trends_data,
-    remove_unnecessary_fields
-)
+from data_fetcher import fetch_all_regions
 
 # 配置日志
 logging.basicConfig(
@@ -52,20 +48,9 @@ def fetch_country_regions_and_save(country_name):
         # 创建仅包含当前国家的配置
         country_regions = {country_name: country_config}
         
-        # 加载该国家的现有数据
-        existing_data = load_existing_data(country_name)
-
-        # 拉取该国家所有区域的数据
-        country_new_trends = fetch_all_regions(country_regions)
-
-        # 合并和去重
-        final_data = merge_and_deduplicate(country_new_trends, existing_data)
-
-        # 移除不需要的字段
-        final_data = remove_unnecessary_fields(final_data)
-
-        # 保存到文件
-        save_trends_data(final_data, country_name=country_name)
+        # 拉取该国家所有区域的数据，并与当天已有数据合并去重后保存
+        # （未变化的区域会被跳过，合并和保存在 fetch_all_regions 中完成）
+        fetch_all_regions(country_regions)
         
         logger.info(f"国家 {country_name} 的数据抓取和保存完成")
     except Exception as e:
@@ -84,14 +69,44 @@ def fetch_all_regions_and_save():
     
     logger.info("所有国家的数据抓取完成")
 
-# --- APScheduler 配置和主执行块 ---
-if __name__ == "__main__":
-    # 立即执行一次所有国家的数据收集
-    fetch_all_regions_and_save()
+async def fetch_country_regions_and_save_async(fetcher, country_name):
+    """
+    异步版 fetch_country_regions_and_save：通过共享的 AsyncTrendsFetcher 拉取数据，
+    多个国家的任务在同一事件循环中并发执行，共用一个连接池。
+    
+    Args:
+        fetcher (AsyncTrendsFetcher): 共享的异步拉取器
+        country_name (str): 要抓取数据的国家名称
+    """
+    try:
+        logger.info(f"开始抓取国家: {country_name} 的数据 (异步模式)")
+        
+        country_config = config.REGIONS.get(country_name)
+        if not country_config:
+            logger.error(f"未找到国家 {country_name} 的配置")
+            return
+        
+        results = await fetcher.fetch_regions({country_name: country_config})
+        country_new_trends = results.get(country_name, [])
 
-    # 配置调度器
-    scheduler = BlockingScheduler()
+        # 合并和写文件在线程中执行，避免阻塞其他国家的拉取；保存成功后才提交验证器
+        await fetcher.save_country(country_name, country_new_trends, country_config['regions'])
+        
+        logger.info(f"国家 {country_name} 的数据抓取和保存完成")
+    except Exception as e:
+        logger.error(f"抓取国家 {country_name} 的数据时发生错误: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
 
+def add_country_jobs(scheduler, func, extra_args=None):
+    """
+    为每个国家创建基于其时区的 Cron 调度任务
+    
+    Args:
+        scheduler: APScheduler 调度器
+        func: 任务函数，最后一个参数为国家名称
+        extra_args (list, optional): 放在国家名称之前的额外参数
+    """
     # 为每个国家创建独立的调度任务
     logger.info(f"开始为 {len(config.REGIONS)} 个国家创建调度任务...")
     
@@ -111,9 +126,9 @@ if __name__ == "__main__":
             
             # 添加调度任务
             scheduler.add_job(
-                func=fetch_country_regions_and_save,
+                func=func,
                 trigger=trigger,
-                args=[country_name],
+                args=list(extra_args or []) + [country_name],
                 id=job_id,
                 name=f'Fetch Google Trends Data - {country_name}',
                 replace_existing=True
@@ -124,11 +139,54 @@ if __name__ == "__main__":
             logger.error(f"为国家 {country_name} 创建调度任务时发生错误: {e}")
     
     logger.info("所有国家的调度任务已安排完成。")
-    logger.info("按 Ctrl+C 停止调度器...")
 
+async def run_async_scheduler():
+    """
+    异步模式主循环：所有国家共用一个事件循环和一个 AsyncTrendsFetcher
+    """
+    from async_fetcher import AsyncTrendsFetcher
+
+    fetcher = AsyncTrendsFetcher()
     try:
+        # 立即并发执行一次所有国家的数据收集
+        logger.info("开始抓取所有国家的数据 (异步模式)")
+        await asyncio.gather(*(
+            fetch_country_regions_and_save_async(fetcher, country_name)
+            for country_name in config.REGIONS.keys()
+        ))
+        logger.info("所有国家的数据抓取完成")
+
+        scheduler = AsyncIOScheduler()
+        add_country_jobs(scheduler, fetch_country_regions_and_save_async, [fetcher])
+        logger.info("按 Ctrl+C 停止调度器...")
         scheduler.start()
-    except KeyboardInterrupt:
-        logger.info("接收到中断信号，正在关闭 APScheduler...")
-        scheduler.shutdown()
-        print("调度器已关闭。")
\ No newline at end of file
+        try:
+            await asyncio.Event().wait()
+        finally:
+            scheduler.shutdown()
+    finally:
+        await fetcher.close()
+
+# --- APScheduler 配置和主执行块 ---
+if __name__ == "__main__":
+    if config.FETCH_MODE == "async":
+        try:
+            asyncio.run(run_async_scheduler())
+        except KeyboardInterrupt:
+            logger.info("接收到中断信号，正在关闭 APScheduler...")
+            print("调度器已关闭。")
+    else:
+        # 立即执行一次所有国家的数据收集
+        fetch_all_regions_and_save()
+
+        # 配置调度器
+        scheduler = BlockingScheduler()
+        add_country_jobs(scheduler, fetch_country_regions_and_save)
+        logger.info("按 Ctrl+C 停止调度器...")
+
+        try:
+            scheduler.start()
+        except KeyboardInterrupt:
+            logger.info("接收到中断信号，正在关闭 APScheduler...")
+            scheduler.shutdown()
+            print("调度器已关闭。")
\ No newline at end of file
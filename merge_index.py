@@ -0,0 +1,155 @@
+"""
+增量合并索引模块
+
+此模块为每个国家、每一天的数据文件构建合并索引
+（标题 -> 记录位置、新闻去重键集合、区域集合），
+使每次拉取后的合并只触及新增或发生变化的记录，而不必重新去重所有新闻。
+索引在每次合并时根据已加载的当天数据在内存中构建：合并本身需要完整的当天数据，
+构建索引的耗时与从磁盘读取一个持久化的索引相当，因此不再持久化。
+"""
+
+import logging
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+def news_key(news: dict) -> tuple:
+    """新闻去重键（基于标题和来源）"""
+    return (news.get('title', ''), news.get('source', ''))
+
+
+class MergeIndex:
+    """
+    单个国家单日数据文件的合并索引。
+
+    entries: 标题 -> {'offset': 记录在列表中的位置, 'news_keys': 新闻去重键集合, 'regions': 区域集合}
+    """
+
+    def __init__(self, entries: dict = None):
+        self.entries = entries if entries is not None else {}
+
+    @classmethod
+    def build(cls, trends: list) -> "MergeIndex":
+        """
+        根据现有的趋势列表构建索引
+
+        Args:
+            trends (list): 当天已有的趋势数据列表
+
+        Returns:
+            MergeIndex: 新建的索引
+        """
+        entries = {}
+        for offset, item in enumerate(trends):
+            if item['title'] in entries:
+                # 历史文件中可能存在同标题的重复记录，以第一条为准
+                continue
+            # 建索引时顺带去除新闻列表中的重复项，保证已索引记录的新闻唯一
+            keys = set()
+            unique_news = []
+            for news in item.get('news', []):
+                key = news_key(news)
+                if key not in keys:
+                    keys.add(key)
+                    unique_news.append(news)
+            item['news'] = unique_news
+            entries[item['title']] = {
+                'offset': offset,
+                'news_keys': keys,
+                'regions': set(item.get('regions', []))
+            }
+        return cls(entries)
+
+    def merge(self, new_trends: list, existing_trends: list) -> set:
+        """
+        将新拉取的数据合并进 existing_trends（原地修改），只触及新增或变化的记录。
+        如果标题相同，则更新区域列表、国家、热度、时间、图片和新闻。
+
+        Args:
+            new_trends (list): 新拉取的趋势数据列表
+            existing_trends (list): 现有的趋势数据列表，必须与索引对应
+
+        Returns:
+            set: 本次新增或修改的记录位置
+        """
+        changed = set()
+
+        for new_item in new_trends:
+            title = new_item['title']
+            entry = self.entries.get(title)
+            if entry is None:
+                # 新标题：去重其自身的新闻后直接追加
+                keys = set()
+                unique_news = []
+                for news in new_item['news']:
+                    key = news_key(news)
+                    if key not in keys:
+                        keys.add(key)
+                        unique_news.append(news)
+                new_item['news'] = unique_news
+                offset = len(existing_trends)
+                existing_trends.append(new_item)
+                self.entries[title] = {
+                    'offset': offset,
+                    'news_keys': keys,
+                    'regions': set(new_item['regions'])
+                }
+                changed.add(offset)
+                continue
+
+            offset = entry['offset']
+            existing_item = existing_trends[offset]
+            modified = False
+
+            # 更新区域（合并集合，保持原有顺序）
+            for region in new_item['regions']:
+                if region not in entry['regions']:
+                    entry['regions'].add(region)
+                    existing_item['regions'].append(region)
+                    modified = True
+            # 更新国家信息（合并国家集合）
+            if existing_item.get('country') and new_item.get('country'):
+                # 集合无法写入 JSON，因此只有一个国家时保留字符串，多个国家时保存为排序后的列表
+                existing_countries = {existing_item['country']} if isinstance(existing_item['country'], str) else set(existing_item['country'])
+                new_countries = {new_item['country']} if isinstance(new_item['country'], str) else set(new_item['country'])
+                merged_countries = existing_countries | new_countries
+                if merged_countries != existing_countries:
+                    existing_item['country'] = merged_countries.pop() if len(merged_countries) == 1 else sorted(merged_countries)
+                    modified = True
+            elif new_item.get('country') and not existing_item.get('country'):
+                # 如果旧项没有国家信息，使用新项的
+                existing_item['country'] = new_item['country']
+                modified = True
+            # 更新热度（保留较高的）
+            if new_item['traffic_num'] > existing_item['traffic_num']:
+                existing_item['traffic_str'] = new_item['traffic_str']
+                existing_item['traffic_num'] = new_item['traffic_num']
+                modified = True
+            # 更新时间（保留较新的）；两边都有 UTC 时间戳时按时间戳比较，不同时区偏移的 ISO 字符串不能直接比较
+            if 'pub_ts' in new_item and 'pub_ts' in existing_item:
+                is_newer = new_item['pub_ts'] > existing_item['pub_ts']
+            else:
+                is_newer = new_item['pub_date'] > existing_item['pub_date']
+            if is_newer:
+                existing_item['pub_date_str'] = new_item['pub_date_str']
+                existing_item['pub_date'] = new_item['pub_date']
+                if 'pub_ts' in new_item:
+                    existing_item['pub_ts'] = new_item['pub_ts']
+                modified = True
+            # 更新图片（如果新项有图片且旧项没有）
+            if not existing_item.get('picture') and new_item.get('picture'):
+                existing_item['picture'] = new_item['picture']
+                modified = True
+            # 更新新闻（只追加未出现过的新闻，基于标题和来源去重）
+            for news in new_item['news']:
+                key = news_key(news)
+                if key not in entry['news_keys']:
+                    entry['news_keys'].add(key)
+                    existing_item['news'].append(news)
+                    modified = True
+
+            if modified:
+                changed.add(offset)
+
+        return changed
@@ -0,0 +1,356 @@
+"""
+新闻全文搜索模块
+
+此模块在 SQLite FTS5 中为 JSONs 目录树中的全部每日数据文件建立全文索引，
+索引字段为搜索词（趋势的 title）、新闻标题（news[].title）和新闻来源（news[].source），
+每个趋势 × 新闻一条文档（没有新闻的趋势也保留一条，只含搜索词）。
+
+索引是增量维护的：indexed_files 表记录每个每日文件（快照 + 追加日志）的签名，
+update() 只重新索引签名发生变化的文件，并删除已不存在文件的文档；
+看板通过 update_in_background() 在后台线程中更新，首次建立完整索引也不会阻塞页面。
+FTS5 使用 trigram 分词器，因此对泰语、中文等没有空格分词的语言也能做子串搜索；
+结果按 bm25 排序（搜索词的权重高于新闻标题，新闻标题高于来源）。
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import date
+
+# 导入配置
+from config import current_config
+from trend_storage import file_signature, get_journal_filename, load_day_records
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 索引格式版本，文档结构或分词方式变化时递增，旧索引会被自动重建
+SEARCH_INDEX_VERSION = 1
+
+# bm25 列权重：搜索词、新闻标题、新闻来源
+BM25_WEIGHTS = (3.0, 1.0, 0.5)
+
+# trigram 分词器要求每个查询片段至少 3 个字符，更短的片段退回到 LIKE 匹配
+MIN_TRIGRAM_LENGTH = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS indexed_files (
+    file_key TEXT PRIMARY KEY,
+    signature TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    file_key TEXT NOT NULL,
+    country TEXT NOT NULL,
+    file_date TEXT NOT NULL,
+    term TEXT NOT NULL,
+    news_title TEXT NOT NULL,
+    source TEXT NOT NULL,
+    url TEXT,
+    pub_date TEXT,
+    traffic_num INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (file_key, term, news_title, source)
+);
+CREATE INDEX IF NOT EXISTS idx_docs_file_key ON docs (file_key);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+    term, news_title, source,
+    content='docs', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS docs_ai AFTER INSERT ON docs BEGIN
+    INSERT INTO docs_fts (rowid, term, news_title, source) VALUES (new.id, new.term, new.news_title, new.source);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_ad AFTER DELETE ON docs BEGIN
+    INSERT INTO docs_fts (docs_fts, rowid, term, news_title, source) VALUES ('delete', old.id, old.term, old.news_title, old.source);
+END;
+"""
+
+
+def _quote_phrase(text: str) -> str:
+    """把文本转为 FTS5 短语（双引号内的双引号需要写两次）"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _escape_like(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class NewsSearchIndex:
+    """
+    新闻全文搜索索引。
+
+    每次操作打开独立的连接（WAL 模式），看板和命令行可以共享同一个索引文件。
+    """
+
+    def __init__(self, db_path: str = None, source_dir: str = None):
+        if db_path is None:
+            db_path = current_config.SEARCH_INDEX_FILE
+        if source_dir is None:
+            source_dir = current_config.OUTPUT_DIR
+        self.db_path = db_path
+        self.source_dir = source_dir
+        self._initialized = False
+        self._update_lock = threading.Lock()
+        self._update_thread = None
+        self._update_pending = False
+
+    def connect(self) -> sqlite3.Connection:
+        """打开连接，首次使用时创建表；索引版本不一致时清空重建"""
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != str(SEARCH_INDEX_VERSION):
+                with conn:
+                    conn.execute("DELETE FROM docs")
+                    conn.execute("DELETE FROM indexed_files")
+                    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(SEARCH_INDEX_VERSION),))
+            self._initialized = True
+        return conn
+
+    def _day_files(self) -> dict:
+        """扫描数据目录，返回 {相对路径: (绝对路径, 国家目录名, 文件日期)}"""
+        prefix = current_config.OUTPUT_FILE_PREFIX
+        extension = current_config.OUTPUT_FILE_EXTENSION
+        files = {}
+        if not os.path.isdir(self.source_dir):
+            return files
+        for root, dirs, filenames in os.walk(self.source_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            relative_dir = os.path.relpath(root, self.source_dir)
+            country = '' if relative_dir == '.' else relative_dir.split(os.sep)[0]
+            for filename in sorted(filenames):
+                if not (filename.startswith(prefix) and filename.endswith(extension)):
+                    continue
+                path = os.path.join(root, filename)
+                file_date = filename[len(prefix):-len(extension)] if extension else filename[len(prefix):]
+                files[os.path.relpath(path, self.source_dir)] = (path, country, file_date)
+        return files
+
+    @staticmethod
+    def _documents(file_key: str, records: list, country: str, file_date: str) -> list:
+        """把一个每日文件的记录展开为文档行"""
+        documents = []
+        for item in records:
+            term = item.get('title', 'N/A')
+            traffic_num = int(item.get('traffic_num', 0) or 0)
+            pub_date = item.get('pub_date') or ''
+            news_list = item.get('news', []) or []
+            if not news_list:
+                documents.append((file_key, country, file_date, term, '', '', '', pub_date, traffic_num))
+                continue
+            for news in news_list:
+                documents.append((
+                    file_key, country, file_date, term,
+                    news.get('title', 'N/A'), news.get('source', 'N/A'), news.get('url', ''),
+                    pub_date, traffic_num
+                ))
+        return documents
+
+    def update(self) -> dict:
+        """
+        增量更新索引：只重新索引新增或签名变化的每日文件，并移除已删除文件的文档
+
+        Returns:
+            dict: {'indexed': 重新索引的文件数, 'removed': 移除的文件数, 'unchanged': 未变化的文件数}
+        """
+        files = self._day_files()
+        with closing(self.connect()) as conn:
+            known = dict(conn.execute("SELECT file_key, signature FROM indexed_files").fetchall())
+            indexed = 0
+            for file_key, (path, country, file_date) in files.items():
+                signature = json.dumps(file_signature([path, get_journal_filename(path)]))
+                if known.get(file_key) == signature:
+                    continue
+                try:
+                    records = load_day_records(path)
+                except (json.JSONDecodeError, OSError) as e:
+                    logger.error(f"读取数据文件 {path} 时出错: {e}")
+                    continue
+                if not isinstance(records, list):
+                    logger.warning(f"{path} 中的数据不是列表，跳过")
+                    records = []
+                # 每个文件在一个事务中整体替换，中途失败不会留下半份文档
+                with conn:
+                    conn.execute("DELETE FROM docs WHERE file_key = ?", (file_key,))
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO docs (file_key, country, file_date, term, news_title, source, url, pub_date, traffic_num) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        self._documents(file_key, records, country, file_date)
+                    )
+                    conn.execute("INSERT OR REPLACE INTO indexed_files (file_key, signature) VALUES (?, ?)", (file_key, signature))
+                indexed += 1
+
+            removed = [file_key for file_key in known if file_key not in files]
+            if removed:
+                with conn:
+                    for file_key in removed:
+                        conn.execute("DELETE FROM docs WHERE file_key = ?", (file_key,))
+                        conn.execute("DELETE FROM indexed_files WHERE file_key = ?", (file_key,))
+            if indexed or removed:
+                with conn:
+                    conn.execute("INSERT INTO docs_fts (docs_fts) VALUES ('optimize')")
+
+        stats = {'indexed': indexed, 'removed': len(removed), 'unchanged': len(files) - indexed}
+        if indexed or removed:
+            logger.info(f"全文索引已更新: {stats}")
+        return stats
+
+    def update_in_background(self) -> bool:
+        """
+        在后台线程中执行 update()。已有更新在进行时不另起线程，而是在其结束后再检查一次
+
+        Returns:
+            bool: 是否启动了新的后台线程
+        """
+        with self._update_lock:
+            self._update_pending = True
+            if self._update_thread is not None:
+                return False
+            self._update_thread = threading.Thread(target=self._update_loop, name="news-search-update", daemon=True)
+            self._update_thread.start()
+            return True
+
+    def _update_loop(self):
+        """后台线程：直到没有待处理的更新请求为止反复执行 update()"""
+        while True:
+            with self._update_lock:
+                if not self._update_pending:
+                    self._update_thread = None
+                    return
+                self._update_pending = False
+            try:
+                self.update()
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"后台更新全文索引时出错: {e}")
+
+    @property
+    def updating(self) -> bool:
+        """是否有后台更新正在进行"""
+        return self._update_thread is not None
+
+    def rebuild(self) -> dict:
+        """清空并重新建立整个索引"""
+        with closing(self.connect()) as conn, conn:
+            conn.execute("DELETE FROM docs")
+            conn.execute("DELETE FROM indexed_files")
+        return self.update()
+
+    def search(self, query: str, limit: int = 50, country: str = None,
+               start_date: date = None, end_date: date = None) -> list:
+        """
+        全文搜索搜索词、新闻标题和新闻来源，按相关度排序
+
+        查询按空白切分，所有片段都必须出现（不区分大小写的子串匹配）。
+        用双引号括起的部分作为一个整体片段。
+
+        Args:
+            query (str): 查询文本
+            limit (int): 最多返回的结果数
+            country (str, optional): 只搜索该国家目录
+            start_date (date, optional): 文件日期下限（含）
+            end_date (date, optional): 文件日期上限（含）
+
+        Returns:
+            list: 结果字典列表，包含 country、file_date、term、news_title、source、url、pub_date、
+                traffic_num、score（越小越相关）以及用【】标出命中位置的 highlight
+        """
+        parts = self._split_query(query)
+        if not parts:
+            return []
+
+        phrases = [part for part in parts if len(part) >= MIN_TRIGRAM_LENGTH]
+        short_parts = [part for part in parts if len(part) < MIN_TRIGRAM_LENGTH]
+        conditions = []
+        params = []
+        for part in short_parts:
+            conditions.append("(d.term LIKE ? ESCAPE '\\' OR d.news_title LIKE ? ESCAPE '\\' OR d.source LIKE ? ESCAPE '\\')")
+            params.extend([f"%{_escape_like(part)}%"] * 3)
+        if country:
+            conditions.append("d.country = ?")
+            params.append(country)
+        if start_date:
+            conditions.append("d.file_date >= ?")
+            params.append(start_date.strftime('%Y-%m-%d'))
+        if end_date:
+            conditions.append("d.file_date <= ?")
+            params.append(end_date.strftime('%Y-%m-%d'))
+
+        columns = "d.country, d.file_date, d.term, d.news_title, d.source, d.url, d.pub_date, d.traffic_num"
+        if phrases:
+            weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+            sql = f"""
+                SELECT {columns}, bm25(docs_fts, {weights}) AS score,
+                       highlight(docs_fts, 1, '【', '】') AS highlight
+                FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid
+                WHERE docs_fts MATCH ? {''.join(' AND ' + c for c in conditions)}
+                ORDER BY score, d.traffic_num DESC
+                LIMIT ?
+            """
+            params = [" AND ".join(_quote_phrase(phrase) for phrase in phrases)] + params + [limit]
+        else:
+            # 只有短片段时无法使用 trigram 索引，按流量排序返回 LIKE 匹配结果
+            sql = f"""
+                SELECT {columns}, 0.0 AS score, d.news_title AS highlight
+                FROM docs d
+                WHERE {' AND '.join(conditions)}
+                ORDER BY d.traffic_num DESC, d.file_date DESC
+                LIMIT ?
+            """
+            params = params + [limit]
+
+        started = time.perf_counter()
+        with closing(self.connect()) as conn:
+            try:
+                rows = conn.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"全文搜索 {query!r} 时出错: {e}")
+                return []
+        logger.debug(f"全文搜索 {query!r} 返回 {len(rows)} 条结果，耗时 {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        keys = ("country", "file_date", "term", "news_title", "source", "url", "pub_date", "traffic_num", "score", "highlight")
+        return [dict(zip(keys, row)) for row in rows]
+
+    @staticmethod
+    def _split_query(query: str) -> list:
+        """按空白切分查询，双引号括起的部分保持为一个片段"""
+        parts = []
+        for index, chunk in enumerate((query or '').split('"')):
+            if index % 2 == 1:
+                if chunk.strip():
+                    parts.append(chunk.strip())
+            else:
+                parts.extend(chunk.split())
+        return parts
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='新闻全文搜索：更新索引并执行查询')
+    parser.add_argument('query', nargs='?', help='查询文本（省略时只更新索引）')
+    parser.add_argument('--source-dir', default=None, help='源数据目录（默认使用配置中的 OUTPUT_DIR）')
+    parser.add_argument('--db', default=None, help='索引文件（默认使用配置中的 SEARCH_INDEX_FILE）')
+    parser.add_argument('--country', default=None, help='只搜索该国家目录')
+    parser.add_argument('--limit', type=int, default=20, help='最多返回的结果数')
+    parser.add_argument('--rebuild', action='store_true', help='清空并重建索引')
+    args = parser.parse_args()
+
+    index = NewsSearchIndex(args.db, args.source_dir)
+    index.rebuild() if args.rebuild else index.update()
+    if args.query:
+        started = time.perf_counter()
+        hits = index.search(args.query, limit=args.limit, country=args.country)
+        elapsed = (time.perf_counter() - started) * 1000
+        for hit in hits:
+            print(f"{hit['score']:8.2f}  {hit['file_date']}  {hit['country']:<16} {hit['term']} | {hit['highlight']} ({hit['source']})")
+        print(f"共 {len(hits)} 条结果，耗时 {elapsed:.1f} ms")
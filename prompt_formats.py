@@ -0,0 +1,259 @@
+"""
+AI 上下文格式模块
+
+把看板筛选后的数据转换为发送给 AI 的文本。支持三种格式：
+    markdown  每个新闻一行的管道分隔表格
+    ison      每个新闻一行的 ISON 表格（含空格的字段加引号）
+    grouped   每个趋势只输出一次：同一国家、同一天的同一搜索词在各地区的记录合并为一行，
+              地区使用 config.REGIONS 中的短代码并附带各地区流量，新闻标题和来源去重后列在趋势下方
+
+前两种格式中，趋势的搜索词、流量、日期、地区和国家会在它的每一条新闻上重复
+（同一搜索词在多个地区出现时，新闻本身也会重复），grouped 格式去掉了这些重复。
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from config import current_config
+
+# 看板列名 -> AI 上下文中的字段名
+FIELD_NAMES = {
+    "标题": "news_title",
+    "信源": "source",
+    "搜索词": "title",
+    "流量": "traffic_num",
+    "发布日期": "pub_date",
+    "地区": "regions",
+    "国家": "country"
+}
+
+# 可选的格式，依次为界面上的显示顺序
+FORMATS = ["markdown", "ison", "grouped"]
+
+
+# 需要加引号的 ISON 值：空字符串、含空白/引号/反斜杠，或会被解析为数字、布尔、null、引用（:id）的字符串
+_ISON_NEEDS_QUOTES = re.compile(r'^$|[\s"\\]|^(?:true|false|null|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|:.*)$')
+# 每行依次输出的列
+_ROW_FIELDS = ("news_title", "source", "title", "traffic_num", "pub_date", "regions", "country")
+
+
+def ison_value(value: str) -> str:
+    """
+    把字符串转换为 ISON 值：需要时加双引号，并转义引号内的反斜杠、双引号和换行等控制字符
+
+    Args:
+        value (str): 原始字符串
+
+    Returns:
+        str: ISON 值
+    """
+    if _ISON_NEEDS_QUOTES.search(value):
+        # 先转义反斜杠，再转义引号和控制字符
+        escaped = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
+        return '"' + escaped + '"'
+    return value
+
+
+def column_strings(series: pd.Series, transform=None) -> list:
+    """
+    把一列转换为字符串列表（与逐行 str(value) 的结果相同），可选地对每个值再做转换
+
+    分类列只转换用到的类别；有 transform 时每个不同的值只转换一次
+    （同一新闻在多个地区的记录中重复出现，标题列的不同值通常只有行数的几分之一）。
+
+    Args:
+        series (pd.Series): 数据列
+        transform (callable, optional): 对每个字符串值的转换，例如 ison_value
+
+    Returns:
+        list: 字符串列表
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        used = np.unique(codes)
+        used = used[used >= 0]
+        # 编码 -1（缺失值）取最后一个元素 "nan"，与 str(nan) 相同
+        labels = np.full(len(series.cat.categories) + 1, "nan", dtype=object)
+        labels[used] = [str(label) for label in series.cat.categories[used]]
+        used = np.append(used, -1)
+    else:
+        # 逐个 str()：pandas 的 astype(str) 会保留缺失值，与逐行格式化的 "None"/"nan" 不同
+        values = list(map(str, series.tolist()))
+        if transform is None:
+            return values
+        codes, labels = pd.factorize(np.asarray(values, dtype=object))
+        labels = np.asarray(labels, dtype=object)
+        used = np.arange(len(labels))
+    if transform is not None:
+        labels[used] = [transform(label) for label in labels[used]]
+    return labels[codes].tolist()
+
+
+def _serialize_columns(df_filtered, max_rows: int, transform=None) -> list:
+    """按 _ROW_FIELDS 的顺序逐列转换为字符串列表，流量先转换为整数"""
+    df_simple = df_filtered.head(max_rows).rename(columns=FIELD_NAMES)
+    columns = []
+    for field in _ROW_FIELDS:
+        if field == "traffic_num":
+            columns.append(df_simple[field].astype(int).astype(str).tolist())
+        else:
+            columns.append(column_strings(df_simple[field], transform))
+    return columns
+
+
+def generate_simple_markdown_table(df_filtered, max_rows=100000):
+    """
+    生成简化版的 markdown 表格
+
+    按列整体转换为字符串后一次拼接，不逐行构建 Series。
+    """
+    if df_filtered.empty:
+        return "No data to display."
+
+    lines = [
+        '',
+        "news_title | source | title | traffic_num | pub_date | regions | country",
+        "---|---|---|---|---|---|---",
+    ]
+    lines.extend(map(" | ".join, zip(*_serialize_columns(df_filtered, max_rows))))
+    return "\n".join(lines)
+
+
+def generate_ison_content(df_filtered, max_rows=100000):
+    """
+    生成 ISON 格式的内容
+
+    字符串值按 ison_value 加引号和转义（分类列每个类别只处理一次），流量为整数。
+    """
+    if df_filtered.empty:
+        return "table.empty"
+
+    columns = _serialize_columns(df_filtered, max_rows, ison_value)
+    lines = [
+        "table.trends",
+        "news_title source title traffic_num:int pub_date regions country",
+    ]
+    lines.extend(map(" ".join, zip(*columns)))
+    return "\n".join(lines)
+
+
+def region_code_map(regions_config: dict = None) -> tuple:
+    """
+    根据区域配置构建地区名 -> 短代码的映射
+
+    Args:
+        regions_config (dict, optional): 区域配置，默认使用 config.REGIONS
+
+    Returns:
+        tuple: ({(国家, 地区名): 代码}, {地区名: 代码})；后者用于国家列与配置不一致（如多个国家）时查找
+    """
+    if regions_config is None:
+        regions_config = current_config.REGIONS
+    by_country = {}
+    by_name = {}
+    for country_name, country_config in regions_config.items():
+        for region in country_config.get('regions', []):
+            by_country[(country_name, region['name'])] = region['code']
+            by_name.setdefault(region['name'], region['code'])
+    return by_country, by_name
+
+
+def generate_grouped_content(df_filtered, max_rows=100000, regions_config: dict = None):
+    """
+    生成按趋势分组、去重的格式：每个 (国家, 日期, 搜索词) 只输出一次，
+    地区使用短代码并附带该地区的流量，新闻按 (标题, 来源) 去重后列在趋势下方
+
+    Args:
+        df_filtered (pd.DataFrame): 看板筛选后的数据
+        max_rows (int): 最多使用的新闻行数（与其他格式相同的行数上限）
+        regions_config (dict, optional): 区域配置，默认使用 config.REGIONS
+
+    Returns:
+        str: 文本内容
+    """
+    if df_filtered.empty:
+        return "table.empty"
+
+    df_to_use = df_filtered.head(max_rows)
+    by_country, by_name = region_code_map(regions_config)
+    used_codes = {}
+
+    def region_code(country: str, name: str) -> str:
+        code = by_country.get((country, name)) or by_name.get(name)
+        if code is None:
+            # 配置中没有的地区保留原名
+            return name
+        used_codes[code] = name
+        return code
+
+    # 趋势键 -> [最大流量, {地区代码: 流量}, {(新闻标题, 来源)}]，字典保持首次出现的顺序（即看板的排序）
+    trends = {}
+    columns = [df_to_use[column].tolist() for column in ("搜索词", "标题", "信源", "流量", "发布日期", "地区", "国家")]
+    for term, news_title, source, traffic, pub_date, regions, country in zip(*columns):
+        trend = trends.get((country, pub_date, term))
+        if trend is None:
+            trend = trends[(country, pub_date, term)] = [0, {}, {}]
+        traffic = int(traffic)
+        trend[0] = max(trend[0], traffic)
+        for name in regions.split("; ") if regions else []:
+            code = region_code(country, name)
+            trend[1][code] = max(trend[1].get(code, 0), traffic)
+        trend[2].setdefault((news_title, source), None)
+
+    lines = [
+        "table.trends_grouped",
+        "# each trend appears once; regions are code:traffic; its news items (news_title | source) follow on lines starting with '-'",
+    ]
+    if used_codes:
+        lines.append("legend " + "; ".join(f"{code}={name}" for code, name in sorted(used_codes.items())))
+    lines.append("title | pub_date | country | traffic_num | regions")
+    for (country, pub_date, term), (traffic, regions, news) in trends.items():
+        region_text = ",".join(f"{code}:{value}" for code, value in regions.items())
+        lines.append(f"{term} | {pub_date} | {country} | {traffic} | {region_text}")
+        for news_title, source in news:
+            lines.append(f"- {news_title} | {source}")
+    return "\n".join(lines)
+
+
+def generate_prompt_content(df_filtered, compression_format: str, max_rows=100000) -> str:
+    """
+    按格式名生成发送给 AI 的内容
+
+    Args:
+        df_filtered (pd.DataFrame): 看板筛选后的数据
+        compression_format (str): markdown / ison / grouped
+        max_rows (int): 最多使用的新闻行数
+
+    Returns:
+        str: 文本内容
+    """
+    if compression_format == 'ison':
+        return generate_ison_content(df_filtered, max_rows)
+    if compression_format == 'grouped':
+        return generate_grouped_content(df_filtered, max_rows)
+    return generate_simple_markdown_table(df_filtered, max_rows)
+
+
+def compare_formats(df_filtered, count_tokens, max_rows=100000) -> list:
+    """
+    对同一份数据生成全部格式并计数，用于比较各格式的 token 开销
+
+    Args:
+        df_filtered (pd.DataFrame): 看板筛选后的数据
+        count_tokens (callable): 计数函数 (text, 格式名) -> token 数量
+        max_rows (int): 最多使用的新闻行数
+
+    Returns:
+        list: 每种格式一个字典 {format, chars, tokens, vs_markdown, vs_ison}，后两项为相对节省比例
+    """
+    results = []
+    for compression_format in FORMATS:
+        content = generate_prompt_content(df_filtered, compression_format, max_rows)
+        results.append({'format': compression_format, 'chars': len(content), 'tokens': count_tokens(content, compression_format)})
+    baseline = {result['format']: result['tokens'] for result in results}
+    for result in results:
+        for name in ("markdown", "ison"):
+            result[f'vs_{name}'] = 1 - result['tokens'] / baseline[name] if baseline[name] else 0.0
+    return results
@@ -22,6 +22,19 @@ LOG_DATE_PARSE_ERROR = "无法解析 {region_name} - {title} 的日期: {date_st
 
 AI_DEFAULT_USER_PROMPT = "请你对这些热点进行分析，给出一个整体趋势判断，对重点的热点做解释，推测关注群体的画像和社媒内容营销建议"
 AI_DEFAULT_TABLE_CONTENT_PLACEHOLDER = "{table_content}"
+# 分块（map-reduce）分析：数据超出单次请求的上下文时，按国家和日期拆分为多块分别分析，再合并各块的部分报告
+AI_MAP_USER_PROMPT = """{user_prompt}
+
+注意：数据量超出单次分析的上限，已按国家和日期拆分为 {total} 块，以下是第 {index} 块（{scope}）。
+请只针对这一块数据给出简洁的部分报告：最重要的热点（附流量和日期）、主要趋势和值得关注的受众特征。
+这份报告之后会与其他块的报告合并，不需要写开场白和总结。"""
+AI_REDUCE_USER_PROMPT = """以下是按国家和日期拆分数据后，对各块分别分析得到的 {count} 份部分报告。
+请把它们合并为一份完整的分析：去除重复内容，比较不同国家和时间段之间的差异，并按上面的要求输出。{missing}
+
+{reports}"""
+AI_REDUCE_MISSING_NOTE = "\n其中 {count} 块（{scopes}）分析失败，没有对应的报告，请在结论中注明这部分数据未覆盖。"
+AI_REPORT_SECTION = "### 第 {index} 块：{scope}\n{report}"
+
 AI_DEFAULT_SYSTEM_PROMPT = """你是 **GLOBAL TRENDS AI**，一位顶尖数字营销策略专家，专注于全球社交媒体与病毒式趋势分析，擅长区域营销。你具备多年在全球主要市场的实战经验，能够结合数据科学的严谨性与各地文化的深刻理解，分析不同区域的社交媒体热度、趋势和用户行为。
 
 ### **任务目标**：
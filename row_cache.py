@@ -0,0 +1,211 @@
+"""
+内存映射行缓存模块
+
+看板需要把每个趋势 × 新闻展开为一行。此模块为每个每日数据文件构建一次定长布局的二进制行缓存：
+    <ROW_CACHE_DIR>/<country>/trends_YYYY-MM-DD.npy   结构化 numpy 数组，每行一个新闻
+    <ROW_CACHE_DIR>/<country>/trends_YYYY-MM-DD.json  元数据：源文件签名和驻留字符串表
+行中的搜索词、标题、信源、地区、国家都以字符串表中的编号保存，流量和日期保存为整数。
+之后的加载通过 np.load(mmap_mode='r') 零拷贝映射，只在拼接 DataFrame 时按编号取出字符串，
+不再为每一行创建中间的字典对象。
+"""
+
+import json
+import logging
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# 导入配置
+from config import current_config
+from trend_loader import FRAME_COLUMNS, format_country_label, pub_days_utc
+from trend_storage import atomic_write_json, file_signature, get_journal_filename, load_day_records
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 行布局：字符串列保存为字符串表中的编号
+ROW_DTYPE = np.dtype([
+    ('term', np.int32),
+    ('title', np.int32),
+    ('source', np.int32),
+    ('regions', np.int32),
+    ('country', np.int32),
+    ('region_count', np.int32),
+    ('traffic', np.int64),
+    ('day', np.int32),
+])
+
+EPOCH = date(1970, 1, 1)
+# 行缓存格式版本，布局或展开规则变化时递增，旧缓存会被自动重建
+ROW_CACHE_VERSION = 2
+
+
+def get_row_cache_paths(country: str, data_path: str, cache_dir: str = None) -> tuple:
+    """返回某个每日数据文件对应的 (行数组路径, 元数据路径)"""
+    if cache_dir is None:
+        cache_dir = current_config.ROW_CACHE_DIR
+    base_name = os.path.splitext(os.path.basename(data_path))[0]
+    directory = os.path.join(cache_dir, country)
+    return os.path.join(directory, f"{base_name}.npy"), os.path.join(directory, f"{base_name}.json")
+
+
+def _flatten_day(records: list, target_date: date, folder_country: str) -> tuple:
+    """
+    按看板的规则把一天的记录展开为行（只保留 UTC 发布日期与文件日期相同、有新闻且流量非负的趋势）
+
+    Returns:
+        tuple: (行数组, 字符串表)
+    """
+    strings = []
+    string_ids = {}
+
+    def intern(value: str) -> int:
+        string_id = string_ids.get(value)
+        if string_id is None:
+            string_id = len(strings)
+            string_ids[value] = string_id
+            strings.append(value)
+        return string_id
+
+    day = (target_date - EPOCH).days
+    rows = []
+    for item, item_date in zip(records, pub_days_utc(records)):
+        traffic_num = item.get('traffic_num', 0)
+        if traffic_num < 0:
+            continue
+        if item_date != target_date:
+            continue
+        news_list = item.get('news', [])
+        if not news_list:
+            continue
+
+        regions = item.get('regions', [])
+        country_str = format_country_label(item.get('country', folder_country))
+        term_id = intern(item.get('title', 'N/A'))
+        regions_id = intern("; ".join(regions))
+        country_id = intern(country_str)
+        for news_item in news_list:
+            rows.append((
+                term_id,
+                intern(news_item.get('title', 'N/A')),
+                intern(news_item.get('source', 'N/A')),
+                regions_id,
+                country_id,
+                len(regions),
+                traffic_num,
+                day
+            ))
+    return np.array(rows, dtype=ROW_DTYPE), strings
+
+
+def load_day_rows(country: str, data_path: str, target_date: date, cache_dir: str = None) -> tuple:
+    """
+    读取某个每日数据文件的行缓存；缓存缺失或与源文件签名不一致时重建
+
+    Args:
+        country (str): 国家目录名
+        data_path (str): 每日快照文件路径
+        target_date (date): 文件对应的日期
+        cache_dir (str, optional): 行缓存目录，默认使用配置中的 ROW_CACHE_DIR
+
+    Returns:
+        tuple: (内存映射的行数组, 字符串表)；源文件无法读取时为 None
+    """
+    rows_path, meta_path = get_row_cache_paths(country, data_path, cache_dir)
+    signature = file_signature([data_path, get_journal_filename(data_path)])
+
+    if os.path.exists(rows_path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') == ROW_CACHE_VERSION and meta.get('signature') == signature:
+                rows = np.load(rows_path, mmap_mode='r') if meta.get('row_count') else np.empty(0, dtype=ROW_DTYPE)
+                return rows, meta['strings']
+        except (json.JSONDecodeError, OSError, ValueError) as e:
+            logger.warning(f"行缓存 {rows_path} 无法读取，将重建: {e}")
+
+    try:
+        records = load_day_records(data_path)
+    except (json.JSONDecodeError, OSError) as e:
+        logger.error(f"读取数据文件 {data_path} 时出错: {e}")
+        return None
+    if not isinstance(records, list):
+        logger.warning(f"{data_path} 中的数据不是列表，跳过")
+        return None
+
+    rows, strings = _flatten_day(records, target_date, country)
+    try:
+        os.makedirs(os.path.dirname(rows_path), exist_ok=True)
+        tmp_path = f"{rows_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, rows)
+        os.replace(tmp_path, rows_path)
+        # 元数据最后写入，签名匹配即代表行数组已完整落盘
+        atomic_write_json(meta_path, {'version': ROW_CACHE_VERSION, 'signature': signature, 'row_count': len(rows), 'strings': strings}, indent=None)
+    except OSError as e:
+        logger.error(f"保存行缓存 {rows_path} 时出错: {e}")
+    return rows, strings
+
+
+def load_row_cache_frame(start_date: date, end_date: date, source_dir: str = None, cache_dir: str = None, _progress_callback=None) -> pd.DataFrame:
+    """
+    通过行缓存加载日期范围内所有国家的数据，返回与看板表格结构一致的 DataFrame
+
+    Args:
+        start_date (date): 开始日期
+        end_date (date): 结束日期（含）
+        source_dir (str, optional): 源数据目录，默认使用配置中的 OUTPUT_DIR
+        cache_dir (str, optional): 行缓存目录，默认使用配置中的 ROW_CACHE_DIR
+        _progress_callback (callable, optional): 进度回调 (progress, message)
+
+    Returns:
+        pd.DataFrame: 按发布日期、流量降序排列的数据
+    """
+    if source_dir is None:
+        source_dir = current_config.OUTPUT_DIR
+    countries = sorted(
+        name for name in os.listdir(source_dir)
+        if os.path.isdir(os.path.join(source_dir, name)) and not name.startswith('.')
+    )
+
+    columns = {name: [] for name in ('term', 'title', 'source', 'regions', 'country')}
+    numeric = {name: [] for name in ('region_count', 'traffic', 'day')}
+    total_days = (end_date - start_date).days + 1
+    current_date = start_date
+    for day_index in range(total_days):
+        filename = f"{current_config.OUTPUT_FILE_PREFIX}{current_date.strftime('%Y-%m-%d')}{current_config.OUTPUT_FILE_EXTENSION}"
+        for country in countries:
+            data_path = os.path.join(source_dir, country, filename)
+            if not os.path.exists(data_path):
+                continue
+            loaded = load_day_rows(country, data_path, current_date, cache_dir)
+            if loaded is None or len(loaded[0]) == 0:
+                continue
+            rows, strings = loaded
+            # 字符串表转为对象数组后按编号批量取值，字符串对象在同一文件内共享
+            string_table = np.array(strings, dtype=object)
+            for name, values in columns.items():
+                values.append(string_table[rows[name]])
+            for name, values in numeric.items():
+                values.append(np.asarray(rows[name]))
+        if _progress_callback:
+            _progress_callback((day_index + 1) / total_days, f"正在加载 {current_date.strftime('%Y-%m-%d')} 的数据...")
+        current_date += timedelta(days=1)
+
+    if not numeric['day']:
+        return pd.DataFrame(columns=FRAME_COLUMNS)
+
+    days = np.concatenate(numeric['day'])
+    df = pd.DataFrame({
+        "搜索词": np.concatenate(columns['term']),
+        "标题": np.concatenate(columns['title']),
+        "信源": np.concatenate(columns['source']),
+        "流量": np.concatenate(numeric['traffic']),
+        "发布日期": (pd.to_datetime(days, unit='D')).date,
+        "地区": np.concatenate(columns['regions']),
+        "地区数量": np.concatenate(numeric['region_count']),
+        "国家": np.concatenate(columns['country']),
+    })
+    return df.sort_values(by=["发布日期", "流量"], ascending=False, kind='stable').reset_index(drop=True)
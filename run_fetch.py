@@ -4,6 +4,7 @@
 """
 
 import logging
+import os
 import sys
 import argparse
 
@@ -25,6 +26,12 @@ def parse_arguments():
         help='要抓取数据的国家名称列表，如：--countries India "United Kingdom"',
         default=None
     )
+    parser.add_argument(
+        '--mode', '-m',
+        choices=['sequential', 'concurrent', 'async'],
+        help='拉取模式：sequential 逐个区域拉取，concurrent 线程池并发拉取，async 单事件循环异步拉取（默认使用配置中的 FETCH_MODE）',
+        default=None
+    )
     parser.add_argument(
         '--all', '-a', 
         action='store_true', 
@@ -64,7 +71,7 @@ try:
         sys.exit(1)
     
     # 执行数据抓取
-    results = fetch_all_regions(regions_config)
+    results = fetch_all_regions(regions_config, mode=args.mode)
     
     logger.info(f"数据抓取完成! 总共获取了 {len(results)} 条新数据")
     
@@ -0,0 +1,185 @@
+"""
+Token 计数模块
+
+看板原先用 @st.cache_data 包装的 estimate_tokens 计数：每次调用 Streamlit 都要对整段（通常数 MB 的）表格文本做哈希，
+并且每次都重新调用 tiktoken.encoding_for_model。此模块提供：
+    get_encoding        进程内缓存的编码器（每个模型只查找一次，tiktoken 按需导入）
+    TokenCounter        按 (模型, 键) 缓存计数结果的计数器，大表格按 (筛选条件, 格式) 只计数一次
+    ConversationTokens  对话的增量计数，只对新增的消息计数
+tiktoken 不可用（未安装，或无法下载编码文件，例如离线主机）时退回按字符数估算（约 4 个字符一个 token），并只记录一次警告。
+"""
+
+import logging
+import threading
+
+from bounded_cache import BoundedLRUCache
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 模型未知时使用的编码
+FALLBACK_ENCODING = "cl100k_base"
+# tiktoken 不可用时每个 token 对应的平均字符数
+CHARS_PER_TOKEN = 4
+
+# 进程内缓存：模型名 -> 编码器（tiktoken 不可用时为 None）
+_encodings = {}
+_encodings_lock = threading.Lock()
+# 是否已经记录过退回估算的警告
+_fallback_logged = False
+
+
+def get_encoding(model_name: str):
+    """
+    返回模型对应的 tiktoken 编码器（进程内缓存，每个模型只查找一次）
+
+    Args:
+        model_name (str): 模型名称，未知模型使用 cl100k_base
+
+    Returns:
+        tiktoken.Encoding: 编码器；tiktoken 不可用或编码文件无法加载时为 None
+    """
+    global _fallback_logged
+    with _encodings_lock:
+        if model_name in _encodings:
+            return _encodings[model_name]
+    try:
+        import tiktoken  # 按需导入，首次计数时才加载
+        try:
+            encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:
+        # 未安装 tiktoken，或编码文件下载失败（离线、防火墙）等：都退回按字符数估算
+        encoding = None
+        with _encodings_lock:
+            should_log = not _fallback_logged
+            _fallback_logged = True
+        if should_log:
+            logger.warning(f"tiktoken 不可用，按字符数估算 token: {e}")
+    with _encodings_lock:
+        _encodings[model_name] = encoding
+    return encoding
+
+
+def count_tokens(text: str, model_name: str = "gpt-4o") -> int:
+    """
+    计算文本的 token 数量（不做缓存）
+
+    Args:
+        text (str): 文本
+        model_name (str): 模型名称
+
+    Returns:
+        int: token 数量
+    """
+    if not text:
+        return 0
+    encoding = get_encoding(model_name)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    # encode_ordinary 不检查特殊 token，对普通文本的结果与 encode 相同
+    return len(encoding.encode_ordinary(text))
+
+
+def count_tokens_batch(texts: list, model_name: str = "gpt-4o") -> list:
+    """
+    批量计算多段文本的 token 数量（tiktoken 在多个线程中并行编码）
+
+    Args:
+        texts (list): 文本列表
+        model_name (str): 模型名称
+
+    Returns:
+        list: 与 texts 对应的 token 数量
+    """
+    encoding = get_encoding(model_name)
+    if encoding is None:
+        return [count_tokens(text, model_name) for text in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch([text or "" for text in texts])]
+
+
+class TokenCounter(BoundedLRUCache):
+    """
+    带缓存的 token 计数器。
+
+    调用方可以传入一个键（例如 (数据集版本, 筛选条件, 格式)）代表文本内容，相同键直接返回缓存的计数，
+    不需要对文本做哈希；不传键时以文本本身为键（适合系统提示词等短文本）。
+    按最近使用顺序淘汰，最多保留 max_entries 个结果。可以在多个看板会话（线程）之间共享。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        super().__init__(max_entries)
+
+    def count(self, text: str, model_name: str = "gpt-4o", key=None) -> int:
+        """
+        计算文本的 token 数量，相同 (模型, 键) 只计算一次
+
+        Args:
+            text (str): 文本
+            model_name (str): 模型名称
+            key (hashable, optional): 代表文本内容的键，为 None 时使用文本本身
+
+        Returns:
+            int: token 数量
+        """
+        cache_key = (model_name, text if key is None else key)
+        tokens = self.get(cache_key)
+        if tokens is None:
+            tokens = count_tokens(text, model_name)
+            self.put(cache_key, tokens)
+        return tokens
+
+
+class ConversationTokens:
+    """
+    对话 token 的增量计数。
+
+    记录已计数消息的 (角色, 内容) 和 token 数，update 时只对新增的消息计数；
+    对话被截断或修改（例如删除空的回复、重新开始分析）时，从第一条不一致的消息开始重新计数。
+    内容只保存字符串的引用，会话状态中的消息在重新运行之间是同一个对象，比较时通常只需比较身份。
+    """
+
+    def __init__(self, model_name: str = "gpt-4o"):
+        self.model_name = model_name
+        self.messages = []
+        self.counts = []
+
+    def update(self, messages: list, model_name: str = None, known_counts: dict = None) -> int:
+        """
+        同步对话并返回所有消息的 token 合计
+
+        Args:
+            messages (list): 完整的消息列表（{"role", "content"}）
+            model_name (str, optional): 模型名称，与之前不同时全部重新计数
+            known_counts (dict, optional): 已知的计数 {消息下标: token 数}，例如首轮包含表格的消息，避免重复编码
+
+        Returns:
+            int: token 合计
+        """
+        if model_name and model_name != self.model_name:
+            self.model_name = model_name
+            self.messages, self.counts = [], []
+
+        common = 0
+        for (role, content), message in zip(self.messages, messages):
+            current = message.get("content") or ""
+            if message.get("role") != role or not (current is content or current == content):
+                break
+            common += 1
+        del self.messages[common:]
+        del self.counts[common:]
+
+        if common < len(messages):
+            known_counts = known_counts or {}
+            pending = [index for index in range(common, len(messages)) if index not in known_counts]
+            counted = dict(zip(pending, count_tokens_batch([messages[index].get("content") or "" for index in pending], self.model_name)))
+            counted.update({index: tokens for index, tokens in known_counts.items() if index >= common})
+            for index in range(common, len(messages)):
+                self.messages.append((messages[index].get("role"), messages[index].get("content") or ""))
+                self.counts.append(counted[index])
+        return self.total
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+本地 OpenAI 兼容替身服务：用于在没有真实模型端点时测试看板和分块（map-reduce）分析的完整流程
+
+只依赖标准库，实现:
+    GET  /v1/models              模型列表
+    POST /v1/chat/completions    非流式和流式（SSE）回复
+    GET  /stats                  请求数、当前和历史最大并发数、超出上下文被拒绝的请求数
+
+回复内容是确定性的：统计最后一条用户消息中的数据行数、国家和出现次数最多的搜索词，
+合并请求（包含“### 第 N 块”小节）则列出收到的各块报告，便于核对 map 和 reduce 的结果。
+用 --context-window 模拟模型的上下文上限（按 4 个字符一个 token 估算），超出时返回 400 错误；
+用 --latency 模拟模型耗时，观察并发上限是否生效；用 --fail-rate 模拟偶发失败，检验重试。
+
+用法:
+    python tools/openai_stand_in.py --port 8765 --latency 0.5 --context-window 32768
+    python chunked_analysis.py --endpoint http://127.0.0.1:8765/v1 --model stand-in --days 30
+    curl http://127.0.0.1:8765/stats
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 估算 token 时每个 token 对应的字符数
+CHARS_PER_TOKEN = 4
+# 流式回复每个片段的字符数
+STREAM_PIECE_CHARS = 24
+
+
+class StandInState:
+    """服务的运行统计（所有请求线程共享）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def enter(self):
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"requests": self.requests, "in_flight": self.in_flight, "max_in_flight": self.max_in_flight,
+                    "rejected": self.rejected, "failed": self.failed}
+
+
+def describe(messages: list) -> str:
+    """根据最后一条用户消息生成确定性的回复"""
+    user = next((message.get("content") or "" for message in reversed(messages) if message.get("role") == "user"), "")
+    sections = re.findall(r"^### (第 \d+ 块：.*)$", user, flags=re.MULTILINE)
+    if sections:
+        lines = [f"合并报告：收到 {len(sections)} 份部分报告。"]
+        lines.extend(f"- {section}" for section in sections)
+        return "\n".join(lines)
+
+    # 数据行：markdown / ison 每个新闻一行，grouped 每个趋势一行（新闻以 "- " 开头）
+    rows = [line for line in user.splitlines() if " | " in line and not line.startswith(("news_title", "title |", "- "))]
+    terms = Counter()
+    countries = Counter()
+    for line in rows:
+        fields = [field.strip() for field in line.split(" | ")]
+        if len(fields) == 7:      # markdown: news_title | source | title | traffic | date | regions | country
+            terms[fields[2]] += 1
+            countries[fields[6]] += 1
+        elif len(fields) == 5:    # grouped: title | date | country | traffic | regions
+            terms[fields[0]] += 1
+            countries[fields[2]] += 1
+    scope = re.search(r"第 (\d+) 块（(.*?)）", user)
+    header = f"部分报告（第 {scope.group(1)} 块，{scope.group(2)}）" if scope else "分析报告"
+    top_terms = "、".join(term for term, _ in terms.most_common(3)) or "无"
+    return (f"{header}：共 {len(rows)} 行数据，覆盖 {len(countries)} 个国家"
+            f"（{'、'.join(countries) or '无'}）。出现最多的搜索词：{top_terms}。")
+
+
+def make_handler(state: StandInState, options):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            if options.verbose:
+                super().log_message(format, *args)
+
+        def send_json(self, status: int, payload: dict):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self.send_json(200, {"object": "list", "data": [
+                    {"id": options.model, "object": "model", "created": 0, "owned_by": "stand-in"}
+                ]})
+            elif self.path.rstrip("/") == "/stats":
+                self.send_json(200, state.snapshot())
+            else:
+                self.send_json(404, {"error": {"message": f"未知路径 {self.path}", "type": "invalid_request_error"}})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_json(404, {"error": {"message": f"未知路径 {self.path}", "type": "invalid_request_error"}})
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            messages = request.get("messages", [])
+            prompt_tokens = sum(len(message.get("content") or "") for message in messages) // CHARS_PER_TOKEN
+
+            state.enter()
+            try:
+                if options.context_window and prompt_tokens > options.context_window:
+                    with state.lock:
+                        state.rejected += 1
+                    self.send_json(400, {"error": {
+                        "message": f"This model's maximum context length is {options.context_window} tokens. "
+                                   f"However, your messages resulted in {prompt_tokens} tokens.",
+                        "type": "invalid_request_error", "code": "context_length_exceeded"}})
+                    return
+                time.sleep(options.latency)
+                if options.fail_rate and random.random() < options.fail_rate:
+                    with state.lock:
+                        state.failed += 1
+                    self.send_json(500, {"error": {"message": "stand-in: 模拟的服务端错误", "type": "server_error"}})
+                    return
+
+                content = describe(messages)
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                model = request.get("model", options.model)
+                if request.get("stream"):
+                    self.stream(completion_id, model, content)
+                else:
+                    self.send_json(200, {
+                        "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // CHARS_PER_TOKEN,
+                                  "total_tokens": prompt_tokens + len(content) // CHARS_PER_TOKEN},
+                    })
+            finally:
+                state.leave()
+
+        def stream(self, completion_id: str, model: str, content: str):
+            """以 SSE 分片发送回复（分块传输编码，最后发送 [DONE]）"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def send_event(data: str):
+                payload = f"data: {data}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+                self.wfile.flush()
+
+            def chunk(delta: dict, finish_reason=None) -> str:
+                return json.dumps({
+                    "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }, ensure_ascii=False)
+
+            send_event(chunk({"role": "assistant", "content": ""}))
+            for start in range(0, len(content), STREAM_PIECE_CHARS):
+                send_event(chunk({"content": content[start:start + STREAM_PIECE_CHARS]}))
+            send_event(chunk({}, "stop"))
+            send_event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地 OpenAI 兼容替身服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    parser.add_argument('--model', default='stand-in', help='/v1/models 返回的模型名称')
+    parser.add_argument('--latency', type=float, default=0.2, help='每个请求的模拟耗时（秒）')
+    parser.add_argument('--context-window', type=int, default=0, help='模拟的上下文上限（token），0 表示不限制')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='模拟服务端错误的概率')
+    parser.add_argument('--verbose', action='store_true', help='输出每个请求的访问日志')
+    options = parser.parse_args()
+
+    state = StandInState()
+    server = ThreadingHTTPServer((options.host, options.port), make_handler(state, options))
+    print(f"OpenAI 兼容替身服务: http://{options.host}:{options.port}/v1 （统计: /stats）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(state.snapshot(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
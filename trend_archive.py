@@ -0,0 +1,256 @@
+"""
+列式历史归档模块
+
+此模块把 JSONs/<country>/trends_YYYY-MM-DD.json 目录树压缩为按国家、日期分区的 Parquet 归档：
+    <ARCHIVE_DIR>/trends/country=<country>/date=<YYYY-MM-DD>/part-0.parquet
+    <ARCHIVE_DIR>/news/country=<country>/date=<YYYY-MM-DD>/part-0.parquet
+新闻被展开为子表，通过 trend_id 与所属趋势关联。
+看板可以只读取所需的分区和列，直接得到 DataFrame，而不必逐个解析 JSON 文件并在 Python 循环中展开。
+
+依赖 pyarrow（可选依赖），未安装时调用归档相关函数会抛出 ImportError。
+"""
+
+import argparse
+import json
+import logging
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - 可选依赖
+    pa = None
+
+# 导入配置
+from config import current_config
+from trend_loader import FRAME_COLUMNS, format_country_label, pub_days_utc
+from trend_storage import atomic_write_json, file_signature, get_journal_filename, load_day_records
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "_manifest.json"
+# 归档格式版本，列定义、日期口径或分区签名变化时递增，旧归档会被整体重建
+ARCHIVE_VERSION = 3
+PART_FILENAME = "part-0.parquet"
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("列式归档需要 pyarrow，请先执行 pip install pyarrow")
+
+
+def _partition_dir(archive_dir: str, table: str, country: str, date_str: str) -> str:
+    return os.path.join(archive_dir, table, f"country={country}", f"date={date_str}")
+
+
+def _scan_source_files(source_dir: str) -> list:
+    """
+    列出所有国家目录下的每日数据文件
+
+    Returns:
+        list: (country, date_str, path) 元组列表
+    """
+    prefix = current_config.OUTPUT_FILE_PREFIX
+    extension = current_config.OUTPUT_FILE_EXTENSION
+    files = []
+    for country in sorted(os.listdir(source_dir)):
+        country_dir = os.path.join(source_dir, country)
+        if not os.path.isdir(country_dir) or country.startswith('.'):
+            continue
+        for filename in sorted(os.listdir(country_dir)):
+            if filename.startswith(prefix) and filename.endswith(extension):
+                date_str = filename[len(prefix):-len(extension)]
+                files.append((country, date_str, os.path.join(country_dir, filename)))
+    return files
+
+
+def _day_tables(records: list, country: str):
+    """把一天的趋势记录转换为趋势表和展开后的新闻表"""
+    trend_columns = {
+        'trend_id': [], 'title': [], 'traffic_num': [], 'pub_date': [], 'pub_day': [],
+        'regions': [], 'regions_str': [], 'region_count': [], 'country_label': [], 'picture': []
+    }
+    news_columns = {'trend_id': [], 'title': [], 'source': [], 'url': [], 'picture': []}
+
+    for trend_id, (item, item_date) in enumerate(zip(records, pub_days_utc(records))):
+        pub_date = item.get('pub_date') or ''
+        regions = item.get('regions', []) or []
+        trend_columns['trend_id'].append(trend_id)
+        trend_columns['title'].append(item.get('title', 'N/A'))
+        trend_columns['traffic_num'].append(int(item.get('traffic_num', 0) or 0))
+        trend_columns['pub_date'].append(pub_date)
+        # 与看板一致，使用发布时间的 UTC 日期
+        trend_columns['pub_day'].append(item_date.isoformat() if item_date else None)
+        trend_columns['regions'].append(list(regions))
+        trend_columns['regions_str'].append("; ".join(regions))
+        trend_columns['region_count'].append(len(regions))
+        trend_columns['country_label'].append(format_country_label(item.get('country', country)))
+        trend_columns['picture'].append(item.get('picture', ''))
+
+        for news in item.get('news', []) or []:
+            news_columns['trend_id'].append(trend_id)
+            news_columns['title'].append(news.get('title', 'N/A'))
+            news_columns['source'].append(news.get('source', 'N/A'))
+            news_columns['url'].append(news.get('url', ''))
+            news_columns['picture'].append(news.get('picture', ''))
+
+    trends_table = pa.table({
+        'trend_id': pa.array(trend_columns['trend_id'], pa.int32()),
+        'title': pa.array(trend_columns['title'], pa.string()),
+        'traffic_num': pa.array(trend_columns['traffic_num'], pa.int64()),
+        'pub_date': pa.array(trend_columns['pub_date'], pa.string()),
+        'pub_day': pa.array(trend_columns['pub_day'], pa.string()),
+        'regions': pa.array(trend_columns['regions'], pa.list_(pa.string())),
+        'regions_str': pa.array(trend_columns['regions_str'], pa.string()),
+        'region_count': pa.array(trend_columns['region_count'], pa.int32()),
+        'country_label': pa.array(trend_columns['country_label'], pa.string()),
+        'picture': pa.array(trend_columns['picture'], pa.string()),
+    })
+    news_table = pa.table({
+        'trend_id': pa.array(news_columns['trend_id'], pa.int32()),
+        'title': pa.array(news_columns['title'], pa.string()),
+        'source': pa.array(news_columns['source'], pa.string()),
+        'url': pa.array(news_columns['url'], pa.string()),
+        'picture': pa.array(news_columns['picture'], pa.string()),
+    })
+    return trends_table, news_table
+
+
+def build_archive(source_dir: str = None, archive_dir: str = None, force: bool = False) -> int:
+    """
+    把每日 JSON 文件压缩为分区的 Parquet 归档。
+    通过清单记录每个源文件的 (大小, 修改时间)，只重写发生变化的分区（通常只有当天的文件）。
+
+    Args:
+        source_dir (str, optional): 源数据目录，默认使用配置中的 OUTPUT_DIR
+        archive_dir (str, optional): 归档目录，默认使用配置中的 ARCHIVE_DIR
+        force (bool): 是否忽略清单，重写所有分区
+
+    Returns:
+        int: 本次写入的分区数量
+    """
+    _require_pyarrow()
+    if source_dir is None:
+        source_dir = current_config.OUTPUT_DIR
+    if archive_dir is None:
+        archive_dir = current_config.ARCHIVE_DIR
+
+    manifest_path = os.path.join(archive_dir, MANIFEST_FILENAME)
+    manifest = {}
+    if not force and os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"归档清单 {manifest_path} 无法读取，将重建全部分区: {e}")
+            manifest = {}
+        if manifest.pop('_version', None) != ARCHIVE_VERSION:
+            manifest = {}
+
+    written = 0
+    for country, date_str, path in _scan_source_files(source_dir):
+        # 分区内容来自快照叠加日志，两者任一变化都需要重新归档
+        signature = file_signature([path, get_journal_filename(path)])
+        key = f"{country}/{date_str}"
+        if manifest.get(key) == signature:
+            continue
+        try:
+            records = load_day_records(path)
+        except json.JSONDecodeError as e:
+            logger.error(f"解码 JSON 文件错误 {path}: {e}")
+            continue
+        if not isinstance(records, list):
+            logger.warning(f"{path} 中的数据不是列表，跳过")
+            continue
+
+        trends_table, news_table = _day_tables(records, country)
+        for table_name, table in (('trends', trends_table), ('news', news_table)):
+            partition_dir = _partition_dir(archive_dir, table_name, country, date_str)
+            os.makedirs(partition_dir, exist_ok=True)
+            part_path = os.path.join(partition_dir, PART_FILENAME)
+            tmp_path = f"{part_path}.tmp"
+            pq.write_table(table, tmp_path, compression='zstd')
+            os.replace(tmp_path, part_path)
+        manifest[key] = signature
+        written += 1
+        logger.info(f"已归档 {path}: {trends_table.num_rows} 个趋势, {news_table.num_rows} 条新闻")
+
+    os.makedirs(archive_dir, exist_ok=True)
+    manifest['_version'] = ARCHIVE_VERSION
+    atomic_write_json(manifest_path, manifest)
+    return written
+
+
+def _read_partitions(archive_dir: str, table: str, start_str: str, end_str: str, countries, columns: list):
+    """只读取日期范围和国家内的分区，以及所需的列"""
+    table_dir = os.path.join(archive_dir, table)
+    if not os.path.isdir(table_dir):
+        return None
+    partitioning = ds.partitioning(pa.schema([('country', pa.string()), ('date', pa.string())]), flavor='hive')
+    dataset = ds.dataset(table_dir, format='parquet', partitioning=partitioning)
+    expression = (ds.field('date') >= start_str) & (ds.field('date') <= end_str)
+    if countries:
+        expression = expression & ds.field('country').isin(list(countries))
+    return dataset.to_table(columns=columns, filter=expression)
+
+
+def load_archive_frame(start_date, end_date, countries=None, archive_dir: str = None):
+    """
+    从归档中读取日期范围内的数据，返回与看板表格结构一致的 DataFrame
+    （每个新闻一行，列为 搜索词/标题/信源/流量/发布日期/地区/地区数量/国家）。
+
+    Args:
+        start_date (date): 开始日期
+        end_date (date): 结束日期（含）
+        countries (list, optional): 只读取这些国家目录的分区
+        archive_dir (str, optional): 归档目录，默认使用配置中的 ARCHIVE_DIR
+
+    Returns:
+        pd.DataFrame: 按发布日期、流量降序排列的数据
+    """
+    _require_pyarrow()
+    import pandas as pd
+
+    if archive_dir is None:
+        archive_dir = current_config.ARCHIVE_DIR
+    start_str = start_date.strftime('%Y-%m-%d')
+    end_str = end_date.strftime('%Y-%m-%d')
+
+    trends = _read_partitions(
+        archive_dir, 'trends', start_str, end_str, countries,
+        ['country', 'date', 'trend_id', 'title', 'traffic_num', 'pub_day', 'regions_str', 'region_count', 'country_label']
+    )
+    news = _read_partitions(archive_dir, 'news', start_str, end_str, countries, ['country', 'date', 'trend_id', 'title', 'source'])
+    if trends is None or news is None or trends.num_rows == 0:
+        return pd.DataFrame(columns=FRAME_COLUMNS)
+
+    # 与看板逻辑一致：只保留 UTC 发布日期与文件日期相同、流量非负的趋势
+    trends_df = trends.to_pandas()
+    trends_df = trends_df[(trends_df['pub_day'] == trends_df['date']) & (trends_df['traffic_num'] >= 0)]
+    news_df = news.to_pandas().rename(columns={'title': 'news_title'})
+
+    df = news_df.merge(trends_df, on=['country', 'date', 'trend_id'], how='inner')
+    df = pd.DataFrame({
+        "搜索词": df['title'],
+        "标题": df['news_title'],
+        "信源": df['source'],
+        "流量": df['traffic_num'],
+        "发布日期": pd.to_datetime(df['pub_day']).dt.date,
+        "地区": df['regions_str'],
+        "地区数量": df['region_count'],
+        "国家": df['country_label'],
+    })
+    return df.sort_values(by=["发布日期", "流量"], ascending=False, kind='stable').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='把 JSONs 目录树压缩为按国家/日期分区的 Parquet 归档')
+    parser.add_argument('--source-dir', default=None, help='源数据目录（默认使用配置中的 OUTPUT_DIR）')
+    parser.add_argument('--archive-dir', default=None, help='归档目录（默认使用配置中的 ARCHIVE_DIR）')
+    parser.add_argument('--force', action='store_true', help='忽略清单，重写所有分区')
+    args = parser.parse_args()
+    count = build_archive(args.source_dir, args.archive_dir, args.force)
+    logger.info(f"归档完成，本次写入 {count} 个分区")
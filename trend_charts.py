@@ -0,0 +1,307 @@
+"""
+看板图表渲染模块
+
+看板每次重新运行都会用 matplotlib/seaborn 重新绘制全部图表，并修改全局的 plt.rcParams。
+此模块把每个图表的绘制改为纯函数：输入为预先汇总的小表，输出为 PNG 图像字节，
+结果按 (图表类型, 汇总数据摘要, 绘图参数) 缓存在进程内，汇总数据不变的图表不再重新绘制。
+样式通过 rc_context / axes_style 上下文设置，不修改全局配置。
+
+另外提供原生图表后端：把同样的汇总表转为 Vega-Lite 规格，由浏览器端渲染（st.vega_lite_chart），
+服务端只需生成一个很小的 JSON。
+
+matplotlib 和 seaborn 在第一次绘图时才导入，看板启动和原生后端都不需要加载它们。
+"""
+
+import hashlib
+import io
+import logging
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+from bounded_cache import BoundedLRUCache
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 图表统一样式（原先在每次运行时写入全局 plt.rcParams）
+RC_PARAMS = {
+    'font.size': 12,
+    'axes.titlesize': 14,
+    'axes.labelsize': 12,
+    'xtick.labelsize': 10,
+    'ytick.labelsize': 10,
+    'legend.fontsize': 10,
+    'figure.figsize': (10, 6),
+    'font.sans-serif': ['SimHei', 'DejaVu Sans', 'Arial Unicode MS', 'WenQuanYi Micro Hei'],  # 支持中文的字体
+    'axes.unicode_minus': False  # 解决负号显示问题
+}
+FIGURE_SIZE = (10, 6)
+# 与 st.pyplot 默认的导出参数一致
+SAVEFIG_OPTIONS = {'format': 'png', 'dpi': 200, 'bbox_inches': 'tight'}
+# seaborn 调色板对应的 Vega 配色方案
+VEGA_SCHEMES = {
+    'viridis': 'viridis',
+    'plasma': 'plasma',
+    'RdBu_r': 'redblue',
+    'Purples': 'purples',
+    'Set3': 'set3',
+}
+
+
+def _plotting() -> tuple:
+    """按需导入绘图库，返回 (pyplot, seaborn)"""
+    if 'matplotlib.pyplot' not in sys.modules:
+        # 只导出 PNG，不需要交互式后端
+        import matplotlib
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+
+def _digest(data) -> str:
+    """汇总数据的摘要：DataFrame 按内容哈希，其他对象按序列化结果哈希"""
+    hasher = hashlib.sha1()
+    if isinstance(data, pd.DataFrame):
+        hasher.update(repr(list(data.columns)).encode('utf-8'))
+        hasher.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    else:
+        hasher.update(pickle.dumps(data, protocol=4))
+    return hasher.hexdigest()
+
+
+class ChartCache(BoundedLRUCache):
+    """
+    已渲染图表的缓存。
+
+    以 (图表类型, 汇总数据摘要, 绘图参数) 为键保存 PNG 字节，按最近使用顺序淘汰，最多保留 capacity 张图。
+    可以在多个看板会话（线程）之间共享。
+    """
+
+
+# 须的长度（四分位距的倍数），与 matplotlib 箱线图的默认值一致
+BOX_WHISKER_IQR = 1.5
+
+
+def _box(values: np.ndarray, label: str) -> dict:
+    """一组数值的箱线图统计量（与 matplotlib.cbook.boxplot_stats 的计算方式一致）"""
+    if len(values) == 0:
+        return {'label': label, 'mean': np.nan, 'med': np.nan, 'q1': np.nan, 'q3': np.nan, 'iqr': np.nan,
+                'cilo': np.nan, 'cihi': np.nan, 'whislo': np.nan, 'whishi': np.nan, 'fliers': np.array([])}
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    notch = 1.57 * iqr / np.sqrt(len(values))
+    # 须延伸到 [q1 - 1.5 IQR, q3 + 1.5 IQR] 内最远的数据点，不会缩进箱体内
+    upper = values[values <= q3 + BOX_WHISKER_IQR * iqr]
+    lower = values[values >= q1 - BOX_WHISKER_IQR * iqr]
+    whishi = q3 if len(upper) == 0 or upper.max() < q3 else upper.max()
+    whislo = q1 if len(lower) == 0 or lower.min() > q1 else lower.min()
+    return {'label': label, 'mean': values.mean(), 'med': med, 'q1': q1, 'q3': q3, 'iqr': iqr,
+            'cilo': med - notch, 'cihi': med + notch, 'whislo': whislo, 'whishi': whishi,
+            'fliers': values[(values < whislo) | (values > whishi)]}
+
+
+def box_stats(df: pd.DataFrame, group: str = None, value: str = "流量", order: list = None) -> list:
+    """
+    计算箱线图统计量（四分位数、须和离群点），作为箱线图的预汇总数据
+
+    只使用 numpy 计算，原生后端不需要导入 matplotlib。
+
+    Args:
+        df (pd.DataFrame): 行级数据
+        group (str, optional): 分组列，为 None 时整体计算一个箱
+        value (str): 数值列
+        order (list, optional): 分组顺序，默认按出现顺序
+
+    Returns:
+        list: 每个箱一个字典（与 matplotlib.cbook.boxplot_stats 的格式相同，可直接传给 Axes.bxp，含 label）
+    """
+    values = df[value].to_numpy(dtype=np.float64)
+    if group is None:
+        return [_box(values, "")]
+    codes, uniques = pd.factorize(df[group], sort=False)
+    labels = list(uniques) if order is None else [label for label in order if label in set(uniques)]
+    positions = {label: code for code, label in enumerate(uniques)}
+    # 按分组编号排序后一次切分，避免为每个分组做一次布尔筛选
+    sort_order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[sort_order], np.arange(len(uniques) + 1))
+    grouped = [values[sort_order[bounds[code]:bounds[code + 1]]] for code in range(len(uniques))]
+    return [_box(grouped[positions[label]], str(label)) for label in labels]
+
+
+def _draw_bar(ax, data: pd.DataFrame, x: str, y: str, palette: str = None, label_format: str = "{}", label_offset: float = 0.5, **_):
+    _, sns = _plotting()
+    sns.barplot(x=x, y=y, data=data, hue=y, palette=palette, ax=ax, legend=False)
+    # 在柱状图上添加数值标签
+    for i, v in enumerate(data[x]):
+        ax.text(v + label_offset, i, label_format.format(v), va='center', fontsize=10)
+
+
+def _draw_line(ax, data: pd.DataFrame, x: str, y: str, color: str = None, **_):
+    _, sns = _plotting()
+    sns.lineplot(x=x, y=y, data=data, marker='o', ax=ax, color=color)
+    ax.tick_params(axis='x', labelrotation=45, labelsize=8)
+    ax.grid(True, alpha=0.3)
+
+
+def _draw_pie(ax, data: pd.DataFrame, x: str, y: str, **_):
+    ax.pie(data[x], labels=data[y], autopct='%1.1f%%', startangle=90)
+    ax.axis('equal')  # 确保饼图是圆形
+
+
+def _draw_box(ax, data: list, palette: str = "Set3", rotate_labels: bool = False, **_):
+    _, sns = _plotting()
+    boxes = ax.bxp(data, patch_artist=True, showfliers=True)
+    for patch, color in zip(boxes['boxes'], sns.color_palette(palette, len(data))):
+        patch.set_facecolor(color)
+    if rotate_labels:
+        ax.tick_params(axis='x', labelrotation=45, labelsize=8)
+
+
+DRAWERS = {
+    'bar': _draw_bar,
+    'line': _draw_line,
+    'pie': _draw_pie,
+    'box': _draw_box,
+}
+
+
+def render_chart(kind: str, data, title: str = "", xlabel: str = None, ylabel: str = None, **options) -> bytes:
+    """
+    用 matplotlib 绘制一张图表并导出为 PNG 字节（不修改全局样式）
+
+    Args:
+        kind (str): 图表类型：bar / line / pie / box
+        data: 预汇总的数据（box 为 box_stats 的结果，其余为 DataFrame）
+        title (str): 标题
+        xlabel (str, optional): x 轴标签
+        ylabel (str, optional): y 轴标签
+        **options: 各图表类型的参数（x、y、palette、color、label_format 等）
+
+    Returns:
+        bytes: PNG 图像
+    """
+    plt, sns = _plotting()
+    # RC_PARAMS 放在最内层，覆盖 seaborn 样式中的字体设置
+    with sns.axes_style("darkgrid"), sns.plotting_context("notebook", font_scale=1.0), sns.color_palette("deep"), \
+            plt.rc_context(RC_PARAMS):
+        fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+        try:
+            DRAWERS[kind](ax, data, **options)
+            if xlabel is not None:
+                ax.set_xlabel(xlabel)
+            if ylabel is not None:
+                ax.set_ylabel(ylabel)
+            ax.set_title(title)
+            fig.tight_layout()
+            buffer = io.BytesIO()
+            fig.savefig(buffer, **SAVEFIG_OPTIONS)
+        finally:
+            plt.close(fig)
+    return buffer.getvalue()
+
+
+def cached_chart(cache: ChartCache, kind: str, data, **options) -> bytes:
+    """
+    返回图表的 PNG 字节；(图表类型, 汇总数据, 参数) 与之前相同时直接使用缓存
+
+    Args:
+        cache (ChartCache): 图表缓存
+        kind (str): 图表类型
+        data: 预汇总的数据
+        **options: 传给 render_chart 的参数
+
+    Returns:
+        bytes: PNG 图像
+    """
+    key = (kind, _digest(data), tuple(sorted(options.items())))
+    image = cache.get(key)
+    if image is None:
+        image = render_chart(kind, data, **options)
+        cache.put(key, image)
+    return image
+
+
+def _records(data: pd.DataFrame) -> list:
+    """DataFrame 转为 Vega-Lite 的内联数据（日期转为 ISO 字符串，numpy 数值转为 Python 数值）"""
+    records = []
+    for row in data.itertuples(index=False):
+        records.append({
+            column: value.isoformat() if hasattr(value, 'isoformat') else (value.item() if hasattr(value, 'item') else value)
+            for column, value in zip(data.columns, row)
+        })
+    return records
+
+
+def vega_spec(kind: str, data, title: str = "", xlabel: str = None, ylabel: str = None, x: str = None, y: str = None,
+              palette: str = None, color: str = None, **_) -> dict:
+    """
+    把与 render_chart 相同的输入转为 Vega-Lite 规格（原生图表后端）
+
+    Args:
+        kind (str): 图表类型：bar / line / pie / box
+        data: 预汇总的数据（box 为 box_stats 的结果，其余为 DataFrame）
+        title (str): 标题
+        xlabel (str, optional): x 轴标签
+        ylabel (str, optional): y 轴标签
+        x (str, optional): 数值列（line 为横轴列）
+        y (str, optional): 类别列（line 为纵轴列）
+
+    Returns:
+        dict: Vega-Lite 规格，可直接传给 st.vega_lite_chart
+    """
+    spec = {'title': title, 'height': 360}
+    if kind == 'bar':
+        spec.update({
+            'data': {'values': _records(data)},
+            'mark': {'type': 'bar', 'tooltip': True},
+            'encoding': {
+                'x': {'field': x, 'type': 'quantitative', 'title': xlabel},
+                'y': {'field': y, 'type': 'nominal', 'sort': '-x', 'title': ylabel},
+                'color': {'field': y, 'type': 'nominal', 'legend': None,
+                          'scale': {'scheme': VEGA_SCHEMES[palette]} if palette in VEGA_SCHEMES else {}},
+            },
+        })
+    elif kind == 'line':
+        spec.update({
+            'data': {'values': _records(data)},
+            'mark': {'type': 'line', 'point': True, 'tooltip': True, 'color': color or '#4C72B0'},
+            'encoding': {
+                'x': {'field': x, 'type': 'temporal', 'title': xlabel},
+                'y': {'field': y, 'type': 'quantitative', 'title': ylabel},
+            },
+        })
+    elif kind == 'pie':
+        spec.update({
+            'data': {'values': _records(data)},
+            'mark': {'type': 'arc', 'tooltip': True},
+            'encoding': {
+                'theta': {'field': x, 'type': 'quantitative'},
+                'color': {'field': y, 'type': 'nominal', 'sort': None},
+            },
+        })
+    elif kind == 'box':
+        # 统计量已在服务端算好，用须（rule）+ 箱体（bar）+ 中位数（tick）分层绘制
+        values = [
+            {'label': stats['label'], 'whislo': float(stats['whislo']), 'q1': float(stats['q1']),
+             'med': float(stats['med']), 'q3': float(stats['q3']), 'whishi': float(stats['whishi'])}
+            for stats in data
+        ]
+        category = {'field': 'label', 'type': 'nominal', 'title': xlabel, 'sort': None}
+        spec.update({
+            'data': {'values': values},
+            'encoding': {'x': category},
+            'layer': [
+                {'mark': 'rule', 'encoding': {'y': {'field': 'whislo', 'type': 'quantitative', 'title': ylabel}, 'y2': {'field': 'whishi'}}},
+                {'mark': {'type': 'bar', 'size': 24, 'tooltip': True},
+                 'encoding': {'y': {'field': 'q1', 'type': 'quantitative'}, 'y2': {'field': 'q3'},
+                              'color': {'field': 'label', 'type': 'nominal', 'legend': None, 'scale': {'scheme': 'set3'}}}},
+                {'mark': {'type': 'tick', 'color': 'black', 'size': 24}, 'encoding': {'y': {'field': 'med', 'type': 'quantitative'}}},
+            ],
+        })
+    else:
+        raise ValueError(f"不支持的图表类型: {kind}")
+    return spec
@@ -0,0 +1,198 @@
+"""
+看板文本倒排索引模块
+
+地区筛选原本对每个逗号分隔的关键字在整列拼接后的地区字符串上做一次 str.contains 扫描。
+此模块为已加载的数据集构建一次倒排索引：
+    规范化后的地区名（以及地区名中的单词） -> 行号
+    规范化后的搜索词单词（以及完整搜索词） -> 行号
+筛选时先在排序后的键上做前缀查找（二分），再对行号集合求并集/交集，而不必反复扫描字符串。
+
+索引建立在列的不同取值上（同一趋势的多条新闻共享取值），每个取值再映射到它出现的所有行。
+
+FilterResultCache 按 (数据集版本, 筛选条件) 缓存筛选得到的行号和视图，
+筛选条件未变化的重新运行直接复用上一次的结果。
+"""
+
+import bisect
+import re
+
+import numpy as np
+import pandas as pd
+
+from bounded_cache import BoundedLRUCache
+
+# 分词：按空白和常见分隔符切分
+TOKEN_SPLIT_PATTERN = re.compile(r"[\s,;/()\[\]|\-_.:'\"]+")
+
+
+def normalize(text: str) -> str:
+    """规范化文本：去除首尾空白并做大小写折叠"""
+    return text.strip().casefold()
+
+
+def tokenize(text: str) -> list:
+    """把文本切分为规范化后的单词（不含空字符串）"""
+    return [token for token in TOKEN_SPLIT_PATTERN.split(normalize(text)) if token]
+
+
+class _FieldIndex:
+    """单个列的倒排索引：键 -> 取值编号集合，取值编号 -> 行号"""
+
+    def __init__(self, values: pd.Series, key_func):
+        codes, uniques = pd.factorize(values, sort=False)
+        self.row_count = len(codes)
+        # 按取值编号分组的行号：order[starts[c]:starts[c + 1]] 即取值 c 出现的所有行
+        self.order = np.argsort(codes, kind='stable')
+        self.starts = np.searchsorted(codes[self.order], np.arange(len(uniques) + 1))
+
+        postings = {}
+        for code, value in enumerate(uniques):
+            for key in key_func(value):
+                postings.setdefault(key, set()).add(code)
+        self.keys = sorted(postings)
+        self.postings = [np.fromiter(postings[key], dtype=np.int64) for key in self.keys]
+
+    def codes_with_prefix(self, prefix: str) -> np.ndarray:
+        """所有以 prefix 开头的键对应的取值编号"""
+        start = bisect.bisect_left(self.keys, prefix)
+        matched = []
+        for position in range(start, len(self.keys)):
+            if not self.keys[position].startswith(prefix):
+                break
+            matched.append(self.postings[position])
+        if not matched:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(matched))
+
+    def rows_for_codes(self, codes: np.ndarray) -> np.ndarray:
+        """取值编号对应的所有行号（升序）"""
+        if len(codes) == 0:
+            return np.empty(0, dtype=np.int64)
+        rows = np.concatenate([self.order[self.starts[code]:self.starts[code + 1]] for code in codes])
+        rows.sort()
+        return rows
+
+
+def _region_keys(regions_str: str) -> set:
+    """地区列为 "; " 拼接的地区名：每个完整地区名及其中的单词都作为键"""
+    keys = set()
+    for region in regions_str.split(";"):
+        region = normalize(region)
+        if region:
+            keys.add(region)
+            keys.update(tokenize(region))
+    return keys
+
+
+def _term_keys(term: str) -> set:
+    """搜索词：完整搜索词及其中的单词都作为键"""
+    keys = set(tokenize(term))
+    normalized = normalize(term)
+    if normalized:
+        keys.add(normalized)
+    return keys
+
+
+class TrendTextIndex:
+    """
+    看板数据集的地区 / 搜索词倒排索引，每个加载的数据集构建一次。
+
+    行号为构建时 DataFrame 的位置（看板的数据使用从 0 开始的 RangeIndex，行号即索引标签）。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.row_count = len(df)
+        self.regions = _FieldIndex(df["地区"], _region_keys)
+        self.terms = _FieldIndex(df["搜索词"], _term_keys)
+
+    @staticmethod
+    def _match_any(field: _FieldIndex, queries: list) -> np.ndarray:
+        """任意一个查询（前缀匹配）命中的行号"""
+        matched_codes = [field.codes_with_prefix(normalize(query)) for query in queries if normalize(query)]
+        if not matched_codes:
+            return np.arange(field.row_count)
+        return field.rows_for_codes(np.unique(np.concatenate(matched_codes)))
+
+    def match_regions(self, queries: list) -> np.ndarray:
+        """
+        地区名或其中单词以任意一个查询开头的行号
+
+        Args:
+            queries (list): 地区关键字列表
+
+        Returns:
+            np.ndarray: 升序排列的行号
+        """
+        return self._match_any(self.regions, queries)
+
+    def match_terms(self, queries: list) -> np.ndarray:
+        """
+        搜索词或其中单词以任意一个查询开头的行号
+
+        Args:
+            queries (list): 搜索词关键字列表
+
+        Returns:
+            np.ndarray: 升序排列的行号
+        """
+        return self._match_any(self.terms, queries)
+
+    def filter_rows(self, regions: list = None, terms: list = None) -> np.ndarray:
+        """
+        同时按地区和搜索词筛选（各自内部为“或”，两者之间为“与”）
+
+        Returns:
+            np.ndarray: 升序排列的行号
+        """
+        rows = np.arange(self.row_count)
+        if regions:
+            rows = np.intersect1d(rows, self.match_regions(regions), assume_unique=True)
+        if terms:
+            rows = np.intersect1d(rows, self.match_terms(terms), assume_unique=True)
+        return rows
+
+
+class FilterResultCache(BoundedLRUCache):
+    """
+    筛选结果缓存。
+
+    以 (数据集版本, 筛选条件元组) 为键，保存筛选得到的行号（升序）和按行号取出的视图。
+    每次重新加载数据时数据集版本递增，旧版本的结果不会再被命中，随后按最近使用顺序淘汰，最多保留 capacity 个结果。
+    """
+
+    def put(self, key: tuple, rows: np.ndarray, frame: pd.DataFrame):
+        """保存一个筛选结果 (行号, 视图)，超出数量上限时淘汰最久未使用的结果"""
+        super().put(key, (rows, frame))
+
+
+def filter_positions(df: pd.DataFrame, text_index: TrendTextIndex = None, country: str = None,
+                     regions: list = None, terms: list = None, min_traffic: int = 0) -> np.ndarray:
+    """
+    按看板的筛选条件计算命中的行号（位置，升序），不复制 DataFrame
+
+    Args:
+        df (pd.DataFrame): 看板的行级数据
+        text_index (TrendTextIndex, optional): 该数据集的倒排索引，有地区或搜索词条件时必须提供
+        country (str, optional): 只保留该国家（与“国家”列相同的取值）
+        regions (list, optional): 地区关键字
+        terms (list, optional): 搜索词关键字
+        min_traffic (int): 最低流量
+
+    Returns:
+        np.ndarray: 升序排列的行号
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if country is not None:
+        countries = df["国家"]
+        if isinstance(countries.dtype, pd.CategoricalDtype):
+            # category 列直接比较编号，不展开为字符串数组
+            code = countries.cat.categories.get_indexer([country])[0]
+            mask &= countries.cat.codes.to_numpy() == code if code >= 0 else False
+        else:
+            mask &= countries.to_numpy() == country
+    if min_traffic > 0:
+        mask &= df["流量"].to_numpy() >= min_traffic
+    rows = np.flatnonzero(mask)
+    if regions or terms:
+        rows = np.intersect1d(rows, text_index.filter_rows(regions, terms), assume_unique=True)
+    return rows
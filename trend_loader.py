@@ -0,0 +1,408 @@
+"""
+看板数据并行加载模块
+
+看板逐日加载数据时，每一天都要重新列出 JSONs/ 和所有国家目录，再串行解析匹配的文件。
+此模块只遍历一次目录树，构建 (日期, 国家) -> 文件路径的清单，
+然后在进程池中并行解析各个文件（JSON 解码是 CPU 密集型操作），并把进度回报给调用方。
+
+工作进程中执行的函数必须定义在可导入的模块中，因此展开逻辑放在这里，而不是 Streamlit 脚本中。
+"""
+
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from bounded_cache import BoundedLRUCache
+from trend_storage import file_signature, get_journal_filename, load_day_records
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+JSON_FILENAME_PREFIX = 'trends_'
+JSON_FILENAME_EXTENSION = '.json'
+# 文件数少于该值时不启动进程池
+MIN_FILES_FOR_POOL = 4
+EPOCH_DATE = date(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+UNIX_EPOCH = pd.Timestamp(0, tz='UTC')
+ONE_DAY = pd.Timedelta(days=1)
+# 每行记录（字典及其引用的字符串）占用内存的粗略估计，用于缓存的内存上限
+ESTIMATED_ROW_BYTES = 600
+
+# 与看板表格一致的列名
+FRAME_COLUMNS = ["搜索词", "标题", "信源", "流量", "发布日期", "地区", "地区数量", "国家"]
+# 取值大量重复的列保存为 category（新闻标题几乎各不相同，仍为 object）
+CATEGORY_COLUMNS = ["搜索词", "信源", "地区", "国家"]
+INT32_MAX = np.iinfo(np.int32).max
+
+
+class DayFileCache(BoundedLRUCache):
+    """
+    已展开行记录的每日文件缓存。
+
+    以文件路径为键，保存 (快照和日志的 (大小, 修改时间) 签名, 行记录, 消息)；
+    签名不变的文件直接复用已展开的行，只有仍在被抓取程序写入的文件（通常是当天的）需要重新解析。
+    按最近使用顺序淘汰，估算的内存占用不超过 max_bytes。可以在多个看板会话（线程）之间共享。
+    """
+
+    def __init__(self, max_bytes: int):
+        super().__init__(max_bytes)
+
+    @staticmethod
+    def signature(file_path: str) -> list:
+        return file_signature([file_path, get_journal_filename(file_path)])
+
+    def get(self, file_path: str, signature: list):
+        """返回签名一致的缓存结果 (行记录, 消息)，否则返回 None"""
+        entry = super().get(file_path, valid=lambda cached: cached[0] == signature)
+        return None if entry is None else (entry[1], entry[2])
+
+    def put(self, file_path: str, signature: list, rows: list, messages: list):
+        """保存一个文件的解析结果，超出内存上限时淘汰最久未使用的文件"""
+        super().put(file_path, (signature, rows, messages), size=len(rows) * ESTIMATED_ROW_BYTES)
+
+
+def parse_pub_date(pub_date_str):
+    """
+    解析 ISO 8601 格式的 pubDate 字符串，返回其 UTC 日期（与每日文件按 UTC 日期命名一致），无法解析时返回 None
+    """
+    # 示例格式: "2025-10-21T17:20:00-07:00", "2025-12-30"
+    if not pub_date_str:
+        return None
+    try:
+        dt = datetime.fromisoformat(pub_date_str)
+    except ValueError:
+        logger.warning(f"无法解析日期字符串: {pub_date_str}")
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.date()
+
+
+def pub_days_utc(items: list) -> list:
+    """
+    批量计算一组趋势记录发布时间的 UTC 日期。
+
+    抓取程序写入了 pub_ts（UTC 时间戳）的记录直接用整数运算得到日期；
+    其余（历史）记录的 pub_date 字符串一次性交给 pandas 向量化解析，正确处理各自的时区偏移。
+
+    Args:
+        items (list): 趋势记录列表
+
+    Returns:
+        list: 与 items 一一对应的 date 对象；没有日期或无法解析时为 None
+    """
+    days = [None] * len(items)
+    pending_positions = []
+    pending_values = []
+    for position, item in enumerate(items):
+        pub_ts = item.get('pub_ts')
+        if pub_ts is not None:
+            days[position] = EPOCH_DATE + timedelta(days=pub_ts // SECONDS_PER_DAY)
+        elif item.get('pub_date'):
+            pending_positions.append(position)
+            pending_values.append(item['pub_date'])
+
+    if pending_values:
+        parsed = pd.to_datetime(pd.Series(pending_values, dtype=object), utc=True, format='ISO8601', errors='coerce')
+        # 按 UTC 日期去重后再转为 date 对象，同一天的大量记录共享同一个对象
+        day_numbers = (parsed - UNIX_EPOCH) // ONE_DAY
+        cache = {}
+        for position, day_number in zip(pending_positions, day_numbers.tolist()):
+            if day_number != day_number:  # NaN：无法解析
+                continue
+            day = cache.get(day_number)
+            if day is None:
+                day = cache[day_number] = EPOCH_DATE + timedelta(days=int(day_number))
+            days[position] = day
+    return days
+
+
+def build_file_manifest(folder_path: str, start_date, end_date) -> list:
+    """
+    只遍历一次目录树，列出日期范围内的所有每日数据文件
+
+    根目录和每个国家子目录中，文件名恰好为 trends_YYYY-MM-DD.json 的文件会被读取
+    （写入中的临时文件等其他文件都会被忽略），子目录名即为文件中缺少国家信息时使用的国家。
+
+    Args:
+        folder_path (str): 数据根目录
+        start_date (date): 开始日期
+        end_date (date): 结束日期（含）
+
+    Returns:
+        list: (日期, 文件路径, 目录国家) 元组列表，按日期升序、目录顺序排列
+    """
+    search_paths = [(folder_path, None)]
+    try:
+        for item in os.listdir(folder_path):
+            item_path = os.path.join(folder_path, item)
+            if os.path.isdir(item_path):
+                search_paths.append((item_path, item))
+    except OSError as e:
+        logger.warning(f"无法读取文件夹结构: {e}")
+
+    by_date = {}
+    for search_path, folder_country in search_paths:
+        try:
+            filenames = os.listdir(search_path)
+        except OSError:
+            continue
+        for filename in filenames:
+            if (not filename.startswith(JSON_FILENAME_PREFIX) or not filename.endswith(JSON_FILENAME_EXTENSION)
+                    or len(filename) != len(JSON_FILENAME_PREFIX) + 10 + len(JSON_FILENAME_EXTENSION)):
+                continue
+            date_str = filename[len(JSON_FILENAME_PREFIX):len(JSON_FILENAME_PREFIX) + 10]
+            try:
+                file_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            except ValueError:
+                continue
+            if start_date <= file_date <= end_date:
+                by_date.setdefault(file_date, []).append((file_date, os.path.join(search_path, filename), folder_country))
+
+    manifest = []
+    for file_date in sorted(by_date):
+        manifest.extend(by_date[file_date])
+    return manifest
+
+
+def process_day_file(file_path: str, target_date, folder_country: str = None) -> tuple:
+    """
+    加载并处理一个每日数据文件，将每个新闻项作为一行返回（在工作进程中执行）
+
+    Args:
+        file_path (str): 数据文件路径
+        target_date (date): 文件对应的日期，发布日期不同的趋势会被跳过
+        folder_country (str, optional): 文件所在的国家目录名
+
+    Returns:
+        tuple: (行记录列表, 消息列表)；消息为 (级别, 文本)，由调用方在界面中显示
+    """
+    rows = []
+    messages = []
+    try:
+        # 快照叠加抓取程序追加日志中尚未压缩的记录
+        data = load_day_records(file_path)
+    except json.JSONDecodeError as e:
+        messages.append(('error', f"解码 JSON 文件错误 {file_path}: {e}"))
+        return rows, messages
+    except Exception as e:
+        messages.append(('error', f"读取文件时发生意外错误 {file_path}: {e}"))
+        return rows, messages
+
+    if not isinstance(data, list):
+        messages.append(('warning', f"警告: {file_path} 中的数据不是列表。跳过。"))
+        return rows, messages
+
+    return flatten_day_records(data, target_date, folder_country)
+
+
+def flatten_day_records(data: list, target_date, folder_country: str = None) -> tuple:
+    """
+    把一天的趋势记录展开为新闻级的行记录（只保留 UTC 发布日期与文件日期相同、有新闻且流量非负的趋势）
+
+    Args:
+        data (list): 每日文件中的趋势记录
+        target_date (date): 文件对应的日期
+        folder_country (str, optional): 文件所在的国家目录名
+
+    Returns:
+        tuple: (行记录列表, 消息列表)
+    """
+    rows = []
+    messages = []
+    # 整个文件的发布日期一次性计算（UTC 日期，与文件名的日期口径一致）
+    item_dates = pub_days_utc(data)
+    for item, item_date in zip(data, item_dates):
+        # 调整阈值为0，显示所有流量数据
+        if item.get('traffic_num', 0) < 0:
+            continue
+
+        # 确认 pub_date 与文件名代表的日期一致
+        if item_date is None:
+            if item.get('pub_date'):
+                messages.append(('warning', f"无法解析日期字符串: {item['pub_date']}"))
+            continue
+        if item_date != target_date:
+            continue
+
+        news_list = item.get('news', [])
+        if not news_list:
+            continue
+
+        search_term = item.get('title', 'N/A')
+        traffic_num = item.get('traffic_num', 0)
+        regions = item.get('regions', [])
+        # 如果JSON中没有国家信息，则使用文件夹名称作为国家
+        country = item.get('country', folder_country)
+
+        # 遍历 news 列表，为每个 news_item 创建一行记录
+        for news_item in news_list:
+            rows.append({
+                "Search Term": search_term,
+                "News Title": news_item.get('title', 'N/A'),
+                "News Source": news_item.get('source', 'N/A'),
+                "Traffic Num": traffic_num,
+                "Pub Date": item_date,
+                "Regions": regions,
+                "Country": country
+            })
+    return rows, messages
+
+
+def format_country_label(country_info) -> str:
+    """国家列的取值：国家可能是字符串、列表或缺失（所有生成看板数据的模块共用）"""
+    if isinstance(country_info, (set, list)):
+        return "; ".join(country_info)
+    return country_info if country_info else "未知"
+
+
+def _traffic_dtype(traffic: np.ndarray):
+    """流量一般远小于 int32 上限，极端情况下退回 int64"""
+    return np.int32 if len(traffic) == 0 or traffic.max() <= INT32_MAX else np.int64
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    把看板 DataFrame 转为紧凑的列类型：重复取值的字符串列为 category，流量为 int32，地区数量为 int16
+
+    Args:
+        df (pd.DataFrame): 与看板表格结构一致的数据
+
+    Returns:
+        pd.DataFrame: 转换后的数据（列顺序和取值不变）
+    """
+    if df.empty:
+        return df
+    dtypes = {column: 'category' for column in CATEGORY_COLUMNS if column in df.columns}
+    if "流量" in df.columns:
+        dtypes["流量"] = _traffic_dtype(df["流量"].to_numpy())
+    if "地区数量" in df.columns:
+        dtypes["地区数量"] = np.int16
+    return df.astype(dtypes)
+
+
+def rows_to_frame(rows: list) -> pd.DataFrame:
+    """
+    把 flatten_day_records 展开的行记录按列直接构建为看板使用的 DataFrame（不经过逐行字典）
+
+    Args:
+        rows (list): 行记录列表
+
+    Returns:
+        pd.DataFrame: 列为 FRAME_COLUMNS，重复取值的字符串列为 category，流量为 int32
+    """
+    if not rows:
+        return pd.DataFrame(columns=FRAME_COLUMNS)
+
+    # 同一趋势的多条新闻共享同一个地区列表和国家对象，按对象缓存拼接结果
+    regions_cache = {}
+    country_cache = {}
+
+    def regions_str(regions: list) -> str:
+        key = id(regions)
+        cached = regions_cache.get(key)
+        if cached is None or cached[0] is not regions:
+            cached = regions_cache[key] = (regions, "; ".join(regions))
+        return cached[1]
+
+    def country_str(country_info) -> str:
+        key = id(country_info)
+        cached = country_cache.get(key)
+        if cached is None or cached[0] is not country_info:
+            cached = country_cache[key] = (country_info, format_country_label(country_info))
+        return cached[1]
+
+    traffic = np.fromiter((row["Traffic Num"] for row in rows), dtype=np.int64, count=len(rows))
+    return pd.DataFrame({
+        "搜索词": pd.Categorical([row["Search Term"] for row in rows]),
+        "标题": [row["News Title"] for row in rows],
+        "信源": pd.Categorical([row["News Source"] for row in rows]),
+        "流量": traffic.astype(_traffic_dtype(traffic)),
+        "发布日期": [row["Pub Date"] for row in rows],
+        "地区": pd.Categorical([regions_str(row["Regions"]) for row in rows]),
+        "地区数量": np.fromiter((len(row["Regions"]) for row in rows), dtype=np.int16, count=len(rows)),
+        "国家": pd.Categorical([country_str(row["Country"]) for row in rows]),
+    })
+
+
+def load_rows_parallel(folder_path: str, start_date, end_date, max_workers: int = None, _progress_callback=None, cache: DayFileCache = None) -> tuple:
+    """
+    并行加载日期范围内所有每日数据文件的行记录
+
+    Args:
+        folder_path (str): 数据根目录
+        start_date (date): 开始日期
+        end_date (date): 结束日期（含）
+        max_workers (int, optional): 进程数，为 None 时使用 CPU 核心数；只有 1 个时串行加载
+        _progress_callback (callable, optional): 进度回调 (progress, message)，每解析完一个文件调用一次
+        cache (DayFileCache, optional): 每日文件缓存，签名未变化的文件不再重新解析
+
+    Returns:
+        tuple: (按发布日期和流量降序排列的行记录列表, 消息列表)
+    """
+    manifest = build_file_manifest(folder_path, start_date, end_date)
+    total = len(manifest)
+    results = [None] * total
+    done = 0
+
+    def report(file_date):
+        if _progress_callback:
+            _progress_callback(done / total, f"正在加载 {file_date.strftime('%Y-%m-%d')} 的数据...")
+
+    # 先从缓存中取出签名未变化的文件
+    pending = []
+    signatures = {}
+    for position, (file_date, file_path, folder_country) in enumerate(manifest):
+        if cache is not None:
+            signatures[position] = cache.signature(file_path)
+            cached = cache.get(file_path, signatures[position])
+            if cached is not None:
+                results[position] = cached
+                done += 1
+                report(file_date)
+                continue
+        pending.append(position)
+
+    def store(position: int, result: tuple):
+        results[position] = result
+        if cache is not None:
+            cache.put(manifest[position][1], signatures[position], result[0], result[1])
+
+    # 单核主机上进程池只增加启动和序列化开销（见 benchmarks/bench_load.py），直接串行加载
+    if len(pending) < MIN_FILES_FOR_POOL or (max_workers or os.cpu_count() or 1) <= 1:
+        for position in pending:
+            file_date, file_path, folder_country = manifest[position]
+            store(position, process_day_file(file_path, file_date, folder_country))
+            done += 1
+            report(file_date)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(process_day_file, manifest[position][1], manifest[position][0], manifest[position][2]): position
+                for position in pending
+            }
+            for future in as_completed(futures):
+                position = futures[future]
+                try:
+                    store(position, future.result())
+                except Exception as e:
+                    # 读取失败的结果不进入缓存，下次重试
+                    results[position] = ([], [('error', f"读取文件时发生意外错误 {manifest[position][1]}: {e}")])
+                done += 1
+                report(manifest[position][0])
+
+    # 按清单顺序拼接，保证结果与串行加载一致
+    all_rows = []
+    all_messages = []
+    for rows, messages in results:
+        all_rows.extend(rows)
+        all_messages.extend(messages)
+    # 按发布日期（降序）和流量数（降序）排序
+    all_rows.sort(key=lambda x: (x["Pub Date"], x["Traffic Num"]), reverse=True)
+    return all_rows, all_messages
@@ -0,0 +1,275 @@
+"""
+每日聚合汇总模块
+
+看板的“数据概览”卡片和图表原本在每次重新运行时都对整张行级 DataFrame 做 groupby。
+此模块在抓取（保存每日文件）时为每个每日数据文件预先计算聚合结果，写入
+    <ROLLUP_DIR>/<country>/trends_YYYY-MM-DD.json
+包括按国家、按地区、按信源、按日期的新闻数量和流量合计，以及每个国家的搜索词集合（用于去重计数）。
+所有维度都带有国家列，因此可以按国家筛选后再合并。
+看板读取日期范围内的这些小表并合并，即可得到概览指标和图表数据，而不必扫描原始行。
+
+聚合口径与看板的行记录一致（每个新闻一行，只保留 UTC 发布日期与文件日期相同、有新闻且流量非负的趋势）。
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# 导入配置
+from config import current_config
+from trend_loader import DayFileCache, build_file_manifest, flatten_day_records, format_country_label
+from trend_storage import atomic_write_json, load_day_records
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 汇总格式版本，口径变化时递增，旧汇总会被自动重建
+ROLLUP_VERSION = 1
+
+# 进程内缓存：汇总文件路径 -> (源文件签名, 汇总内容)
+_memory_cache = {}
+_memory_lock = threading.Lock()
+
+
+def get_rollup_filename(data_path: str, folder_country: str = None, rollup_dir: str = None) -> str:
+    """返回某个每日数据文件对应的汇总文件路径；根目录中的文件放在 _root 下"""
+    if rollup_dir is None:
+        rollup_dir = current_config.ROLLUP_DIR
+    base_name = os.path.splitext(os.path.basename(data_path))[0]
+    return os.path.join(rollup_dir, folder_country or "_root", f"{base_name}.json")
+
+
+def compute_day_rollup(records: list, target_date: date, folder_country: str = None) -> dict:
+    """
+    计算一天数据的聚合结果
+
+    Args:
+        records (list): 每日文件中的趋势记录
+        target_date (date): 文件对应的日期
+        folder_country (str, optional): 文件所在的国家目录名
+
+    Returns:
+        dict: 各维度的聚合表，每行为 [国家, 维度值, 新闻数量, 流量合计]；
+            country 表每行为 [国家, 新闻数量, 流量合计, 地区数量合计, 搜索词列表]
+    """
+    rows, _ = flatten_day_records(records, target_date, folder_country)
+    by_country = {}
+    by_region = {}
+    by_source = {}
+    by_day = {}
+    for row in rows:
+        country = format_country_label(row["Country"])
+        traffic = row["Traffic Num"]
+        entry = by_country.setdefault(country, [0, 0, 0, set()])
+        entry[0] += 1
+        entry[1] += traffic
+        entry[2] += len(row["Regions"])
+        entry[3].add(row["Search Term"])
+        for table, key in (
+            (by_region, "; ".join(row["Regions"])),
+            (by_source, row["News Source"]),
+            (by_day, row["Pub Date"].isoformat())
+        ):
+            counts = table.setdefault((country, key), [0, 0])
+            counts[0] += 1
+            counts[1] += traffic
+
+    return {
+        'country': [[country, count, traffic, regions, sorted(terms)] for country, (count, traffic, regions, terms) in by_country.items()],
+        'region': [[country, key, count, traffic] for (country, key), (count, traffic) in by_region.items()],
+        'source': [[country, key, count, traffic] for (country, key), (count, traffic) in by_source.items()],
+        'day': [[country, key, count, traffic] for (country, key), (count, traffic) in by_day.items()],
+    }
+
+
+def write_day_rollup(data_path: str, records: list, target_date: date, folder_country: str = None, rollup_dir: str = None) -> dict:
+    """
+    计算并保存一个每日数据文件的聚合结果（由抓取程序在保存每日文件后调用，或在读取时按需重建）
+
+    Args:
+        data_path (str): 每日快照文件路径（必须已写入磁盘，用于记录签名）
+        records (list): 该文件中的全部趋势记录
+        target_date (date): 文件对应的日期
+        folder_country (str, optional): 文件所在的国家目录名
+        rollup_dir (str, optional): 汇总目录，默认使用配置中的 ROLLUP_DIR
+
+    Returns:
+        dict: 聚合结果
+    """
+    rollup_path = get_rollup_filename(data_path, folder_country, rollup_dir)
+    signature = DayFileCache.signature(data_path)
+    rollup = compute_day_rollup(records, target_date, folder_country)
+    try:
+        os.makedirs(os.path.dirname(rollup_path), exist_ok=True)
+        atomic_write_json(rollup_path, {'version': ROLLUP_VERSION, 'signature': signature, 'rollup': rollup}, indent=None)
+    except OSError as e:
+        logger.error(f"保存聚合汇总 {rollup_path} 时出错: {e}")
+    with _memory_lock:
+        _memory_cache[rollup_path] = (signature, rollup)
+    return rollup
+
+
+def load_day_rollup(data_path: str, target_date: date, folder_country: str = None, rollup_dir: str = None) -> dict:
+    """
+    读取一个每日数据文件的聚合结果；汇总缺失或与源文件签名不一致时重新计算
+
+    Returns:
+        dict: 聚合结果；源文件无法读取时为 None
+    """
+    rollup_path = get_rollup_filename(data_path, folder_country, rollup_dir)
+    signature = DayFileCache.signature(data_path)
+    with _memory_lock:
+        cached = _memory_cache.get(rollup_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    if os.path.exists(rollup_path):
+        try:
+            with open(rollup_path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get('version') == ROLLUP_VERSION and payload.get('signature') == signature:
+                with _memory_lock:
+                    _memory_cache[rollup_path] = (signature, payload['rollup'])
+                return payload['rollup']
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"聚合汇总 {rollup_path} 无法读取，将重建: {e}")
+
+    try:
+        records = load_day_records(data_path)
+    except (json.JSONDecodeError, OSError) as e:
+        logger.error(f"读取数据文件 {data_path} 时出错: {e}")
+        return None
+    if not isinstance(records, list):
+        return None
+    return write_day_rollup(data_path, records, target_date, folder_country, rollup_dir)
+
+
+def load_rollups(folder_path: str, start_date: date, end_date: date, country_label: str = None, rollup_dir: str = None) -> dict:
+    """
+    合并日期范围内所有每日文件的聚合结果，得到看板概览和图表使用的小表
+
+    Args:
+        folder_path (str): 数据根目录
+        start_date (date): 开始日期
+        end_date (date): 结束日期（含）
+        country_label (str, optional): 只保留该国家（与看板“国家”列相同的取值）
+        rollup_dir (str, optional): 汇总目录，默认使用配置中的 ROLLUP_DIR
+
+    Returns:
+        dict: 与 summarize_frame 结构相同的汇总表
+    """
+    country_rows, region_rows, source_rows, day_rows = [], [], [], []
+    for file_date, data_path, folder_country in build_file_manifest(folder_path, start_date, end_date):
+        rollup = load_day_rollup(data_path, file_date, folder_country, rollup_dir)
+        if rollup is None:
+            continue
+        country_rows.extend(rollup['country'])
+        region_rows.extend(rollup['region'])
+        source_rows.extend(rollup['source'])
+        day_rows.extend(rollup['day'])
+
+    def merge(rows: list, key: str) -> pd.DataFrame:
+        table = pd.DataFrame(rows, columns=["国家", key, "新闻数量", "总流量"])
+        if country_label is not None:
+            table = table[table["国家"] == country_label]
+        return table.groupby(key, as_index=False)[["新闻数量", "总流量"]].sum()
+
+    countries = pd.DataFrame(
+        [row[:4] for row in country_rows],
+        columns=["国家", "新闻数量", "总流量", "地区数量合计"]
+    )
+    terms_by_country = {}
+    for country, _, _, _, terms in country_rows:
+        if country_label is None or country == country_label:
+            terms_by_country.setdefault(country, set()).update(terms)
+    if country_label is not None:
+        countries = countries[countries["国家"] == country_label]
+    countries = countries.groupby("国家", as_index=False)[["新闻数量", "总流量", "地区数量合计"]].sum()
+    countries["搜索词数量"] = countries["国家"].map(lambda c: len(terms_by_country.get(c, ())))
+
+    day = merge(day_rows, "发布日期")
+    day["发布日期"] = pd.to_datetime(day["发布日期"]).dt.date
+    all_terms = set().union(*terms_by_country.values()) if terms_by_country else set()
+    return _finish(countries, merge(region_rows, "地区"), merge(source_rows, "信源"), day, len(all_terms))
+
+
+def _group_codes(values: pd.Series) -> tuple:
+    """维度列的分组编号和取值（category 列直接复用其编号）"""
+    codes, uniques = pd.factorize(values, sort=False)
+    return codes, np.asarray(uniques, dtype=object)
+
+
+def _count_and_sum(codes: np.ndarray, size: int, weights: np.ndarray) -> tuple:
+    """按分组编号统计行数和权重合计（编号 -1 为缺失值，与 groupby 一致不参与统计）"""
+    valid = codes >= 0
+    if not valid.all():
+        codes, weights = codes[valid], weights[valid]
+    counts = np.bincount(codes, minlength=size)
+    sums = np.bincount(codes, weights=weights, minlength=size).astype(np.int64)
+    return counts, sums
+
+
+def summarize_frame(df: pd.DataFrame) -> dict:
+    """
+    直接从行级 DataFrame 计算与 load_rollups 结构相同的汇总表
+    （用于地区、最低流量等无法由预计算汇总回答的筛选条件）
+
+    分组统计在分组编号上用 np.bincount 完成，category 列不需要再对字符串做哈希。
+
+    Args:
+        df (pd.DataFrame): 看板的行级数据
+
+    Returns:
+        dict: 与 load_rollups 结构相同的汇总表
+    """
+    traffic = df["流量"].to_numpy(dtype=np.float64)
+    term_codes, term_values = _group_codes(df["搜索词"])
+
+    country_codes, country_values = _group_codes(df["国家"])
+    counts, sums = _count_and_sum(country_codes, len(country_values), traffic)
+    region_counts = np.bincount(country_codes, weights=df["地区数量"].to_numpy(dtype=np.float64), minlength=len(country_values))
+    # 每个国家的不同搜索词数量：对 (国家, 搜索词) 编号对去重后按国家计数
+    pairs = np.unique(country_codes.astype(np.int64) * max(len(term_values), 1) + term_codes)
+    unique_terms = np.bincount(pairs // max(len(term_values), 1), minlength=len(country_values))
+    countries = pd.DataFrame({
+        "国家": country_values,
+        "新闻数量": counts,
+        "总流量": sums,
+        "地区数量合计": region_counts.astype(np.int64),
+        "搜索词数量": unique_terms,
+    }).sort_values(by="国家").reset_index(drop=True)
+
+    def merge(key: str) -> pd.DataFrame:
+        codes, values = _group_codes(df[key])
+        counts, sums = _count_and_sum(codes, len(values), traffic)
+        return pd.DataFrame({key: values, "新闻数量": counts, "总流量": sums}).sort_values(by=key).reset_index(drop=True)
+
+    return _finish(countries, merge("地区"), merge("信源"), merge("发布日期"), len(term_values))
+
+
+def _finish(countries: pd.DataFrame, regions: pd.DataFrame, sources: pd.DataFrame, days: pd.DataFrame, unique_terms: int) -> dict:
+    """补充派生列和总计"""
+    countries = countries.copy()
+    countries["平均流量"] = countries["总流量"] / countries["新闻数量"]
+    countries["平均地区数量"] = countries["地区数量合计"] / countries["新闻数量"]
+    total_records = int(countries["新闻数量"].sum())
+    total_traffic = int(countries["总流量"].sum())
+    return {
+        'country': countries,
+        'region': regions,
+        'source': sources,
+        'day': days.sort_values(by="发布日期").reset_index(drop=True),
+        'totals': {
+            '新闻数量': total_records,
+            '总流量': total_traffic,
+            '平均流量': total_traffic / total_records if total_records else 0,
+            '国家数量': len(countries),
+            '信源数量': len(sources),
+            '搜索词数量': unique_terms,
+        }
+    }
@@ -0,0 +1,255 @@
+"""
+趋势数据存储模块
+
+此模块提供每日数据文件的原子写入，以及可选的追加式日志 (journal) 存储：
+每次拉取只把新增或变化的记录以 JSON Lines 形式追加到按国家、按天划分的日志中，
+再由压缩 (compaction) 步骤把日志折叠进当天的快照文件。
+读取时以快照为基础、按标题叠加日志中的记录，因此读者始终能看到完整的数据。
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+
+# 导入配置
+from config import current_config
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 日志文件所在的子目录（位于国家目录下，以 . 开头，不会被当作数据文件读取）
+JOURNAL_DIRNAME = ".journal"
+JOURNAL_EXTENSION = ".jsonl"
+
+
+def atomic_write_json(path: str, data, indent: int = 2):
+    """
+    原子地写入 JSON 文件：先在同一目录写以 . 开头的临时文件并刷盘，再通过重命名替换目标文件，
+    读者只会看到旧文件或完整的新文件，不会读到写了一半的内容（临时文件名不符合数据文件的命名规则，不会被扫描到）。
+
+    Args:
+        path (str): 目标文件路径
+        data: 可序列化为 JSON 的数据
+        indent (int): 缩进，为 None 时输出紧凑格式
+    """
+    directory, filename = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{filename}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def file_signature(path) -> list:
+    """
+    数据文件的签名 (大小, 修改时间)，用于判断缓存是否仍与文件对应
+
+    Args:
+        path (str | list): 单个文件路径，或需要一起校验的多个文件路径（如快照和日志）
+
+    Returns:
+        list: 文件签名；传入多个路径时为各文件签名组成的列表，不存在的文件签名为 None
+    """
+    if isinstance(path, (list, tuple)):
+        return [file_signature(p) for p in path]
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def get_journal_filename(data_path: str) -> str:
+    """
+    根据当天的快照文件路径生成对应的日志文件路径
+    例如 JSONs/India/trends_2026-01-01.json -> JSONs/India/.journal/trends_2026-01-01.jsonl
+    """
+    directory, filename = os.path.split(data_path)
+    base_name, _ = os.path.splitext(filename)
+    return os.path.join(directory, JOURNAL_DIRNAME, f"{base_name}{JOURNAL_EXTENSION}")
+
+
+def append_journal(data_path: str, records: list) -> bool:
+    """
+    把新增或变化的记录追加到日志中（一次写入并刷盘）；日志末尾有中断留下的残缺行时先补一个换行符
+
+    Args:
+        data_path (str): 当天快照文件路径
+        records (list): 需要追加的完整趋势记录
+
+    Returns:
+        bool: 写入是否成功
+    """
+    if not records:
+        return True
+    journal_path = get_journal_filename(data_path)
+    try:
+        os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+        payload = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode('utf-8')
+        with open(journal_path, 'ab+') as f:
+            # 上一次追加中断时最后一行没有换行符，先补上换行，避免新记录拼接到残缺的行上一起被丢弃
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    payload = b"\n" + payload
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        logger.info(f"已向日志 {journal_path} 追加 {len(records)} 条记录")
+        return True
+    except Exception as e:
+        logger.error(f"追加日志 {journal_path} 时出错: {e}")
+        return False
+
+
+def read_journal(data_path: str) -> list:
+    """
+    读取日志中的全部记录；最后一行如果因中断而不完整，会被忽略
+
+    Args:
+        data_path (str): 当天快照文件路径
+
+    Returns:
+        list: 按追加顺序排列的记录
+    """
+    journal_path = get_journal_filename(data_path)
+    records = []
+    if not os.path.exists(journal_path):
+        return records
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"日志 {journal_path} 第 {line_number} 行不完整，已忽略")
+    return records
+
+
+def overlay_journal(snapshot: list, journal_records: list) -> list:
+    """
+    按标题把日志记录叠加到快照上：已有标题原位替换（以第一次出现的位置为准），新标题按顺序追加
+
+    Args:
+        snapshot (list): 快照中的记录（会被原地修改）
+        journal_records (list): 日志中的记录
+
+    Returns:
+        list: 叠加后的记录列表
+    """
+    if not journal_records:
+        return snapshot
+    positions = {}
+    for offset, item in enumerate(snapshot):
+        positions.setdefault(item.get('title'), offset)
+    for record in journal_records:
+        title = record.get('title')
+        if title in positions:
+            snapshot[positions[title]] = record
+        else:
+            positions[title] = len(snapshot)
+            snapshot.append(record)
+    return snapshot
+
+
+def load_day_records(data_path: str) -> list:
+    """
+    读取某一天的完整数据：快照文件叠加日志中的记录
+
+    Args:
+        data_path (str): 当天快照文件路径
+
+    Returns:
+        list: 趋势记录列表；快照和日志都不存在时为空列表
+
+    Raises:
+        json.JSONDecodeError: 快照文件格式错误时抛出
+    """
+    snapshot = []
+    if os.path.exists(data_path):
+        with open(data_path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    return overlay_journal(snapshot, read_journal(data_path))
+
+
+def compact_journal(data_path: str) -> bool:
+    """
+    把日志折叠进快照：以原子方式重写快照，然后删除日志
+
+    Args:
+        data_path (str): 当天快照文件路径
+
+    Returns:
+        bool: 压缩是否成功（没有日志时返回 True）
+    """
+    journal_path = get_journal_filename(data_path)
+    if not os.path.exists(journal_path):
+        return True
+    try:
+        records = load_day_records(data_path)
+        atomic_write_json(data_path, records)
+        os.remove(journal_path)
+        logger.info(f"已将日志 {journal_path} 压缩进 {data_path}，共 {len(records)} 个条目")
+        return True
+    except Exception as e:
+        logger.error(f"压缩日志 {journal_path} 时出错: {e}")
+        return False
+
+
+def journal_size(data_path: str) -> int:
+    """日志文件当前的字节数，不存在时为 0"""
+    try:
+        return os.path.getsize(get_journal_filename(data_path))
+    except OSError:
+        return 0
+
+
+def compact_stale_journals(data_path: str):
+    """
+    压缩同一国家目录下除 data_path 以外的所有日志（跨天后前一天的日志不会再被追加）
+
+    Args:
+        data_path (str): 当前正在写入的快照文件路径
+    """
+    directory = os.path.dirname(data_path)
+    current_journal = get_journal_filename(data_path)
+    for journal_path in glob.glob(os.path.join(directory, JOURNAL_DIRNAME, f"*{JOURNAL_EXTENSION}")):
+        if os.path.abspath(journal_path) == os.path.abspath(current_journal):
+            continue
+        base_name = os.path.splitext(os.path.basename(journal_path))[0]
+        compact_journal(os.path.join(directory, f"{base_name}{current_config.OUTPUT_FILE_EXTENSION}"))
+
+
+def compact_all_journals(output_dir: str = None) -> int:
+    """
+    压缩输出目录下所有国家的所有日志
+
+    Args:
+        output_dir (str, optional): 输出目录，默认使用配置中的 OUTPUT_DIR
+
+    Returns:
+        int: 压缩的日志数量
+    """
+    if output_dir is None:
+        output_dir = current_config.OUTPUT_DIR
+    count = 0
+    for journal_path in glob.glob(os.path.join(output_dir, "*", JOURNAL_DIRNAME, f"*{JOURNAL_EXTENSION}")):
+        country_dir = os.path.dirname(os.path.dirname(journal_path))
+        base_name = os.path.splitext(os.path.basename(journal_path))[0]
+        if compact_journal(os.path.join(country_dir, f"{base_name}{current_config.OUTPUT_FILE_EXTENSION}")):
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='把所有国家的追加日志压缩进每日快照文件')
+    parser.add_argument('--output-dir', default=None, help='数据目录（默认使用配置中的 OUTPUT_DIR）')
+    args = parser.parse_args()
+    compacted = compact_all_journals(args.output_dir)
+    logger.info(f"共压缩 {compacted} 个日志文件")
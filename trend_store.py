@@ -0,0 +1,256 @@
+"""
+SQLite 趋势存储模块
+
+此模块在 JSON 文件之外维护一个 SQLite 数据库，保存趋势、新闻和区域三张表：
+    trends  每个国家目录、每个文件日期、每个标题一行（文件中同标题的重复记录只保留第一条）
+    news    趋势下的新闻，按 (标题, 来源) 去重
+    regions 趋势涉及的区域
+并在 (国家, 发布日期)、流量、搜索词上建立索引。
+抓取程序保存每日文件时把新增或变化的记录 upsert 进来；
+看板可以直接用 SQL 完成日期范围、国家和最低流量的筛选，而不必在 pandas 中复制并过滤整个 DataFrame。
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+from contextlib import closing
+from datetime import date
+
+import pandas as pd
+
+# 导入配置
+from config import current_config
+from trend_loader import FRAME_COLUMNS, format_country_label, pub_days_utc
+from trend_storage import load_day_records
+from trend_index import TrendTextIndex
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trends (
+    id INTEGER PRIMARY KEY,
+    country TEXT NOT NULL,
+    file_date TEXT NOT NULL,
+    title TEXT NOT NULL,
+    traffic_num INTEGER NOT NULL DEFAULT 0,
+    pub_date TEXT,
+    pub_day TEXT,
+    picture TEXT,
+    country_label TEXT NOT NULL,
+    regions_str TEXT NOT NULL DEFAULT '',
+    region_count INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (country, file_date, title)
+);
+CREATE TABLE IF NOT EXISTS news (
+    id INTEGER PRIMARY KEY,
+    trend_id INTEGER NOT NULL REFERENCES trends(id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    source TEXT NOT NULL,
+    url TEXT,
+    picture TEXT,
+    UNIQUE (trend_id, title, source)
+);
+CREATE TABLE IF NOT EXISTS regions (
+    trend_id INTEGER NOT NULL REFERENCES trends(id) ON DELETE CASCADE,
+    region TEXT NOT NULL,
+    PRIMARY KEY (trend_id, region)
+);
+CREATE INDEX IF NOT EXISTS idx_trends_country_pub_day ON trends (country, pub_day);
+CREATE INDEX IF NOT EXISTS idx_trends_label_pub_day ON trends (country_label, pub_day);
+CREATE INDEX IF NOT EXISTS idx_trends_pub_day ON trends (pub_day);
+CREATE INDEX IF NOT EXISTS idx_trends_traffic ON trends (traffic_num);
+CREATE INDEX IF NOT EXISTS idx_trends_title ON trends (title);
+CREATE INDEX IF NOT EXISTS idx_regions_region ON regions (region);
+"""
+
+UPSERT_TREND_SQL = """
+INSERT INTO trends (country, file_date, title, traffic_num, pub_date, pub_day, picture, country_label, regions_str, region_count)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (country, file_date, title) DO UPDATE SET
+    traffic_num = excluded.traffic_num,
+    pub_date = excluded.pub_date,
+    pub_day = excluded.pub_day,
+    picture = excluded.picture,
+    country_label = excluded.country_label,
+    regions_str = excluded.regions_str,
+    region_count = excluded.region_count
+RETURNING id
+"""
+
+
+def _location_of(data_path: str, source_dir: str = None) -> tuple:
+    """
+    从每日数据文件路径中解析 (国家目录名, 文件日期)
+    例如 JSONs/India/trends_2026-01-01.json -> ("India", "2026-01-01")；位于根目录的文件国家为空字符串
+    """
+    if source_dir is None:
+        source_dir = current_config.OUTPUT_DIR
+    directory, filename = os.path.split(data_path)
+    base_name = os.path.splitext(filename)[0]
+    file_date = base_name[len(current_config.OUTPUT_FILE_PREFIX):]
+    relative = os.path.relpath(directory, source_dir)
+    country = '' if relative in ('.', '') else relative.split(os.sep)[0]
+    return country, file_date
+
+
+class TrendStore:
+    """
+    SQLite 趋势存储。
+
+    每次操作打开独立的连接（WAL 模式），因此可以在抓取线程、asyncio.to_thread 和看板进程之间共享同一个数据库文件。
+    """
+
+    def __init__(self, db_path: str = None):
+        if db_path is None:
+            db_path = current_config.SQLITE_DB_FILE
+        self.db_path = db_path
+        self._initialized = False
+
+    def connect(self) -> sqlite3.Connection:
+        """打开连接，首次使用时创建表和索引"""
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA foreign_keys = ON")
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            self._initialized = True
+        return conn
+
+    def upsert_trends(self, data_path: str, records: list, source_dir: str = None) -> int:
+        """
+        把某个每日数据文件中的记录 upsert 进数据库（标题已存在时更新字段，新闻和区域只追加未出现过的）
+
+        Args:
+            data_path (str): 记录所属的每日快照文件路径，用于确定国家和文件日期
+            records (list): 完整的趋势记录
+            source_dir (str, optional): 数据根目录，默认使用配置中的 OUTPUT_DIR
+
+        Returns:
+            int: 写入的趋势数量
+        """
+        if not records:
+            return 0
+        country, file_date = _location_of(data_path, source_dir)
+        seen_titles = set()
+        with closing(self.connect()) as conn, conn:
+            for item, item_date in zip(records, pub_days_utc(records)):
+                # 历史文件中可能存在同标题的重复记录，与 MergeIndex 一致以第一条为准
+                if item.get('title', 'N/A') in seen_titles:
+                    continue
+                seen_titles.add(item.get('title', 'N/A'))
+                pub_date = item.get('pub_date') or ''
+                regions = item.get('regions', []) or []
+                trend_id = conn.execute(UPSERT_TREND_SQL, (
+                    country,
+                    file_date,
+                    item.get('title', 'N/A'),
+                    int(item.get('traffic_num', 0) or 0),
+                    pub_date,
+                    # 与看板一致，使用发布时间的 UTC 日期
+                    item_date.isoformat() if item_date else None,
+                    item.get('picture', ''),
+                    format_country_label(item.get('country', country or None)),
+                    "; ".join(regions),
+                    len(regions)
+                )).fetchone()[0]
+                conn.executemany(
+                    "INSERT OR IGNORE INTO news (trend_id, title, source, url, picture) VALUES (?, ?, ?, ?, ?)",
+                    [(trend_id, news.get('title', 'N/A'), news.get('source', 'N/A'), news.get('url', ''), news.get('picture', ''))
+                     for news in item.get('news', []) or []]
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO regions (trend_id, region) VALUES (?, ?)",
+                    [(trend_id, region) for region in regions]
+                )
+        return len(seen_titles)
+
+    def import_json_tree(self, source_dir: str = None) -> int:
+        """
+        把现有的 JSON 目录树全部导入数据库（首次启用或需要重建时使用）
+
+        Args:
+            source_dir (str, optional): 源数据目录，默认使用配置中的 OUTPUT_DIR
+
+        Returns:
+            int: 导入的趋势数量
+        """
+        if source_dir is None:
+            source_dir = current_config.OUTPUT_DIR
+        prefix = current_config.OUTPUT_FILE_PREFIX
+        extension = current_config.OUTPUT_FILE_EXTENSION
+        total = 0
+        for root, dirs, files in os.walk(source_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for filename in sorted(files):
+                if not (filename.startswith(prefix) and filename.endswith(extension)):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    records = load_day_records(path)
+                except json.JSONDecodeError as e:
+                    logger.error(f"解码 JSON 文件错误 {path}: {e}")
+                    continue
+                if isinstance(records, list):
+                    total += self.upsert_trends(path, records, source_dir)
+        logger.info(f"已导入 {total} 个趋势到 {self.db_path}")
+        return total
+
+    def query_frame(self, start_date: date, end_date: date, country_label: str = None,
+                    regions: list = None, min_traffic: int = 0, search_terms: list = None) -> pd.DataFrame:
+        """
+        按看板的规则查询日期范围内的数据，日期、国家和流量条件直接下推到 SQL。
+        与看板一致，只保留 UTC 发布日期与文件日期相同、流量非负的趋势，每个新闻一行。
+        地区和搜索词需要按 TOKEN_SPLIT_PATTERN 分词后做前缀匹配，LIKE 无法表达，
+        因此在查询结果上构建 TrendTextIndex 筛选，与其他数据源的结果保持一致。
+
+        Args:
+            start_date (date): 开始日期
+            end_date (date): 结束日期（含）
+            country_label (str, optional): 只保留该国家（与看板“国家”列相同的取值）
+            regions (list, optional): 地区关键字，地区名或其中某个单词以任意一个关键字开头即保留（不区分大小写）
+            min_traffic (int): 最低流量
+            search_terms (list, optional): 搜索词关键字，搜索词或其中某个单词以任意一个关键字开头即保留
+
+        Returns:
+            pd.DataFrame: 与看板表格结构一致、按发布日期和流量降序排列的数据
+        """
+        conditions = ["t.pub_day = t.file_date", "t.file_date BETWEEN ? AND ?", "t.traffic_num >= ?"]
+        params = [start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'), max(0, min_traffic)]
+        if country_label:
+            conditions.append("t.country_label = ?")
+            params.append(country_label)
+        sql = f"""
+            SELECT t.title, n.title, n.source, t.traffic_num, t.pub_day, t.regions_str, t.region_count, t.country_label
+            FROM trends t JOIN news n ON n.trend_id = t.id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY t.pub_day DESC, t.traffic_num DESC, t.id, n.id
+        """
+        with closing(self.connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        df = pd.DataFrame(rows, columns=FRAME_COLUMNS)
+        if not df.empty:
+            df["发布日期"] = pd.to_datetime(df["发布日期"]).dt.date
+        if regions or search_terms:
+            rows = TrendTextIndex(df).filter_rows(regions, search_terms)
+            df = df.iloc[rows].reset_index(drop=True)
+        return df
+
+
+def create_trend_store() -> TrendStore:
+    """根据配置创建 SQLite 趋势存储，未启用时返回 None"""
+    if current_config.USE_SQLITE_STORE:
+        return TrendStore()
+    return None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='把 JSONs 目录树导入 SQLite 趋势存储')
+    parser.add_argument('--source-dir', default=None, help='源数据目录（默认使用配置中的 OUTPUT_DIR）')
+    parser.add_argument('--db', default=None, help='数据库文件（默认使用配置中的 SQLITE_DB_FILE）')
+    args = parser.parse_args()
+    TrendStore(args.db).import_json_tree(args.source_dir)